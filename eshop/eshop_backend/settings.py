@@ -53,6 +53,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Métriques Prometheus (/metrics, inactif sauf si METRICS_ENABLED)
+    'products.metrics.MetricsMiddleware',
+    # Mesures SQL par requête (inactif sauf si SQL_INSTRUMENTATION)
+    'products.instrumentation.SQLInstrumentationMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -90,10 +94,83 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / os.getenv('DATABASE_NAME', 'db.sqlite3'),
+        'OPTIONS': {
+            # Verrou d'écriture pris dès le début des transactions : les écritures
+            # concurrentes (réservations de stock) attendent au lieu d'échouer
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        'TEST': {
+            # Base de test sur fichier : les tests de concurrence utilisent plusieurs connexions
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# LocMemCache est propre à chaque processus : en production avec plusieurs
+# workers, utiliser un backend partagé (fichiers, Redis, Memcached...)
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'eshop-cache'),
+    }
+}
+
+# Cache des réponses du catalogue (voir products.cache)
+CATALOG_CACHE_ALIAS = 'default'
+CATALOG_CACHE_TIMEOUT = int(os.getenv('CATALOG_CACHE_TIMEOUT', '300'))
+
+
+# Sessions
+# https://docs.djangoproject.com/en/5.2/topics/http/sessions/
+# Sessions anonymes dans un cookie signé : aucune écriture en base pour les
+# visiteurs. Le panier n'est créé qu'au premier ajout (voir CartViewSet).
+
+SESSION_ENGINE = os.getenv('SESSION_ENGINE', 'django.contrib.sessions.backends.signed_cookies')
+
+# Purge des paniers abandonnés (voir products.purge et la commande purge_carts) :
+# inactifs depuis SESSION_COOKIE_AGE, ou vides depuis CART_PURGE_EMPTY_MAX_AGE_HOURS.
+# CART_PURGE_INTERVAL (secondes) active la purge périodique dans chaque processus.
+CART_PURGE_EMPTY_MAX_AGE_HOURS = int(os.getenv('CART_PURGE_EMPTY_MAX_AGE_HOURS', '24'))
+CART_PURGE_INTERVAL = int(os.getenv('CART_PURGE_INTERVAL', '0'))
+
+# Instrumentation SQL par requête (voir products.instrumentation) : en-têtes
+# Server-Timing et une ligne JSON par requête échantillonnée (logger
+# products.instrumentation). Une empreinte SQL exécutée au moins
+# SQL_INSTRUMENTATION_DUPLICATE_THRESHOLD fois est signalée (N+1).
+SQL_INSTRUMENTATION = os.getenv('SQL_INSTRUMENTATION', 'False').lower() == 'true'
+SQL_INSTRUMENTATION_SAMPLE_RATE = float(os.getenv('SQL_INSTRUMENTATION_SAMPLE_RATE', '1.0'))
+SQL_INSTRUMENTATION_DUPLICATE_THRESHOLD = int(os.getenv('SQL_INSTRUMENTATION_DUPLICATE_THRESHOLD', '2'))
+
+# Facettes des listes de produits (?facets=true, voir products.facets) : bornes
+# supérieures des tranches de l'histogramme des prix
+PRODUCT_FACET_PRICE_BUCKETS = ('10', '25', '50', '100', '250', '500', '1000')
+
+# Métriques Prometheus (voir products.metrics), exposées sur /metrics aux seules
+# adresses de METRICS_ALLOWED_IPS ou avec le jeton METRICS_TOKEN
+# (Authorization: Bearer). Avec plusieurs workers, METRICS_DIR (répertoire vidé
+# au démarrage du serveur) permet d'agréger les processus.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'False').lower() == 'true'
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_ALLOWED_IPS = [ip for ip in os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',') if ip]
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'products.instrumentation': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -134,6 +211,9 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 # Media files (user uploads)
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Déclinaisons d'une nouvelle image générées en fond après l'enregistrement
+# (sinon uniquement par la commande generate_image_renditions)
+IMAGE_RENDITIONS_ON_SAVE = os.getenv('IMAGE_RENDITIONS_ON_SAVE', 'True').lower() == 'true'
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -145,7 +225,8 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    # Pagination par page, ou par clé avec ?pagination=cursor (voir products.pagination)
+    'DEFAULT_PAGINATION_CLASS': 'products.pagination.CatalogPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -5,27 +5,27 @@ from .models import Category, Product
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ('name', 'slug', 'created_at')
+    list_display = ('name', 'slug', 'available_products_count', 'created_at')
     list_filter = ('created_at',)
     search_fields = ('name', 'description')
     prepopulated_fields = {'slug': ('name',)}
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('available_products_count', 'created_at', 'updated_at')
 
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ('name', 'category', 'price', 'stock', 'is_available', 'featured', 'created_at')
+    list_display = ('name', 'category', 'price', 'stock', 'reserved', 'is_available', 'featured', 'created_at')
     list_filter = ('category', 'is_available', 'featured', 'created_at')
-    search_fields = ('name', 'description')
+    search_fields = ('name', 'sku', 'description')
     list_editable = ('price', 'stock', 'is_available', 'featured')
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('reserved', 'created_at', 'updated_at')
     
     fieldsets = (
         ('Informations générales', {
-            'fields': ('name', 'description', 'category')
+            'fields': ('name', 'sku', 'description', 'category')
         }),
         ('Prix et stock', {
-            'fields': ('price', 'stock', 'is_available')
+            'fields': ('price', 'stock', 'reserved', 'is_available')
         }),
         ('Media', {
             'fields': ('image',)
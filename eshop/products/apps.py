@@ -1,6 +1,23 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class ProductsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'products'
+    
+    def ready(self):
+        # Connexion des signaux (index de recherche)
+        from . import signals  # noqa: F401
+        
+        # Comptage des requêtes SQL par requête HTTP (métriques Prometheus)
+        if getattr(settings, 'METRICS_ENABLED', False):
+            from django.db.backends.signals import connection_created
+            from .metrics import install_query_counter
+            connection_created.connect(install_query_counter, dispatch_uid='products.metrics')
+        
+        # Purge périodique des paniers abandonnés dans le processus (désactivée par défaut)
+        interval = getattr(settings, 'CART_PURGE_INTERVAL', 0)
+        if interval:
+            from .purge import start_periodic_purge
+            start_periodic_purge(interval)
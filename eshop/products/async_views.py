@@ -0,0 +1,159 @@
+"""
+Endpoints de lecture asynchrones (``/api/async/...``), pour un déploiement ASGI.
+
+Même représentation que les ViewSets DRF (mêmes serializers), mais servis
+par des vues Django ``async`` qui utilisent l'ORM asynchrone (``aget``,
+``acount``, ``aiterator``) : sous uvicorn, une requête n'occupe aucun fil
+du pool de ``sync_to_async``. Les listes sont diffusées (``StreamingHttpResponse``)
+au fur et à mesure de l'itération, sans construire la liste complète en mémoire.
+
+Les deux piles coexistent : les écritures, la recherche plein texte, le cache
+des réponses et les requêtes conditionnelles restent servis par la pile DRF.
+"""
+import json
+
+from django.conf import settings
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .filters import filter_price_and_stock
+from .models import Cart, Category, Product
+from .serializers import CategorySerializer, ProductDetailSerializer, ProductListSerializer
+from .views import CART_TOKEN_SESSION_KEY, ProductViewSet, cart_summary_data
+
+
+STREAM_CHUNK_SIZE = 100
+MAX_PAGE_SIZE = 100
+
+
+def dumps(data):
+    """Encodage JSON identique au rendu DRF (compact, UTF-8)"""
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':'))
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, safe=False, encoder=JSONEncoder, json_dumps_params={
+        'ensure_ascii': False, 'separators': (',', ':'),
+    })
+
+
+async def stream_objects(queryset, serializer, head='', tail=''):
+    """``head`` + tableau JSON des objets sérialisés un à un + ``tail``"""
+    yield f'{head}['
+    separator = ''
+    async for obj in queryset.aiterator(chunk_size=STREAM_CHUNK_SIZE):
+        yield separator + dumps(serializer.to_representation(obj))
+        separator = ','
+    yield f']{tail}'
+
+
+def streaming_json_response(chunks):
+    return StreamingHttpResponse(chunks, content_type='application/json')
+
+
+def product_list_queryset(params):
+    """Filtres et tri de ``ProductViewSet`` (hors recherche plein texte)"""
+    queryset = filter_price_and_stock(Product.objects.select_related('category'), params)
+    category = params.get('category')
+    if category:
+        queryset = queryset.filter(**{'category_id' if category.isdigit() else 'category__slug': category})
+    for field in ('is_available', 'featured'):
+        value = params.get(field, '').lower()
+        if value in ('true', 'false'):
+            queryset = queryset.filter(**{field: value == 'true'})
+
+    terms = (term.strip() for term in params.get('ordering', '').split(','))
+    ordering = [term for term in terms if term.lstrip('-') in ProductViewSet.ordering_fields]
+    return queryset.order_by(*(ordering or ProductViewSet.ordering), '-id')
+
+
+def page_bounds(request):
+    """Numéro et taille de page (``?page=``, ``?page_size=``), comme ``CatalogPagination``"""
+    try:
+        page_size = min(int(request.GET.get('page_size', '')), MAX_PAGE_SIZE)
+    except ValueError:
+        page_size = 0
+    if page_size < 1:
+        # Taille absente, invalide ou nulle : taille par défaut
+        page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    try:
+        page = int(request.GET.get('page', 1))
+    except ValueError:
+        raise Http404('Page invalide.')
+    if page < 1:
+        raise Http404('Page invalide.')
+    return page, page_size
+
+
+async def paginated_products(request, queryset):
+    """Page de ``queryset`` au format de ``CatalogPagination`` (``count``, liens, ``results``), diffusée"""
+    page, page_size = page_bounds(request)
+    count = await queryset.acount()
+    if page > 1 and (page - 1) * page_size >= count:
+        return json_response({'detail': 'Page invalide.'}, status=404)
+
+    url = request.build_absolute_uri()
+    next_url = replace_query_param(url, 'page', page + 1) if page * page_size < count else None
+    previous_url = None
+    if page > 1:
+        previous_url = remove_query_param(url, 'page') if page == 2 else replace_query_param(url, 'page', page - 1)
+
+    head = f'{{"count":{count},"next":{dumps(next_url)},"previous":{dumps(previous_url)},"results":'
+    serializer = ProductListSerializer(context={'request': request})
+    start = (page - 1) * page_size
+    return streaming_json_response(
+        stream_objects(queryset[start:start + page_size], serializer, head=head, tail='}')
+    )
+
+
+@require_GET
+async def product_list(request):
+    """Liste paginée des produits, diffusée"""
+    return await paginated_products(request, product_list_queryset(request.GET))
+
+
+@require_GET
+async def product_detail(request, pk):
+    try:
+        product = await Product.objects.select_related('category').aget(pk=pk)
+    except Product.DoesNotExist:
+        return json_response({'detail': 'Non trouvé.'}, status=404)
+    return json_response(ProductDetailSerializer(product, context={'request': request}).data)
+
+
+@require_GET
+async def product_featured(request):
+    """Les 6 produits mis en avant les plus récents"""
+    queryset = Product.objects.select_related('category').filter(
+        featured=True, is_available=True
+    ).order_by('-created_at')[:6]
+    serializer = ProductListSerializer(context={'request': request})
+    return json_response([serializer.to_representation(product) async for product in queryset])
+
+
+@require_GET
+async def category_list(request):
+    """Liste des catégories (non paginée : le catalogue en compte peu), diffusée"""
+    serializer = CategorySerializer(context={'request': request})
+    return streaming_json_response(stream_objects(Category.objects.order_by('name'), serializer))
+
+
+@require_GET
+async def category_products(request, slug):
+    """Produits disponibles d'une catégorie (filtres, tri et pagination de la liste), diffusés"""
+    try:
+        category = await Category.objects.aget(slug=slug)
+    except Category.DoesNotExist:
+        return json_response({'detail': 'Non trouvé.'}, status=404)
+    queryset = product_list_queryset(request.GET).filter(category=category, is_available=True)
+    return await paginated_products(request, queryset)
+
+
+@require_GET
+async def cart_summary(request):
+    """Nombre d'articles, total et version du panier (sans créer de panier)"""
+    token = await request.session.aget(CART_TOKEN_SESSION_KEY)
+    summary = await Cart.objects.filter(session_key=token).summaries().afirst() if token else None
+    return json_response(cart_summary_data(summary))
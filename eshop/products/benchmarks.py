@@ -0,0 +1,217 @@
+"""
+Scénarios de charge de l'API (commande ``benchmark_api``).
+
+Chaque scénario couvre une ou plusieurs routes de ``products/urls.py`` :
+lectures (une requête GET par itération, paramètres tirés au hasard dans
+le catalogue) ou cycle complet du panier (ajout, lecture, modification,
+lot, suppression, vidage). Les scénarios sont reconstruits par leur nom
+dans chaque processus de charge : seuls des noms et le dictionnaire
+``catalog`` (voir ``sample_catalog``) traversent les processus.
+"""
+import asyncio
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.urls import URLPattern, URLResolver
+
+from .loadgen import run_scenario
+from .models import Category, Product
+
+
+SAMPLE_SIZE = 1000
+SEARCH_TERMS = ('casque', 'pro', 'smartphone', 'ultra', 'clavier', 'écran')
+
+
+def sample_catalog(seed=0, sample_size=SAMPLE_SIZE):
+    """Identifiants tirés du catalogue en base, partagés par tous les clients"""
+    rng = random.Random(seed)
+    
+    def sample(queryset, field):
+        # Échantillon réparti sur toute la plage des ids, sans trier la table entière
+        bounds = list(queryset.order_by('pk').values_list('pk', flat=True)[:1]) + list(
+            queryset.order_by('-pk').values_list('pk', flat=True)[:1]
+        )
+        if not bounds:
+            return []
+        low, high = bounds
+        candidates = sorted(rng.sample(range(low, high + 1), min(sample_size * 2, high - low + 1)))
+        return list(queryset.filter(pk__in=candidates).values_list(field, flat=True)[:sample_size])
+    
+    return {
+        'category_ids': sample(Category.objects.all(), 'id'),
+        'category_slugs': sample(Category.objects.filter(available_products_count__gt=0), 'slug'),
+        'product_ids': sample(Product.objects.all(), 'id'),
+        # Produits réservables par les cycles de panier
+        'cart_product_ids': sample(Product.objects.filter(is_available=True, stock__gte=20), 'id'),
+        'search_terms': list(SEARCH_TERMS),
+    }
+
+
+def _choice(rng, values, default=1):
+    return rng.choice(values) if values else default
+
+
+def _price_range(rng):
+    low = rng.choice((0, 10, 50, 100, 500))
+    return low, low * 4 + 50
+
+
+ORDERINGS = ('name', '-name', 'price', '-price', 'created_at', '-created_at', 'stock', '-stock')
+
+# (libellé, nom de route, chemin en fonction de (rng, catalog))
+READ_ENDPOINTS = [
+    ('GET /api/', 'api-root', lambda rng, c: '/api/'),
+    ('GET /api/categories/', 'category-list', lambda rng, c: '/api/categories/'),
+    ('GET /api/categories/{slug}/', 'category-detail',
+     lambda rng, c: f'/api/categories/{_choice(rng, c["category_slugs"], "x")}/'),
+    ('GET /api/categories/{slug}/products/', 'category-products',
+     lambda rng, c: f'/api/categories/{_choice(rng, c["category_slugs"], "x")}/products/'),
+    ('GET /api/categories/{slug}/products/?pagination=cursor', 'category-products',
+     lambda rng, c: f'/api/categories/{_choice(rng, c["category_slugs"], "x")}/products/?pagination=cursor'),
+    ('GET /api/categories/{slug}/products/?format=ndjson', 'category-products',
+     lambda rng, c: f'/api/categories/{_choice(rng, c["category_slugs"], "x")}/products/?format=ndjson'),
+    ('GET /api/products/?page={n}', 'product-list', lambda rng, c: f'/api/products/?page={rng.randint(1, 20)}'),
+    ('GET /api/products/?page_size=100', 'product-list', lambda rng, c: '/api/products/?page_size=100'),
+    ('GET /api/products/?category={id}', 'product-list',
+     lambda rng, c: f'/api/products/?category={_choice(rng, c["category_ids"])}'),
+    ('GET /api/products/?min_price=&max_price=', 'product-list',
+     lambda rng, c: '/api/products/?min_price={}&max_price={}'.format(*_price_range(rng))),
+    ('GET /api/products/?in_stock_only=true', 'product-list', lambda rng, c: '/api/products/?in_stock_only=true'),
+    ('GET /api/products/?is_available=false', 'product-list', lambda rng, c: '/api/products/?is_available=false'),
+    ('GET /api/products/?featured=true', 'product-list', lambda rng, c: '/api/products/?featured=true'),
+    *[
+        (f'GET /api/products/?ordering={ordering}', 'product-list',
+         lambda rng, c, ordering=ordering: f'/api/products/?ordering={ordering}&page={rng.randint(1, 5)}')
+        for ordering in ORDERINGS
+    ],
+    ('GET /api/products/?search={term}', 'product-list',
+     lambda rng, c: f'/api/products/?search={rng.choice(c["search_terms"])}'),
+    ('GET /api/products/?pagination=cursor', 'product-list',
+     lambda rng, c: '/api/products/?pagination=cursor&ordering=-price'),
+    ('GET /api/products/?fields=id,name,price,image', 'product-list',
+     lambda rng, c: f'/api/products/?fields=id,name,price,image&page={rng.randint(1, 20)}'),
+    ('GET /api/products/?render=fast&page_size=100', 'product-list',
+     lambda rng, c: f'/api/products/?render=fast&page_size=100&page={rng.randint(1, 5)}'),
+    ('GET /api/products/{id}/', 'product-detail',
+     lambda rng, c: f'/api/products/{_choice(rng, c["product_ids"])}/'),
+    ('GET /api/products/featured/', 'product-featured', lambda rng, c: '/api/products/featured/'),
+    ('GET /api/products/search_advanced/', 'product-search-advanced',
+     lambda rng, c: '/api/products/search_advanced/?q={}&min_price={}&max_price={}'.format(
+         rng.choice(c['search_terms']), *_price_range(rng))),
+    ('GET /api/async/products/', 'async-product-list',
+     lambda rng, c: f'/api/async/products/?page={rng.randint(1, 20)}'),
+    ('GET /api/async/products/{id}/', 'async-product-detail',
+     lambda rng, c: f'/api/async/products/{_choice(rng, c["product_ids"])}/'),
+    ('GET /api/async/products/featured/', 'async-product-featured', lambda rng, c: '/api/async/products/featured/'),
+    ('GET /api/async/categories/', 'async-category-list', lambda rng, c: '/api/async/categories/'),
+    ('GET /api/async/categories/{slug}/products/', 'async-category-products',
+     lambda rng, c: f'/api/async/categories/{_choice(rng, c["category_slugs"], "x")}/products/'),
+    ('GET /api/async/cart/summary/', 'async-cart-summary', lambda rng, c: '/api/async/cart/summary/'),
+]
+
+CART_ROUTES = (
+    'cart-add-item', 'cart-list', 'cart-detail', 'cart-update-item', 'cart-summary',
+    'cart-batch', 'cart-remove-item', 'cart-clear',
+)
+CART_SCENARIO = 'cycle panier'
+
+
+def _read_scenario(path_factory, label, catalog):
+    async def scenario(session, rng):
+        await session.request('GET', path_factory(rng, catalog), label=label)
+    return scenario
+
+
+def _cart_scenario(catalog):
+    product_ids = catalog['cart_product_ids'] or [1]
+    
+    async def scenario(session, rng):
+        """Un cycle complet : chaque étape est mesurée sous le libellé de sa route"""
+        product_id, other_id = rng.sample(product_ids, 2) if len(product_ids) > 1 else product_ids * 2
+        response = await session.request(
+            'POST', '/api/cart/add_item/', {'product_id': product_id, 'quantity': 1},
+            label='POST /api/cart/add_item/'
+        )
+        if response is None or response.status != 201:
+            return
+        cart = response.json()['cart']
+        item_id = next(item['id'] for item in cart['items'] if item['product'] == product_id)
+        await session.request('GET', '/api/cart/', label='GET /api/cart/')
+        await session.request('GET', f'/api/cart/{cart["id"]}/', label='GET /api/cart/{id}/')
+        await session.request(
+            'PUT', '/api/cart/update_item/?response=delta', {'item_id': item_id, 'quantity': 2},
+            label='PUT /api/cart/update_item/'
+        )
+        await session.request('GET', '/api/cart/summary/', label='GET /api/cart/summary/')
+        await session.request('POST', '/api/cart/batch/?response=delta', {'operations': [
+            {'op': 'add', 'product_id': other_id, 'quantity': 1},
+            {'op': 'set', 'product_id': product_id, 'quantity': 1},
+        ]}, label='POST /api/cart/batch/')
+        await session.request(
+            'DELETE', '/api/cart/remove_item/?response=delta', {'item_id': item_id},
+            label='DELETE /api/cart/remove_item/'
+        )
+        await session.request('DELETE', '/api/cart/clear/?response=delta', label='DELETE /api/cart/clear/')
+    
+    return scenario
+
+
+def scenario_names():
+    return [label for label, _, _ in READ_ENDPOINTS] + [CART_SCENARIO]
+
+
+def build_scenario(name, catalog):
+    if name == CART_SCENARIO:
+        return _cart_scenario(catalog)
+    for label, _, path_factory in READ_ENDPOINTS:
+        if label == name:
+            return _read_scenario(path_factory, label, catalog)
+    raise KeyError(name)
+
+
+def covered_routes():
+    return {route for _, route, _ in READ_ENDPOINTS} | set(CART_ROUTES)
+
+
+def registered_routes(patterns):
+    """Noms des routes de ``patterns`` (``products.urls.urlpatterns``), inclusions comprises"""
+    names = set()
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            names |= registered_routes(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            names.add(pattern.name)
+    return names
+
+
+def _run_in_process(base_url, name, catalog, concurrency, duration, seed):
+    """Point d'entrée d'un processus de charge"""
+    scenario = build_scenario(name, catalog)
+    return asyncio.run(run_scenario(base_url, scenario, concurrency, duration, seed=seed))
+
+
+def run_benchmark(base_url, name, catalog, concurrency=50, duration=5.0, processes=1, seed=0):
+    """
+    Exécute le scénario ``name`` et retourne ``{libellé: LoadResult}``.
+    
+    Avec ``processes > 1``, la concurrence est répartie entre plusieurs
+    processus (le client asyncio ne doit pas être le goulot d'étranglement).
+    """
+    if processes <= 1:
+        return _run_in_process(base_url, name, catalog, concurrency, duration, seed)
+    
+    shares = [concurrency // processes + (index < concurrency % processes) for index in range(processes)]
+    with ProcessPoolExecutor(max_workers=processes, initializer=django.setup) as executor:
+        futures = [
+            executor.submit(_run_in_process, base_url, name, catalog, share, duration, f'{seed}:{index}')
+            for index, share in enumerate(shares) if share
+        ]
+        merged = {}
+        for future in futures:
+            for label, result in future.result().items():
+                if label in merged:
+                    merged[label].merge(result)
+                else:
+                    merged[label] = result
+    return merged
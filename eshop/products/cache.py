@@ -0,0 +1,140 @@
+"""
+Cache des réponses des endpoints de lecture du catalogue.
+
+Les clés incluent un numéro de version du catalogue : toute écriture sur
+``Product`` ou ``Category`` (signaux, commandes de gestion en masse)
+incrémente ce numéro, ce qui invalide d'un coup toutes les réponses en
+cache sans avoir à les énumérer. Les anciennes entrées expirent d'elles-mêmes.
+
+Le backend est celui de l'alias ``CATALOG_CACHE_ALIAS`` de ``CACHES``
+(n'importe quel backend implémentant l'API de cache de Django).
+"""
+import hashlib
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+
+from .metrics import record_cache_lookup
+
+
+VERSION_KEY = 'catalog:version'
+
+
+def get_cache():
+    return caches[getattr(settings, 'CATALOG_CACHE_ALIAS', 'default')]
+
+
+def get_timeout():
+    return getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300)
+
+
+def get_catalog_version():
+    """Retourne la version courante du catalogue (initialisée à 1)"""
+    cache = get_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, timeout=None)
+        version = cache.get(VERSION_KEY, 1)
+    return version
+
+
+def bump_catalog_version():
+    """Invalide toutes les réponses du catalogue en cache"""
+    cache = get_cache()
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:
+        # Clé absente (cache vidé ou expiré)
+        cache.add(VERSION_KEY, 1, timeout=None)
+        return cache.incr(VERSION_KEY)
+
+
+def bump_catalog_version_on_commit():
+    """Invalide le cache une fois la transaction courante validée"""
+    transaction.on_commit(bump_catalog_version)
+
+
+def normalize_query_params(query_params, ignored=()):
+    """Paramètres triés, sans valeurs vides : ``?b=2&a=1`` et ``?a=1&b=2&c=`` sont équivalents"""
+    return urlencode(sorted(
+        (key, value)
+        for key in query_params
+        if key not in ignored
+        for value in query_params.getlist(key)
+        if value != ''
+    ))
+
+
+def build_cache_key(request, prefix='response', ignored=()):
+    """
+    Clé : version du catalogue + origine + chemin + paramètres de requête
+    normalisés (hors ``ignored``).
+    
+    L'origine (schéma et hôte) en fait partie : les réponses contiennent des
+    URL absolues (pagination, images) construites pour l'hôte de la requête.
+    """
+    raw_key = (
+        f'{request.scheme}://{request.get_host()}{request.path}'
+        f'?{normalize_query_params(request.query_params, ignored)}'
+    )
+    digest = hashlib.md5(raw_key.encode('utf-8')).hexdigest()
+    return f'catalog:{prefix}:v{get_catalog_version()}:{digest}'
+
+
+VALIDATOR_HEADERS = ('ETag', 'Last-Modified')
+
+
+def cache_catalog_response(view_method):
+    """
+    Décorateur d'action DRF : met en cache ``response.data`` des réponses 200
+    avec leurs validateurs (ETag / Last-Modified).
+    
+    Un client qui présente l'ETag d'une entrée en cache reçoit un 304 sans
+    qu'aucune requête ne soit faite en base.
+    """
+    
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        # Réponses diffusées (NDJSON) : rien à mettre en cache
+        if request.method not in ('GET', 'HEAD') or getattr(request.accepted_renderer, 'streaming', False):
+            return view_method(self, request, *args, **kwargs)
+        
+        cache = get_cache()
+        key = build_cache_key(request)
+        cached = cache.get(key)
+        record_cache_lookup('catalog', cached is not None)
+        if cached is not None:
+            headers = cached['headers']
+            response = None
+            if headers:
+                response = get_conditional_response(
+                    request,
+                    etag=headers.get('ETag'),
+                    last_modified=parse_http_date_safe(headers.get('Last-Modified', '')),
+                )
+            if response is None:
+                response = Response(cached['data'])
+            for header, value in headers.items():
+                response[header] = value
+            if headers:
+                patch_cache_control(response, no_cache=True)
+            return response
+        
+        response = view_method(self, request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, {
+                'data': response.data,
+                'headers': {
+                    header: response[header]
+                    for header in VALIDATOR_HEADERS if response.has_header(header)
+                },
+            }, get_timeout())
+        return response
+    
+    return wrapper
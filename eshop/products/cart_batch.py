@@ -0,0 +1,125 @@
+"""
+Application d'une liste ordonnée d'opérations sur un panier.
+
+Les opérations (``add``, ``set``, ``remove``) sont d'abord simulées en
+mémoire à partir des articles du panier et des produits concernés, chargés
+en une requête chacun et verrouillés. Les opérations valides sont ensuite
+écrites en masse (création, mise à jour, suppression d'articles, un seul
+UPDATE des réservations) ; les opérations refusées n'ont aucun effet et
+sont signalées dans les résultats.
+"""
+from contextlib import nullcontext
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import stock
+from .models import CartItem, Product
+
+
+ADD, SET, REMOVE = 'add', 'set', 'remove'
+OPERATIONS = (ADD, SET, REMOVE)
+MAX_BATCH_OPERATIONS = 100
+
+
+class OperationRefused(Exception):
+    """Opération invalide pour l'état courant du panier ou du stock"""
+
+
+def _target_quantity(operation, current, product):
+    """Quantité de l'article après l'opération, ou ``OperationRefused``"""
+    kind = operation['op']
+    if kind == REMOVE:
+        if not current:
+            raise OperationRefused('Article introuvable dans le panier')
+        return 0
+    
+    if product is None:
+        raise OperationRefused('Produit introuvable')
+    quantity = operation['quantity']
+    target = current + quantity if kind == ADD else quantity
+    if target > current:
+        if not product['is_available']:
+            raise OperationRefused('Ce produit n\'est pas disponible.')
+        # La réservation du panier lui-même est comprise dans ``reserved``
+        available = product['stock'] - product['reserved'] + product['initial_quantity']
+        if target > available:
+            raise OperationRefused(f'Stock insuffisant. Stock disponible: {max(available, 0)}')
+    return target
+
+
+def apply_operations(cart, operations):
+    """
+    Applique ``operations`` (dicts ``op``, ``product_id``, ``quantity``) au panier
+    dans une seule transaction. ``cart`` peut être ``None`` (panier vide virtuel)
+    si aucune opération n'ajoute d'article.
+    
+    Retourne ``(résultats, ids des articles supprimés)`` : un résultat par
+    opération, dans l'ordre, dont le ``status`` vaut ``ok`` (avec la nouvelle
+    ``quantity`` de l'article) ou ``error`` (avec ``error``).
+    """
+    product_ids = {operation['product_id'] for operation in operations}
+    
+    products = Product.objects.filter(pk__in=product_ids)
+    if cart is not None:
+        products = products.select_for_update()
+    # Sans panier, rien ne sera écrit : ni transaction d'écriture, ni verrou
+    # (``select_for_update`` hors transaction est refusé par Django)
+    with transaction.atomic() if cart is not None else nullcontext():
+        items = {
+            item.product_id: item
+            for item in CartItem.objects.select_for_update().filter(cart=cart, product_id__in=product_ids)
+        } if cart is not None else {}
+        products = {
+            product['id']: product
+            for product in products.values('id', 'stock', 'reserved', 'is_available')
+        }
+        quantities = {product_id: item.quantity for product_id, item in items.items()}
+        for product_id, product in products.items():
+            product['initial_quantity'] = quantities.get(product_id, 0)
+        
+        results = []
+        for index, operation in enumerate(operations):
+            product_id = operation['product_id']
+            result = {'index': index, 'op': operation['op'], 'product_id': product_id}
+            try:
+                quantity = _target_quantity(operation, quantities.get(product_id, 0), products.get(product_id))
+            except OperationRefused as e:
+                result.update(status='error', error=str(e))
+            else:
+                quantities[product_id] = quantity
+                result.update(status='ok', quantity=quantity)
+            results.append(result)
+        
+        removed_item_ids = _write_items(cart, items, quantities)
+        stock.apply_deltas({
+            product_id: quantity - (items[product_id].quantity if product_id in items else 0)
+            for product_id, quantity in quantities.items()
+        })
+        if cart is not None and any(result['status'] == 'ok' for result in results):
+            cart.touch()
+    
+    return results, removed_item_ids
+
+
+def _write_items(cart, items, quantities):
+    """Écrit l'état final des articles (une requête par type d'écriture au plus) ; retourne les ids supprimés"""
+    now = timezone.now()
+    to_create, to_update, to_delete = [], [], []
+    for product_id, quantity in quantities.items():
+        item = items.get(product_id)
+        if item is None:
+            if quantity:
+                to_create.append(CartItem(cart=cart, product_id=product_id, quantity=quantity))
+        elif not quantity:
+            to_delete.append(item.pk)
+        elif quantity != item.quantity:
+            to_update.append(CartItem(pk=item.pk, quantity=quantity, updated_at=now))
+    
+    if to_create:
+        CartItem.objects.bulk_create(to_create)
+    if to_update:
+        CartItem.objects.bulk_update(to_update, ['quantity', 'updated_at'])
+    if to_delete:
+        CartItem.objects.filter(pk__in=to_delete).delete()
+    return to_delete
@@ -0,0 +1,137 @@
+"""
+Requêtes conditionnelles (ETag / Last-Modified) pour les endpoints du catalogue.
+
+Les validateurs sont calculés sans sérialiser : pour une liste, un seul
+agrégat ``COUNT`` + ``MAX(updated_at)`` sur le queryset filtré ; pour un
+détail, les dates de modification de l'objet déjà chargé. Si le client
+présente un validateur encore valide, la réponse est un ``304 Not Modified``
+sans corps.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+from .cache import normalize_query_params
+
+
+def _build_validators(request, parts, timestamps):
+    """ETag (empreinte de la requête et de l'état) et date de dernière modification"""
+    timestamps = [timestamp for timestamp in timestamps if timestamp is not None]
+    last_modified = max(timestamps) if timestamps else None
+    raw = '|'.join([
+        request.path,
+        normalize_query_params(request.query_params),
+        *(str(part) for part in parts),
+        *(timestamp.isoformat() for timestamp in timestamps),
+    ])
+    etag = quote_etag(hashlib.md5(raw.encode('utf-8')).hexdigest())
+    return etag, last_modified
+
+
+def queryset_validators(request, queryset, timestamp_fields=('updated_at',)):
+    """Validateurs d'une liste : nombre de lignes et ``MAX`` des dates (une requête)"""
+    aggregates = {
+        f'last_{index}': Max(field) for index, field in enumerate(timestamp_fields)
+    }
+    values = queryset.order_by().aggregate(count=Count('pk'), **aggregates)
+    timestamps = [values[f'last_{index}'] for index in range(len(timestamp_fields))]
+    return _build_validators(request, [values['count']], timestamps)
+
+
+def _object_value(obj, field):
+    """Valeur de ``field`` (``'category__updated_at'``) d'une instance ou d'une ligne ``.values()``"""
+    if isinstance(obj, dict):
+        return obj[field]
+    for attribute in field.split('__'):
+        obj = getattr(obj, attribute)
+    return obj
+
+
+def _object_pk(obj):
+    return obj['id'] if isinstance(obj, dict) else obj.pk
+
+
+def object_validators(request, obj, timestamp_fields=('updated_at',)):
+    """Validateurs d'un détail (``'category__updated_at'`` suit les relations chargées)"""
+    timestamps = [_object_value(obj, field) for field in timestamp_fields]
+    return _build_validators(request, [_object_pk(obj)], timestamps)
+
+
+def page_validators(request, page, timestamp_fields=('updated_at',)):
+    """Validateurs d'une page déjà chargée (pagination par clé : pas d'agrégat global)"""
+    timestamps = []
+    for obj in page:
+        _, last_modified = object_validators(request, obj, timestamp_fields)
+        timestamps.append(last_modified)
+    return _build_validators(request, [_object_pk(obj) for obj in page], timestamps)
+
+
+def set_validators(response, etag, last_modified):
+    """Ajoute les en-têtes de validation ; le client doit revalider (``no-cache``)"""
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def conditional_response(request, validators, build_response):
+    """Retourne un 304 si les validateurs du client sont à jour, sinon ``build_response()``"""
+    etag, last_modified = validators
+    not_modified = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+    if not_modified is not None:
+        return set_validators(not_modified, etag, last_modified)
+    
+    response = build_response()
+    if response.status_code == 200:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+class ConditionalGetMixin:
+    """Support ETag / Last-Modified pour ``list`` et ``retrieve`` d'un ViewSet"""
+    conditional_timestamp_fields = ('updated_at',)
+    
+    def list(self, request, *args, **kwargs):
+        return self.conditional_list(request, self.filter_queryset(self.get_queryset()))
+    
+    def conditional_list(self, request, queryset):
+        """Réponse paginée de ``queryset`` (déjà filtré), avec ses validateurs"""
+        use_cursor = getattr(self.paginator, 'use_cursor', None)
+        if use_cursor is not None and use_cursor(request):
+            # Pagination par clé : validateurs calculés sur la page, sans COUNT global
+            page = self.paginate_queryset(queryset)
+            return conditional_response(
+                request,
+                page_validators(request, page, self.conditional_timestamp_fields),
+                lambda: self.get_paginated_response(self.get_serializer(page, many=True).data)
+            )
+        return conditional_response(
+            request,
+            queryset_validators(request, queryset, self.conditional_timestamp_fields),
+            lambda: self.get_list_response(queryset)
+        )
+    
+    def get_list_response(self, queryset):
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(queryset, many=True).data)
+    
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        return conditional_response(
+            request,
+            object_validators(request, instance, self.conditional_timestamp_fields),
+            lambda: self.get_serializer_response(instance)
+        )
+    
+    def get_serializer_response(self, instance):
+        return Response(self.get_serializer(instance).data)
@@ -0,0 +1,115 @@
+"""
+Facettes des listes de produits (``?facets=true``).
+
+Comptes par catégorie, produits disponibles, en stock et mis en avant, prix
+minimum et maximum, histogramme des prix : tout est calculé par une seule
+requête groupée (catégorie × tranche de prix) sur le queryset filtré de la
+liste, puis réduit en Python ; une seconde requête (clé primaire) lit le
+nom des catégories présentes, ce qui évite la jointure dans l'agrégat. Le
+nombre de lignes ne dépend que du nombre de catégories et de tranches, pas
+du nombre de produits.
+
+Les facettes sont mises en cache séparément de la page de résultats : la clé
+ignore pagination, tri et projection, si bien que toutes les pages d'une
+même recherche partagent une seule entrée.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Case, Count, IntegerField, Max, Min, Q, Value, When
+
+from .cache import build_cache_key, get_cache, get_timeout
+from .metrics import record_cache_lookup
+from .models import Category
+
+
+FACETS_PARAM = 'facets'
+# Bornes supérieures (exclues) des tranches de prix ; la dernière tranche est ouverte
+DEFAULT_PRICE_BUCKETS = ('10', '25', '50', '100', '250', '500', '1000')
+# Paramètres sans effet sur l'ensemble des produits filtrés
+RESULT_PARAMS = ('page', 'page_size', 'cursor', 'pagination', 'ordering', 'fields', 'omit', 'render', 'format')
+
+
+def facets_requested(request):
+    return request.query_params.get(FACETS_PARAM, '').lower() == 'true'
+
+
+def price_buckets():
+    return [Decimal(bound) for bound in getattr(settings, 'PRODUCT_FACET_PRICE_BUCKETS', DEFAULT_PRICE_BUCKETS)]
+
+
+def price_bucket_expression(bounds):
+    """Indice de la tranche de prix : ``0`` sous la première borne, ``len(bounds)`` au-delà de la dernière"""
+    return Case(
+        *(When(price__lt=bound, then=Value(index)) for index, bound in enumerate(bounds)),
+        default=Value(len(bounds)),
+        output_field=IntegerField(),
+    )
+
+
+def _format_price(value, places):
+    """Prix au format des serializers (``'10.00'``), ``None`` conservé"""
+    return None if value is None else str(Decimal(value).quantize(Decimal(1).scaleb(-places)))
+
+
+def compute_facets(queryset, bounds=None):
+    """Facettes d'un queryset de produits (deux requêtes)"""
+    bounds = price_buckets() if bounds is None else bounds
+    rows = queryset.order_by().values(
+        'category_id', price_bucket=price_bucket_expression(bounds),
+    ).annotate(
+        count=Count('pk'),
+        available=Count('pk', filter=Q(is_available=True)),
+        in_stock=Count('pk', filter=Q(is_available=True, stock__gt=0)),
+        featured=Count('pk', filter=Q(featured=True)),
+        min_price=Min('price'),
+        max_price=Max('price'),
+    )
+    
+    totals = {'count': 0, 'available': 0, 'in_stock': 0, 'featured': 0}
+    categories = {}
+    histogram = [0] * (len(bounds) + 1)
+    min_price = max_price = None
+    for row in rows:
+        for name in totals:
+            totals[name] += row[name]
+        categories[row['category_id']] = categories.get(row['category_id'], 0) + row['count']
+        histogram[row['price_bucket']] += row['count']
+        if min_price is None or row['min_price'] < min_price:
+            min_price = row['min_price']
+        if max_price is None or row['max_price'] > max_price:
+            max_price = row['max_price']
+    
+    category_facets = [
+        {'id': pk, 'slug': slug, 'name': name, 'count': categories[pk]}
+        for pk, slug, name in Category.objects.filter(pk__in=categories).values_list('pk', 'slug', 'name')
+    ] if categories else []
+    places = queryset.model._meta.get_field('price').decimal_places
+    edges = [None, *(_format_price(bound, places) for bound in bounds), None]
+    return {
+        'total': totals['count'],
+        'available': totals['available'],
+        'in_stock': totals['in_stock'],
+        'featured': totals['featured'],
+        'categories': sorted(category_facets, key=lambda category: (-category['count'], category['name'])),
+        'price': {
+            'min': _format_price(min_price, places),
+            'max': _format_price(max_price, places),
+            'histogram': [
+                {'min': edges[index], 'max': edges[index + 1], 'count': count}
+                for index, count in enumerate(histogram)
+            ],
+        },
+    }
+
+
+def cached_facets(request, queryset):
+    """Facettes du queryset filtré, en cache par chemin et filtres (version du catalogue comprise)"""
+    cache = get_cache()
+    key = build_cache_key(request, prefix='facets', ignored=(FACETS_PARAM, *RESULT_PARAMS))
+    facets = cache.get(key)
+    record_cache_lookup('facets', facets is not None)
+    if facets is None:
+        facets = compute_facets(queryset)
+        cache.set(key, facets, get_timeout())
+    return facets
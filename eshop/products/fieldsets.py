@@ -0,0 +1,196 @@
+"""
+Champs partiels des réponses (``?fields=`` / ``?omit=``).
+
+``?fields=id,name,category.name`` ne garde que ces champs (notation pointée
+pour les serializers imbriqués, listes comprises : ``items.quantity``) ;
+``?omit=description,category`` les retire. Les noms inconnus sont ignorés.
+
+Les champs restants sont traduits en chemins de colonnes pour ``.only()`` :
+une colonne qu'aucun champ demandé ne lit (``description``...) n'est pas
+lue en base. Les champs calculés déclarent leurs colonnes dans l'attribut
+``source_fields`` de leur serializer ; si une source ne peut pas être
+résolue, le queryset est laissé intact (toutes les colonnes).
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+
+
+def parse_fieldset(value):
+    """``'id,category.name'`` -> ``{'id': None, 'category': {'name': None}}`` (``None`` si vide)"""
+    tree = {}
+    for path in value.split(','):
+        names = [name.strip() for name in path.split('.')]
+        if not all(names):
+            continue
+        node = tree
+        for name in names[:-1]:
+            if node.get(name, {}) is None:
+                # ``category`` déjà demandé en entier
+                break
+            node = node.setdefault(name, {})
+        else:
+            node[names[-1]] = None
+    return tree or None
+
+
+def requested_fieldsets(request):
+    """Arbres ``(fields, omit)`` demandés par la requête"""
+    params = request.query_params
+    return parse_fieldset(params.get(FIELDS_PARAM, '')), parse_fieldset(params.get(OMIT_PARAM, ''))
+
+
+def _subtree(tree, name):
+    return tree.get(name) if tree else None
+
+
+def _keep(name, fields, omit):
+    return (fields is None or name in fields) and not (omit and name in omit and omit[name] is None)
+
+
+def prune_serializer(serializer, fields=None, omit=None):
+    """Retire de ``serializer`` (et de ses serializers imbriqués) les champs non demandés"""
+    if isinstance(serializer, ListSerializer):
+        serializer = serializer.child
+    if fields is None and omit is None:
+        return serializer
+    if not isinstance(serializer, BaseSerializer):
+        # Serializer de lignes ``.values()`` (``output_fields``)
+        serializer.output_fields = tuple(
+            name for name in serializer.output_fields if _keep(name, fields, omit)
+        )
+        return serializer
+    
+    for name, field in list(serializer.fields.items()):
+        if not _keep(name, fields, omit):
+            del serializer.fields[name]
+        elif isinstance(field, BaseSerializer):
+            prune_serializer(field, _subtree(fields, name), _subtree(omit, name))
+    return serializer
+
+
+def prune_data(data, fields=None, omit=None):
+    """``prune_serializer`` appliqué à une représentation déjà construite (dictionnaire ou liste)"""
+    if isinstance(data, list):
+        return [prune_data(item, fields, omit) for item in data]
+    if not isinstance(data, dict) or (fields is None and omit is None):
+        return data
+    return {
+        name: prune_data(value, _subtree(fields, name), _subtree(omit, name))
+        for name, value in data.items()
+        if _keep(name, fields, omit)
+    }
+
+
+def _is_column(model, path):
+    """``path`` (``'category__name'``) désigne-t-il une colonne atteignable par clés étrangères ?"""
+    names = path.split('__')
+    for index, name in enumerate(names):
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return False
+        if not field.concrete or (field.many_to_many or field.one_to_many):
+            return False
+        if index < len(names) - 1:
+            if not field.is_relation:
+                return False
+            model = field.related_model
+    return True
+
+
+def serializer_sources(serializer):
+    """
+    Chemins des colonnes lues par les champs de ``serializer`` (pour ``.only()``),
+    ou ``None`` si un champ ne peut pas être résolu.
+    
+    Les listes imbriquées (relations inverses) sont préchargées par une autre
+    requête et ne sont pas incluses.
+    """
+    if isinstance(serializer, ListSerializer):
+        serializer = serializer.child
+    model = serializer.Meta.model
+    declared = getattr(serializer, 'source_fields', {})
+    paths = set()
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if name in declared:
+            paths.update(declared[name])
+            continue
+        if isinstance(field, ListSerializer):
+            continue
+        source = field.source.replace('.', '__')
+        if isinstance(field, BaseSerializer):
+            nested = serializer_sources(field)
+            if nested is None:
+                return None
+            paths.add(source)
+            paths.update(f'{source}__{path}' for path in nested)
+        elif field.source != '*' and _is_column(model, source):
+            paths.add(source)
+        else:
+            return None
+    return paths
+
+
+def only_requested(queryset, serializer, required=()):
+    """``queryset.only()`` sur les colonnes de ``serializer`` et les colonnes ``required``"""
+    paths = serializer_sources(serializer)
+    if paths is None:
+        return queryset
+    return queryset.only(*paths, *required)
+
+
+class SparseFieldsetMixin:
+    """
+    ``?fields=`` / ``?omit=`` pour un ViewSet : serializers élagués et
+    colonnes limitées par ``.only()``.
+    
+    ``sparse_required_fields`` : colonnes dont la vue elle-même a besoin
+    (validateurs ETag, tri de la pagination par clé...).
+    """
+    sparse_required_fields = ()
+    
+    def get_fieldsets(self):
+        if not hasattr(self, '_fieldsets'):
+            self._fieldsets = requested_fieldsets(self.request)
+        return self._fieldsets
+    
+    def wants_sparse_fieldsets(self):
+        return self.get_fieldsets() != (None, None)
+    
+    def sparse(self, serializer, path=()):
+        """Élague ``serializer`` selon la requête (``path`` : sous-arbre, ex. ``('items',)``)"""
+        fields, omit = self.get_fieldsets()
+        for name in path:
+            fields, omit = _subtree(fields, name), _subtree(omit, name)
+        prune_serializer(serializer, fields, omit)
+        return serializer
+    
+    def sparse_queryset(self, queryset, serializer_class, context=None, required=None, path=()):
+        """
+        ``.only()`` sur les colonnes lues par ``serializer_class`` une fois élagué
+        et sur ``required`` (par défaut ``sparse_required_fields``).
+        """
+        if not self.wants_sparse_fieldsets():
+            return queryset
+        serializer = self.sparse(serializer_class(context=context or {}), path)
+        if required is None:
+            required = self.sparse_required_fields
+        return only_requested(queryset, serializer, required)
+    
+    def get_read_queryset(self, queryset):
+        """``sparse_queryset`` pour les lectures (les écritures chargent l'objet entier)"""
+        if self.request.method not in ('GET', 'HEAD'):
+            return queryset
+        return self.sparse_queryset(queryset, self.get_serializer_class(), self.get_serializer_context())
+    
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if self.request.method in ('GET', 'HEAD') and self.wants_sparse_fieldsets():
+            self.sparse(serializer)
+        return serializer
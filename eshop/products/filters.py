@@ -0,0 +1,50 @@
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+from .search import search_products
+
+
+def filter_price_and_stock(queryset, params):
+    """Filtres ``?min_price=``, ``?max_price=`` et ``?in_stock_only=true`` des produits"""
+    # Filtre par prix minimum et maximum
+    min_price = params.get('min_price')
+    max_price = params.get('max_price')
+    
+    if min_price:
+        try:
+            queryset = queryset.filter(price__gte=float(min_price))
+        except ValueError:
+            pass
+    
+    if max_price:
+        try:
+            queryset = queryset.filter(price__lte=float(max_price))
+        except ValueError:
+            pass
+    
+    # Filtre pour les produits en stock seulement
+    in_stock_only = params.get('in_stock_only')
+    if in_stock_only and in_stock_only.lower() == 'true':
+        queryset = queryset.filter(stock__gt=0, is_available=True)
+    
+    return queryset
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """
+    ``?search=`` servi par l'index plein texte au lieu des ``icontains``.
+    
+    À placer après ``OrderingFilter`` : les résultats sont classés par
+    pertinence, sauf si le client demande explicitement un ``?ordering=``.
+    """
+    
+    def filter_queryset(self, request, queryset, view):
+        search_terms = self.get_search_terms(request)
+        if not search_terms:
+            return queryset
+        
+        ordering = queryset.query.order_by
+        queryset = search_products(queryset, ' '.join(search_terms))
+        if request.query_params.get(api_settings.ORDERING_PARAM) and ordering:
+            queryset = queryset.order_by(*ordering)
+        return queryset
@@ -0,0 +1,185 @@
+"""
+Déclinaisons (renditions) des images produits.
+
+Chaque image est déclinée en largeurs fixes (``RENDITION_WIDTHS``) et en
+WebP / JPEG, à l'enregistrement d'une nouvelle image ou en masse via
+``generate_image_renditions``. À l'enregistrement, le travail est confié
+après validation de la transaction à un fil de fond du processus : la requête
+(upload, admin) n'attend pas l'encodage. Une tâche perdue (arrêt du
+processus, ``IMAGE_RENDITIONS_ON_SAVE=False``) est rattrapée par la
+commande. Les chemins
+générés sont mémorisés dans ``Product.image_renditions`` : les serializers
+construisent le ``srcset`` sans jamais interroger le stockage, et une image
+sans déclinaisons est simplement servie en original.
+"""
+import logging
+import os
+import queue
+import threading
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+
+RENDITION_WIDTHS = (160, 320, 640)
+RENDITION_FORMATS = {
+    # format : (extension, options d'encodage Pillow)
+    'webp': ('webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+RENDITIONS_DIR = 'renditions'
+# Image absente, illisible, tronquée ou trop grande (bombe de décompression)
+RENDITION_ERRORS = (OSError, ValueError, EOFError, SyntaxError, Image.DecompressionBombError)
+
+logger = logging.getLogger(__name__)
+
+
+def rendition_name(image_name, width, image_format):
+    """``products/ab/abc.jpg`` -> ``renditions/products/ab/abc-320w.webp``"""
+    root, _ = os.path.splitext(image_name)
+    extension, _ = RENDITION_FORMATS[image_format]
+    return f'{RENDITIONS_DIR}/{root}-{width}w.{extension}'
+
+
+def _flatten(image):
+    """JPEG n'a pas de transparence : fond blanc"""
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB') if image.mode != 'RGB' else image
+
+
+def generate_renditions(image_name, storage=None):
+    """
+    Génère les déclinaisons d'une image du stockage et retourne leur description
+    (valeur de ``Product.image_renditions``).
+    
+    Les largeurs supérieures à celle de l'original ne sont pas générées
+    (pas d'agrandissement).
+    """
+    storage = storage or default_storage
+    with storage.open(image_name, 'rb') as f:
+        original = ImageOps.exif_transpose(Image.open(f))
+        original.load()
+    
+    renditions = {'source': image_name}
+    for width in RENDITION_WIDTHS:
+        if width >= original.width:
+            break
+        height = max(1, round(original.height * width / original.width))
+        resized = original.resize((width, height), Image.LANCZOS)
+        for image_format, (_, save_options) in RENDITION_FORMATS.items():
+            image = resized if image_format == 'webp' else _flatten(resized)
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA')
+            buffer = BytesIO()
+            image.save(buffer, format=image_format.upper(), **save_options)
+            name = rendition_name(image_name, width, image_format)
+            if storage.exists(name):
+                storage.delete(name)
+            storage.save(name, ContentFile(buffer.getvalue()))
+            renditions.setdefault(image_format, {})[str(width)] = name
+    return renditions
+
+
+def renditions_are_current(product):
+    """Les déclinaisons enregistrées correspondent-elles à l'image actuelle ?"""
+    renditions = product.image_renditions or {}
+    return bool(product.image) and renditions.get('source') == product.image.name
+
+
+def update_product_renditions(product_id, image_name):
+    """Génère et enregistre les déclinaisons si le produit a toujours cette image"""
+    from .cache import bump_catalog_version
+    from .models import Product
+    
+    try:
+        renditions = generate_renditions(image_name)
+    except RENDITION_ERRORS:
+        # Image absente ou illisible : l'original reste servi, la commande de rattrapage réessaiera
+        logger.exception('Déclinaisons impossibles pour %s', image_name)
+        return
+    updated = Product.objects.filter(pk=product_id, image=image_name).update(
+        image_renditions=renditions,
+        # Les déclinaisons font partie de la représentation (ETag / Last-Modified)
+        updated_at=timezone.now()
+    )
+    if updated:
+        bump_catalog_version()
+
+
+_queue = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def _reset_worker():
+    # Un processus fils (fork) n'hérite pas du fil : il démarre le sien
+    global _queue, _worker
+    _queue, _worker = queue.Queue(), None
+
+
+os.register_at_fork(after_in_child=_reset_worker)
+
+
+def _run_worker(jobs):
+    while True:
+        product_id, image_name = jobs.get()
+        try:
+            update_product_renditions(product_id, image_name)
+        except Exception:
+            # Une erreur (base verrouillée...) ne doit pas arrêter le fil
+            logger.exception('Échec des déclinaisons de %s', image_name)
+        finally:
+            connections.close_all()
+            jobs.task_done()
+
+
+def enqueue_renditions(product_id, image_name):
+    """Confie la génération au fil de fond du processus (démarré au premier appel)"""
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run_worker, args=(_queue,), name='image-renditions', daemon=True)
+            _worker.start()
+    _queue.put((product_id, image_name))
+
+
+def schedule_renditions(product):
+    """Déclinaisons de la nouvelle image, générées en fond après validation de la transaction"""
+    if not getattr(settings, 'IMAGE_RENDITIONS_ON_SAVE', True):
+        return
+    if not product.image or renditions_are_current(product):
+        return
+    product_id, image_name = product.pk, product.image.name
+    transaction.on_commit(lambda: enqueue_renditions(product_id, image_name))
+
+
+def product_srcset(product, build_url):
+    """
+    ``{'webp': {'160': url, ...}, 'jpeg': {...}}`` d'après la description
+    enregistrée ; dictionnaire vide si les déclinaisons manquent ou
+    correspondent à une image précédente (le client utilise alors l'original).
+    """
+    if not product.image:
+        return {}
+    return renditions_srcset(product.image.name, product.image_renditions, build_url)
+
+
+def renditions_srcset(image_name, renditions, build_url):
+    """``product_srcset`` à partir des valeurs brutes des colonnes (lignes ``.values()``)"""
+    renditions = renditions or {}
+    if not image_name or renditions.get('source') != image_name:
+        return {}
+    return {
+        image_format: {width: build_url(name) for width, name in renditions[image_format].items()}
+        for image_format in RENDITION_FORMATS
+        if image_format in renditions
+    }
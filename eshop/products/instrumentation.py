@@ -0,0 +1,277 @@
+"""
+Instrumentation SQL par requête (``SQL_INSTRUMENTATION``).
+
+Pour chaque requête échantillonnée (``SQL_INSTRUMENTATION_SAMPLE_RATE``), le
+middleware compte les requêtes SQL, leur durée cumulée, le temps de rendu
+de la réponse (sérialisation JSON) et repère les requêtes répétées : même
+empreinte (SQL sans les valeurs, listes ``IN`` réduites) exécutée au moins
+``SQL_INSTRUMENTATION_DUPLICATE_THRESHOLD`` fois, signe d'un N+1. Le site
+d'appel (premier cadre du projet hors dépendances) est relevé à la première
+répétition seulement.
+
+Les mesures sont renvoyées dans l'en-tête ``Server-Timing`` et journalisées
+(logger ``products.instrumentation``, une ligne JSON par requête,
+``WARNING`` si des répétitions sont détectées). Désactivé, le middleware
+est retiré de la chaîne (``MiddlewareNotUsed``) ; non échantillonnée, une
+requête ne paie qu'un tirage aléatoire.
+"""
+import json
+import logging
+import os
+import random
+import re
+import sys
+import time
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import metrics
+
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ATTRIBUTE = 'sql_profile'
+# Longueur maximale d'une empreinte dans les journaux
+FINGERPRINT_LOG_LENGTH = 300
+
+_IN_LIST = re.compile(r'\((?:%s|\?)(?:,\s*(?:%s|\?))+\)')
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'(?<![\w."])\d+(?:\.\d+)?\b')
+# Contrôle de transaction : jamais signalé comme répétition
+_TRANSACTION_CONTROL = re.compile(r'\s*(?:BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE)\b', re.IGNORECASE)
+# Modules du projet traversés par chaque requête SQL (execute_wrapper)
+_INTERNAL_FILES = (__file__, metrics.__file__)
+
+
+def fingerprint(sql):
+    """SQL sans ses valeurs : ``IN (%s, %s, %s)`` -> ``IN (...)``, littéraux -> ``?``"""
+    sql = _IN_LIST.sub('(...)', sql)
+    sql = _STRING_LITERAL.sub('?', sql)
+    return _NUMBER_LITERAL.sub('?', sql)
+
+
+def _call_site():
+    """Premier cadre de la pile appartenant au projet (ni dépendance, ni execute_wrapper)"""
+    root = str(settings.BASE_DIR) + os.sep
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(root) and filename not in _INTERNAL_FILES and 'site-packages' not in filename:
+            return f'{os.path.relpath(filename, root)}:{frame.f_lineno} ({frame.f_code.co_name})'
+        frame = frame.f_back
+    return None
+
+
+class RequestProfile:
+    """Mesures SQL et de rendu d'une requête"""
+    
+    def __init__(self, duplicate_threshold=2):
+        self.duplicate_threshold = duplicate_threshold
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.counts = {}
+        self.call_sites = {}
+        self._render_started_at = None
+    
+    def __call__(self, execute, sql, params, many, context):
+        """``execute_wrapper`` installé sur chaque connexion pendant la requête"""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.record(sql, time.perf_counter() - started)
+    
+    def record(self, sql, duration):
+        self.db_time += duration
+        self.queries += 1
+        if _TRANSACTION_CONTROL.match(sql):
+            return
+        key = fingerprint(sql)
+        count = self.counts.get(key, 0) + 1
+        self.counts[key] = count
+        if count == 2:
+            self.call_sites[key] = _call_site()
+    
+    def install(self):
+        """
+        Branche la mesure sur les connexions du fil courant (les connexions
+        sont propres à chaque fil : en ASGI, appeler via ``sync_to_async``)
+        """
+        self._wrappers = ExitStack()
+        for connection in connections.all():
+            self._wrappers.enter_context(connection.execute_wrapper(self))
+    
+    def uninstall(self):
+        self._wrappers.close()
+        self.finished_at = time.perf_counter()
+    
+    @contextmanager
+    def capture(self):
+        self.install()
+        try:
+            yield self
+        finally:
+            self.uninstall()
+    
+    def render_started(self):
+        self._render_started_at = time.perf_counter()
+    
+    def render_finished(self, response=None):
+        if self._render_started_at is not None:
+            self.serialize_time += time.perf_counter() - self._render_started_at
+            self._render_started_at = None
+    
+    @property
+    def total_time(self):
+        return (self.finished_at or time.perf_counter()) - self.started_at
+    
+    @property
+    def duplicates(self):
+        """Empreintes répétées, de la plus fréquente à la moins fréquente"""
+        return sorted(
+            (
+                {'sql': sql, 'count': count, 'call_site': self.call_sites.get(sql)}
+                for sql, count in self.counts.items()
+                if count >= self.duplicate_threshold
+            ),
+            key=lambda duplicate: -duplicate['count']
+        )
+    
+    def server_timing(self):
+        """Valeur de l'en-tête ``Server-Timing`` (durées en millisecondes)"""
+        metrics = [f'db;dur={self.db_time * 1000:.2f};desc="{self.queries} queries"']
+        duplicated = sum(duplicate['count'] for duplicate in self.duplicates)
+        if duplicated:
+            metrics.append(f'db-dup;desc="{duplicated} duplicated queries"')
+        metrics.append(f'serialize;dur={self.serialize_time * 1000:.2f}')
+        metrics.append(f'total;dur={self.total_time * 1000:.2f}')
+        return ', '.join(metrics)
+    
+    def as_dict(self):
+        return {
+            'queries': self.queries,
+            'db_ms': round(self.db_time * 1000, 2),
+            'serialize_ms': round(self.serialize_time * 1000, 2),
+            'total_ms': round(self.total_time * 1000, 2),
+            'duplicates': [
+                {**duplicate, 'sql': duplicate['sql'][:FINGERPRINT_LOG_LENGTH]}
+                for duplicate in self.duplicates
+            ],
+        }
+
+
+def view_name(request):
+    """Nom de la route résolue (``category-list``), à défaut le chemin de la vue"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    return match.view_name or match._func_path
+
+
+class SQLInstrumentationMiddleware:
+    """
+    Mesure SQL et rendu des requêtes échantillonnées (à placer en tête de
+    ``MIDDLEWARE`` pour que ``total`` couvre toute la chaîne)
+    """
+    sync_capable = True
+    async_capable = True
+    
+    def __init__(self, get_response):
+        if not getattr(settings, 'SQL_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'SQL_INSTRUMENTATION_SAMPLE_RATE', 1.0)
+        self.duplicate_threshold = getattr(settings, 'SQL_INSTRUMENTATION_DUPLICATE_THRESHOLD', 2)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+    
+    def sampled(self):
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+    
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+        profile = self.start(request)
+        profile.install()
+        try:
+            response = self.get_response(request)
+        except Exception:
+            profile.uninstall()
+            raise
+        response['Server-Timing'] = profile.server_timing()
+        if response.streaming and not response.is_async:
+            response.streaming_content = self.stream(response.streaming_content, request, response, profile)
+        else:
+            profile.uninstall()
+            self.log(request, response, profile)
+        return response
+    
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+        profile = self.start(request)
+        await sync_to_async(profile.install)()
+        try:
+            response = await self.get_response(request)
+        except Exception:
+            await sync_to_async(profile.uninstall)()
+            raise
+        response['Server-Timing'] = profile.server_timing()
+        if response.streaming and response.is_async:
+            response.streaming_content = self.astream(response.streaming_content, request, response, profile)
+        else:
+            await sync_to_async(profile.uninstall)()
+            self.log(request, response, profile)
+        return response
+    
+    def start(self, request):
+        profile = RequestProfile(self.duplicate_threshold)
+        setattr(request, PROFILE_ATTRIBUTE, profile)
+        return profile
+    
+    def process_template_response(self, request, response):
+        """Chronomètre le rendu des réponses DRF (``Response`` est rendue après la vue)"""
+        profile = getattr(request, PROFILE_ATTRIBUTE, None)
+        if profile is not None:
+            profile.render_started()
+            response.add_post_render_callback(profile.render_finished)
+        return response
+    
+    # Réponses diffusées : les requêtes du corps sont exécutées après la vue.
+    # ``Server-Timing`` ne couvre que la vue ; le journal couvre toute la diffusion.
+    
+    def stream(self, content, request, response, profile):
+        try:
+            yield from content
+        finally:
+            profile.uninstall()
+            self.log(request, response, profile)
+    
+    async def astream(self, content, request, response, profile):
+        try:
+            async for chunk in content:
+                yield chunk
+        finally:
+            await sync_to_async(profile.uninstall)()
+            self.log(request, response, profile)
+    
+    def log(self, request, response, profile):
+        payload = {
+            'event': 'sql_profile',
+            'method': request.method,
+            'path': request.path,
+            'view': view_name(request),
+            'status': response.status_code,
+            **profile.as_dict(),
+        }
+        level = logging.WARNING if payload['duplicates'] else logging.INFO
+        logger.log(level, json.dumps(payload, ensure_ascii=False), extra={PROFILE_ATTRIBUTE: payload})
@@ -0,0 +1,234 @@
+"""
+Générateur de charge HTTP minimal (asyncio, HTTP/1.1 keep-alive).
+
+Sans dépendance : ``concurrency`` clients virtuels enchaînent des requêtes
+pendant ``duration`` secondes, chacun sur sa connexion et avec ses cookies
+(session). Chaque latence est mesurée de l'envoi de la requête à la lecture
+complète du corps (``Content-Length``, ``chunked`` ou fermeture de la
+connexion pour les réponses diffusées) et rangée sous un
+libellé (l'endpoint).
+"""
+import asyncio
+import itertools
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from http.cookies import SimpleCookie
+from urllib.parse import urlsplit
+
+
+@dataclass
+class LoadResult:
+    url: str
+    concurrency: int
+    elapsed: float = 0.0
+    latencies: list = field(default_factory=list)
+    errors: int = 0
+    statuses: dict = field(default_factory=dict)
+    
+    @property
+    def requests(self):
+        return len(self.latencies)
+    
+    @property
+    def rps(self):
+        return self.requests / self.elapsed if self.elapsed else 0.0
+    
+    def percentile(self, percent):
+        """Latence (ms) au centile ``percent``"""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+        return ordered[index] * 1000
+    
+    def record(self, status, latency):
+        self.latencies.append(latency)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if status >= 400:
+            self.errors += 1
+    
+    def merge(self, other):
+        """Ajoute les mesures d'un autre processus (même durée, en parallèle)"""
+        self.latencies.extend(other.latencies)
+        self.errors += other.errors
+        self.concurrency += other.concurrency
+        self.elapsed = max(self.elapsed, other.elapsed)
+        for status, count in other.statuses.items():
+            self.statuses[status] = self.statuses.get(status, 0) + count
+    
+    def as_dict(self):
+        return {
+            'url': self.url,
+            'concurrency': self.concurrency,
+            'requests': self.requests,
+            'errors': self.errors,
+            'statuses': self.statuses,
+            'rps': round(self.rps, 1),
+            'p50_ms': round(self.percentile(50), 2),
+            'p90_ms': round(self.percentile(90), 2),
+            'p95_ms': round(self.percentile(95), 2),
+            'p99_ms': round(self.percentile(99), 2),
+        }
+
+
+@dataclass
+class Response:
+    status: int
+    headers: dict
+    body: bytes
+    
+    def json(self):
+        return json.loads(self.body)
+
+
+async def _read_body(reader, status, headers):
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            chunks.append((await reader.readexactly(size + 2))[:-2])
+            if size == 0:
+                return b''.join(chunks)
+    length = headers.get('content-length')
+    if length is not None:
+        return await reader.readexactly(int(length))
+    if status in (204, 304) or status < 200:
+        return b''
+    # Réponse diffusée sans longueur : le corps s'arrête à la fermeture de la connexion
+    headers['connection'] = 'close'
+    return await reader.read()
+
+
+class Session:
+    """
+    Client virtuel : connexion keep-alive (rouverte si le serveur la ferme)
+    et cookies renvoyés d'une requête à l'autre.
+    """
+    
+    def __init__(self, base_url, results, deadline, headers=None):
+        self.url_parts = urlsplit(base_url)
+        self.prefix = self.url_parts.path.rstrip('/')
+        self.results = results
+        self.deadline = deadline
+        self.headers = ''.join(f'{name}: {value}\r\n' for name, value in (headers or {}).items())
+        self.cookies = {}
+        self.connection = None
+    
+    @property
+    def expired(self):
+        return time.monotonic() >= self.deadline
+    
+    def close(self):
+        if self.connection is not None:
+            self.connection[1].close()
+            self.connection = None
+    
+    async def request(self, method, path, data=None, label=None):
+        """
+        Envoie une requête (``data`` : corps JSON) et mesure sa latence sous
+        ``label`` (par défaut le chemin). Retourne ``None`` en cas d'erreur réseau.
+        """
+        label = label or path
+        result = self.results.get(label)
+        if result is None:
+            result = self.results[label] = LoadResult(url=label, concurrency=0)
+        
+        body = json.dumps(data).encode() if data is not None else b''
+        head = f'{method} {self.prefix}{path} HTTP/1.1\r\nHost: {self.url_parts.netloc}\r\n{self.headers}'
+        if self.cookies:
+            head += 'Cookie: ' + '; '.join(f'{name}={value}' for name, value in self.cookies.items()) + '\r\n'
+        if data is not None:
+            head += 'Content-Type: application/json\r\n'
+        if body or method in ('POST', 'PUT', 'PATCH', 'DELETE'):
+            head += f'Content-Length: {len(body)}\r\n'
+        request_bytes = (head + 'Connection: keep-alive\r\n\r\n').encode('latin-1') + body
+        
+        started = time.perf_counter()
+        try:
+            if self.connection is None:
+                self.connection = await asyncio.open_connection(self.url_parts.hostname, self.url_parts.port or 80)
+            response = await self._exchange(request_bytes)
+        except (OSError, ValueError, IndexError, asyncio.IncompleteReadError):
+            result.errors += 1
+            self.close()
+            return None
+        result.record(response.status, time.perf_counter() - started)
+        if response.headers.get('connection', '').lower() == 'close':
+            self.close()
+        return response
+    
+    async def _exchange(self, request_bytes):
+        reader, writer = self.connection
+        writer.write(request_bytes)
+        await writer.drain()
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError('Connexion fermée par le serveur')
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            name, value = name.strip().lower(), value.strip()
+            if name == 'set-cookie':
+                for morsel in SimpleCookie(value).values():
+                    if morsel.value and morsel['max-age'] != '0':
+                        self.cookies[morsel.key] = morsel.value
+                    else:
+                        self.cookies.pop(morsel.key, None)
+            headers[name] = value
+        return Response(status, headers, await _read_body(reader, status, headers))
+
+
+async def run_scenario(base_url, scenario, concurrency=100, duration=10.0, seed=0, headers=None):
+    """
+    ``concurrency`` clients exécutent ``scenario(session, rng)`` en boucle
+    pendant ``duration`` secondes ; retourne ``{libellé: LoadResult}``.
+    
+    ``rng`` (``random.Random``) est propre à chaque client et déterministe.
+    """
+    results = {}
+    started = time.monotonic()
+    deadline = started + duration
+    
+    async def client(number):
+        session = Session(base_url, results, deadline, headers)
+        rng = random.Random(f'{seed}:{number}')
+        try:
+            while not session.expired:
+                await scenario(session, rng)
+        finally:
+            session.close()
+    
+    await asyncio.gather(*(client(number) for number in range(concurrency)))
+    elapsed = time.monotonic() - started
+    for result in results.values():
+        result.elapsed = elapsed
+        result.concurrency = concurrency
+    return results
+
+
+async def run_load(url, concurrency=100, duration=10.0, vary_query=False, headers=None):
+    """
+    Charge ``url`` (GET) avec ``concurrency`` connexions pendant ``duration`` secondes.
+    
+    ``vary_query`` ajoute un paramètre unique à chaque requête (pour ne pas
+    mesurer uniquement des réponses en cache).
+    """
+    url_parts = urlsplit(url)
+    path = url_parts.path or '/'
+    if url_parts.query:
+        path = f'{path}?{url_parts.query}'
+    separator = '&' if url_parts.query else '?'
+    counter = itertools.count()
+    
+    async def scenario(session, rng):
+        await session.request('GET', f'{path}{separator}_={next(counter)}' if vary_query else path, label=url)
+    
+    base_url = f'{url_parts.scheme}://{url_parts.netloc}'
+    results = await run_scenario(base_url, scenario, concurrency, duration, headers=headers)
+    return results.get(url) or LoadResult(url=url, concurrency=concurrency, elapsed=duration)
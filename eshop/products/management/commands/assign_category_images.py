@@ -1,11 +1,12 @@
 from django.core.management.base import BaseCommand
 from products.models import Product
+from products.cache import bump_catalog_version
 import random
 
 
 class Command(BaseCommand):
     help = 'Attribue des images existantes aux produits sans image selon leur catégorie'
-
+    
     def handle(self, *args, **options):
         self.stdout.write('🖼️ Attribution d\'images aux produits sans image...')
         
@@ -75,6 +76,9 @@ class Command(BaseCommand):
         products_with_images = Product.objects.exclude(image__in=['', None]).count()
         total_products = Product.objects.count()
         
+        # Invalider les réponses du catalogue en cache
+        bump_catalog_version()
+        
         self.stdout.write(f'🎉 Attribution terminée! {success_count} images attribuées.')
         self.stdout.write(f'📊 {products_with_images}/{total_products} produits ont maintenant des images')
         
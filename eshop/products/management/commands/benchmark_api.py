@@ -0,0 +1,185 @@
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from products import benchmarks, urls
+from products.models import Category, Product
+from products.synthetic import DEFAULT_BATCH_SIZE, seed_catalog
+
+
+class Command(BaseCommand):
+    help = (
+        'Charge chaque route de products/urls.py (lectures avec chaque filtre et tri, '
+        'cycles complets du panier) et enregistre req/s et latences p50/p95/p99 en JSON. '
+        'Le serveur doit être lancé sur la même base, par ex. : '
+        'gunicorn eshop_backend.wsgi -w 4 -b 127.0.0.1:8000'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--base-url',
+            default='http://127.0.0.1:8000',
+            help='Adresse du serveur à charger'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=50,
+            help='Nombre de clients simultanés (répartis entre les processus)'
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=5.0,
+            help='Durée de chaque scénario (secondes)'
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=1,
+            help='Processus générateurs de charge (et d\'écriture du catalogue synthétique)'
+        )
+        parser.add_argument(
+            '--scenario',
+            action='append',
+            help='Ne lance que les scénarios dont le libellé contient ce texte (répétable)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Graine du catalogue synthétique et des tirages des clients'
+        )
+        parser.add_argument(
+            '--seed-products',
+            type=int,
+            default=0,
+            help='Génère d\'abord ce nombre de produits synthétiques (jusqu\'à 1 000 000)'
+        )
+        parser.add_argument(
+            '--seed-categories',
+            type=int,
+            default=1000,
+            help='Nombre de catégories du catalogue synthétique'
+        )
+        parser.add_argument(
+            '--output',
+            help='Fichier JSON des résultats (défaut : benchmarks/<date>-<commit>.json)'
+        )
+        parser.add_argument(
+            '--compare',
+            help='Fichier JSON d\'un run précédent à comparer'
+        )
+        parser.add_argument(
+            '--list',
+            action='store_true',
+            help='Affiche les scénarios et les routes couvertes, sans rien lancer'
+        )
+    
+    def handle(self, *args, **options):
+        names = [
+            name for name in benchmarks.scenario_names()
+            if not options['scenario'] or any(text in name for text in options['scenario'])
+        ]
+        uncovered = benchmarks.registered_routes(urls.urlpatterns) - benchmarks.covered_routes()
+        if uncovered:
+            self.stdout.write(f'⚠️ Routes sans scénario : {", ".join(sorted(uncovered))}')
+        if options['list']:
+            for name in names:
+                self.stdout.write(f'  {name}')
+            return
+        if not names:
+            raise CommandError('Aucun scénario ne correspond à --scenario')
+        
+        if options['seed_products']:
+            self.stdout.write(
+                f'🏭 Catalogue synthétique : {options["seed_products"]} produits, '
+                f'{options["seed_categories"]} catégories (graine {options["seed"]})...'
+            )
+            stats = seed_catalog(
+                options['seed_products'], options['seed_categories'], seed=options['seed'],
+                batch_size=DEFAULT_BATCH_SIZE, workers=options['processes'],
+                progress=lambda stats: self.stdout.write(f'⏳ {stats.products} produits ({stats.rate:.0f}/s)'),
+            )
+            self.stdout.write(f'✅ {stats.products} produits générés en {stats.elapsed:.1f}s')
+        
+        catalog = benchmarks.sample_catalog(seed=options['seed'])
+        if not catalog['product_ids']:
+            raise CommandError('Catalogue vide : utilisez --seed-products')
+        
+        rows = []
+        for name in names:
+            self.stdout.write(f'⏳ {name}')
+            results = benchmarks.run_benchmark(
+                options['base_url'], name, catalog,
+                concurrency=options['concurrency'], duration=options['duration'],
+                processes=options['processes'], seed=options['seed'],
+            )
+            for label, result in results.items():
+                rows.append({'scenario': name, 'endpoint': label, **result.as_dict()})
+        
+        report = {'meta': self.metadata(options), 'results': rows}
+        output = Path(options['output'] or self.default_output(report['meta']))
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+        
+        baseline = self.load_baseline(options['compare'])
+        self.print_table(rows, baseline)
+        self.stdout.write(f'💾 Résultats enregistrés dans {output}')
+    
+    def metadata(self, options):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, cwd=settings.BASE_DIR
+            ).stdout.strip() or None
+        except OSError:
+            commit = None
+        return {
+            'commit': commit,
+            'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'base_url': options['base_url'],
+            'concurrency': options['concurrency'],
+            'duration': options['duration'],
+            'processes': options['processes'],
+            'seed': options['seed'],
+            'products': Product.objects.count(),
+            'categories': Category.objects.count(),
+            'database': settings.DATABASES['default']['ENGINE'].rsplit('.', 1)[-1],
+            'python': platform.python_version(),
+        }
+    
+    def default_output(self, meta):
+        stamp = meta['date'].replace(':', '').replace('-', '').replace('+0000', '')
+        return settings.BASE_DIR / 'benchmarks' / f'{stamp}-{meta["commit"] or "local"}.json'
+    
+    def load_baseline(self, path):
+        if not path:
+            return {}
+        try:
+            report = json.loads(Path(path).read_text())
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Impossible de lire {path}: {e}')
+        return {row['endpoint']: row for row in report['results']}
+    
+    def print_table(self, rows, baseline):
+        self.stdout.write('')
+        self.stdout.write(
+            f'{"endpoint":<52} {"req/s":>8} {"p50":>8} {"p95":>8} {"p99":>8} {"err":>5}'
+            + ('   Δ req/s   Δ p99' if baseline else '')
+        )
+        for row in rows:
+            line = (
+                f'{row["endpoint"]:<52} {row["rps"]:>8.1f} {row["p50_ms"]:>8.2f} '
+                f'{row["p95_ms"]:>8.2f} {row["p99_ms"]:>8.2f} {row["errors"]:>5}'
+            )
+            previous = baseline.get(row['endpoint'])
+            if previous and previous['rps']:
+                line += (
+                    f'   {(row["rps"] / previous["rps"] - 1) * 100:>+6.1f}%'
+                    f'   {row["p99_ms"] - previous["p99_ms"]:>+7.2f} ms'
+                )
+            self.stdout.write(line)
@@ -0,0 +1,102 @@
+import asyncio
+import json
+
+from django.core.management.base import BaseCommand
+from products.loadgen import run_load
+
+
+# (endpoint WSGI/DRF, endpoint ASGI/async)
+ENDPOINT_PAIRS = [
+    ('/api/products/', '/api/async/products/'),
+    ('/api/products/?page_size=100', '/api/async/products/?page_size=100'),
+    ('/api/products/featured/', '/api/async/products/featured/'),
+    ('/api/categories/', '/api/async/categories/'),
+    ('/api/cart/summary/', '/api/async/cart/summary/'),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare requêtes/s et latences (p50/p99) des endpoints de lecture DRF (WSGI) '
+        'et de leurs versions asynchrones (ASGI). Les deux serveurs doivent être lancés, par ex. :\n'
+        '  gunicorn eshop_backend.wsgi -w 4 -b 127.0.0.1:8000\n'
+        '  uvicorn eshop_backend.asgi:application --workers 4 --port 8001'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sync-url',
+            default='http://127.0.0.1:8000',
+            help='Adresse du déploiement WSGI'
+        )
+        parser.add_argument(
+            '--async-url',
+            default='http://127.0.0.1:8001',
+            help='Adresse du déploiement ASGI'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=200,
+            help='Nombre de connexions simultanées'
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=10.0,
+            help='Durée de chaque mesure (secondes)'
+        )
+        parser.add_argument(
+            '--endpoint',
+            action='append',
+            help='Limite la mesure aux paires dont l\'endpoint DRF commence ainsi (répétable)'
+        )
+        parser.add_argument(
+            '--bust-cache',
+            action='store_true',
+            help='Ajoute un paramètre unique à chaque requête (contourne le cache des réponses)'
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Affiche les résultats en JSON'
+        )
+    
+    def handle(self, *args, **options):
+        pairs = [
+            pair for pair in ENDPOINT_PAIRS
+            if not options['endpoint'] or any(pair[0].startswith(prefix) for prefix in options['endpoint'])
+        ]
+        results = []
+        for sync_path, async_path in pairs:
+            for stack, base_url, path in (
+                ('wsgi', options['sync_url'], sync_path),
+                ('asgi', options['async_url'], async_path),
+            ):
+                if not options['json']:
+                    self.stdout.write(f'⏳ {stack} {path} ({options["concurrency"]} connexions, {options["duration"]:.0f}s)')
+                result = asyncio.run(run_load(
+                    base_url.rstrip('/') + path,
+                    concurrency=options['concurrency'],
+                    duration=options['duration'],
+                    vary_query=options['bust_cache'],
+                ))
+                results.append({'stack': stack, 'endpoint': sync_path, **result.as_dict()})
+        
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        
+        self.stdout.write('')
+        self.stdout.write(f'{"endpoint":<40} {"pile":<5} {"req/s":>9} {"p50 ms":>9} {"p99 ms":>9} {"erreurs":>8}')
+        for row in results:
+            self.stdout.write(
+                f'{row["endpoint"]:<40} {row["stack"]:<5} {row["rps"]:>9.1f} '
+                f'{row["p50_ms"]:>9.2f} {row["p99_ms"]:>9.2f} {row["errors"]:>8}'
+            )
+        for sync_row, async_row in zip(results[::2], results[1::2]):
+            if sync_row['rps']:
+                self.stdout.write(
+                    f'📊 {sync_row["endpoint"]}: ASGI ×{async_row["rps"] / sync_row["rps"]:.2f} req/s, '
+                    f'p99 {sync_row["p99_ms"]:.1f} → {async_row["p99_ms"]:.1f} ms'
+                )
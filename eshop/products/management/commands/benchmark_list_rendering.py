@@ -0,0 +1,76 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from products import renderers
+from products.models import Product
+from products.serializers import ProductListRowSerializer, ProductListSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Microbenchmark du rendu des listes de produits : ProductListSerializer + JSONRenderer '
+        'contre le mode ?render=fast (.values() + ProductListRowSerializer + orjson)'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=100,
+            help='Nombre de produits par rendu (taille de page)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=50,
+            help='Nombre de rendus par variante'
+        )
+    
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        queryset = Product.objects.select_related('category').order_by('-created_at')[:rows]
+        count = queryset.count()
+        if not count:
+            raise CommandError('Aucun produit : lancez d\'abord generate_catalog ou import_catalog')
+        request = Request(APIRequestFactory().get('/api/products/', SERVER_NAME='localhost'))
+        context = {'request': request}
+        orjson = renderers.orjson
+        
+        def standard():
+            data = ProductListSerializer(queryset.all(), many=True, context=context).data
+            return JSONRenderer().render(data)
+        
+        def fast_rows_stdlib():
+            data = ProductListRowSerializer(ProductListRowSerializer.project(queryset.all()), context=context).data
+            return renderers.stdlib_dumps(data)
+        
+        def fast():
+            data = ProductListRowSerializer(ProductListRowSerializer.project(queryset.all()), context=context).data
+            return renderers.dumps(data)
+        
+        reference = standard()
+        variants = [
+            ('ProductListSerializer + JSONRenderer', standard),
+            ('.values() + json (stdlib)', fast_rows_stdlib),
+            (f'.values() + {"orjson" if orjson else "json (orjson absent)"}', fast),
+        ]
+        for label, render in variants[1:]:
+            if render() != reference:
+                raise CommandError(f'Sortie différente de la sérialisation standard : {label}')
+        
+        self.stdout.write(f'📦 {count} produits par rendu, {repeat} rendus par variante (requête SQL comprise)')
+        baseline = None
+        for label, render in variants:
+            started = time.perf_counter()
+            for _ in range(repeat):
+                render()
+            elapsed = time.perf_counter() - started
+            rate = count * repeat / elapsed
+            baseline = baseline or rate
+            self.stdout.write(
+                f'⏱️  {label:<40} {rate:>10.0f} lignes/s  {elapsed / repeat * 1000:>7.2f} ms/rendu  ×{rate / baseline:.1f}'
+            )
+        self.stdout.write('✅ Sorties identiques octet pour octet')
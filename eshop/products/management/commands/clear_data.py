@@ -1,10 +1,11 @@
 from django.core.management.base import BaseCommand
 from products.models import Category, Product
+from products.cache import bump_catalog_version
 
 
 class Command(BaseCommand):
     help = 'Supprime toutes les données existantes'
-
+    
     def handle(self, *args, **options):
         self.stdout.write('🗑️ Suppression des données existantes...')
         
@@ -18,4 +19,7 @@ class Command(BaseCommand):
         Category.objects.all().delete()
         self.stdout.write(f'✅ {categories_count} catégories supprimées')
         
+        # Invalider les réponses du catalogue en cache
+        bump_catalog_version()
+        
         self.stdout.write('🎉 Base de données nettoyée avec succès!')
\ No newline at end of file
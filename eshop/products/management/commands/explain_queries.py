@@ -0,0 +1,108 @@
+import re
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+from products.models import Cart, CartItem, Category, Product
+from products.search import search_products
+from products.views import CategoryViewSet, ProductViewSet
+
+
+# Lignes de plan signalant un parcours complet d'une table
+FULL_SCAN_PATTERNS = {
+    'sqlite': re.compile(r'\bSCAN (?P<table>\w+)\b(?! USING)(?! VIRTUAL TABLE)'),
+    'postgresql': re.compile(r'Seq Scan on (?P<table>\w+)'),
+}
+TEMP_SORT_PATTERN = re.compile(r'TEMP B-TREE FOR ORDER BY|Sort Key')
+
+
+class Command(BaseCommand):
+    help = 'Exécute EXPLAIN sur les requêtes représentatives de chaque endpoint et signale les parcours complets'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='Met à jour les statistiques du planificateur (ANALYZE) avant les EXPLAIN'
+        )
+        parser.add_argument(
+            '--verbose-plans',
+            action='store_true',
+            help='Affiche le plan complet de chaque requête'
+        )
+    
+    def view_queryset(self, viewset_class, action, params=None, page_size=20):
+        """Queryset construit par le ViewSet lui-même (filtres et tri compris)"""
+        view = viewset_class(action_map={'get': action}, format_kwarg=None, args=(), kwargs={})
+        view.request = view.initialize_request(RequestFactory().get('/', params or {}))
+        return view.filter_queryset(view.get_queryset())[:page_size]
+    
+    def scenarios(self):
+        category = Category.objects.order_by('id').first()
+        product = Product.objects.order_by('id').first()
+        cart = Cart.objects.order_by('id').first()
+        category_id = category.id if category else 0
+        category_slug = category.slug if category else ''
+        term = product.name.split()[0] if product else 'produit'
+        
+        yield 'GET /api/products/', self.view_queryset(ProductViewSet, 'list')
+        yield 'GET /api/products/?category=', self.view_queryset(
+            ProductViewSet, 'list', {'category': category_id}
+        )
+        yield 'GET /api/products/?featured=true', self.view_queryset(
+            ProductViewSet, 'list', {'featured': 'true'}
+        )
+        yield 'GET /api/products/?is_available=true', self.view_queryset(
+            ProductViewSet, 'list', {'is_available': 'true'}
+        )
+        for ordering in ('price', '-price', 'name', '-stock'):
+            yield f'GET /api/products/?ordering={ordering}', self.view_queryset(
+                ProductViewSet, 'list', {'ordering': ordering}
+            )
+        yield 'GET /api/products/?in_stock_only=true&min_price=&max_price=&ordering=price', self.view_queryset(
+            ProductViewSet, 'list',
+            {'in_stock_only': 'true', 'min_price': 100, 'max_price': 500, 'ordering': 'price'}
+        )
+        yield 'GET /api/products/?search=', self.view_queryset(ProductViewSet, 'list', {'search': term})
+        yield 'GET /api/products/featured/', Product.objects.select_related('category').filter(
+            featured=True, is_available=True
+        ).order_by('-created_at')[:6]
+        yield 'GET /api/products/search_advanced/?q=&category=', search_products(
+            Product.objects.select_related('category'), term
+        ).filter(category__slug=category_slug)[:20]
+        yield 'GET /api/categories/', self.view_queryset(CategoryViewSet, 'list')
+        yield 'GET /api/categories/<slug>/products/', Product.objects.filter(
+            category_id=category_id, is_available=True
+        ).order_by('-created_at')
+        yield 'GET /api/cart/ (panier de session)', Cart.objects.with_details().filter(session_key='x' * 32)
+        yield 'POST /api/cart/add_item/ (article existant)', CartItem.objects.filter(
+            cart_id=cart.id if cart else 0, product_id=product.id if product else 0
+        )
+    
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        full_scan_pattern = FULL_SCAN_PATTERNS.get(vendor)
+        if full_scan_pattern is None:
+            self.stdout.write(f'⚠️ Analyse des plans non supportée pour {vendor}')
+            return
+        
+        if options['analyze']:
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        
+        self.stdout.write(f'🔍 Plans d\'exécution ({vendor})...')
+        full_scan_count = 0
+        for label, queryset in self.scenarios():
+            plan = queryset.explain()
+            scanned_tables = sorted({match.group('table') for match in full_scan_pattern.finditer(plan)})
+            if scanned_tables:
+                full_scan_count += 1
+                self.stdout.write(f'⚠️ {label}: parcours complet de {", ".join(scanned_tables)}')
+            elif TEMP_SORT_PATTERN.search(plan):
+                self.stdout.write(f'🔃 {label}: index utilisé, tri supplémentaire')
+            else:
+                self.stdout.write(f'✅ {label}: index')
+            if options['verbose_plans']:
+                self.stdout.write(plan)
+        
+        self.stdout.write(f'📊 {full_scan_count} requêtes avec parcours complet')
@@ -0,0 +1,80 @@
+from django.core.management.base import BaseCommand, CommandError
+from products.models import Category, Product
+from products.synthetic import DEFAULT_BATCH_SIZE, seed_carts, seed_catalog
+
+
+class Command(BaseCommand):
+    help = (
+        'Génère un catalogue synthétique déterministe (catégories, produits, paniers) '
+        'par lots bulk_create, éventuellement dans plusieurs processus'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--categories',
+            type=int,
+            default=20,
+            help='Nombre de catégories'
+        )
+        parser.add_argument(
+            '--products',
+            type=int,
+            default=500,
+            help='Nombre de produits (jusqu\'à 9 999 999)'
+        )
+        parser.add_argument(
+            '--carts',
+            type=int,
+            default=0,
+            help='Nombre de sessions synthétiques ayant un panier garni'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Graine : le même seed redonne le même catalogue (sans doublons)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Nombre de produits écrits par transaction'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Processus de génération et d\'écriture des produits'
+        )
+    
+    def handle(self, *args, **options):
+        if options['categories'] < 1 and options['products']:
+            raise CommandError('Au moins une catégorie est nécessaire pour générer des produits')
+        
+        self.stdout.write(
+            f'🏭 Génération de {options["categories"]} catégories et {options["products"]} produits '
+            f'(graine {options["seed"]}, {options["workers"]} processus)...'
+        )
+        stats = seed_catalog(
+            options['products'], options['categories'], seed=options['seed'],
+            batch_size=options['batch_size'], workers=options['workers'],
+            progress=lambda stats: self.stdout.write(f'⏳ {stats.products} produits ({stats.rate:.0f}/s)'),
+        )
+        self.stdout.write(
+            f'✅ {stats.products} produits insérés en {stats.elapsed:.1f}s ({stats.rate:.0f}/s)'
+        )
+        
+        if options['carts']:
+            self.stdout.write(f'🛒 Génération de {options["carts"]} paniers...')
+            cart_stats = seed_carts(
+                options['carts'], options['products'], seed=options['seed'],
+                progress=lambda stats: self.stdout.write(f'⏳ {stats.carts} paniers'),
+            )
+            self.stdout.write(
+                f'✅ {cart_stats.carts} paniers ({cart_stats.cart_items} articles) '
+                f'créés en {cart_stats.elapsed:.1f}s'
+            )
+        
+        self.stdout.write('🎉 Catalogue synthétique prêt !')
+        self.stdout.write(f'📊 {Category.objects.count()} catégories')
+        self.stdout.write(f'📦 {Product.objects.count()} produits')
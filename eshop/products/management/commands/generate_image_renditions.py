@@ -0,0 +1,85 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from products.models import Product
+from products.cache import bump_catalog_version
+from products.images import RENDITION_ERRORS, generate_renditions, renditions_are_current
+
+
+def render_image(image_name):
+    """Exécuté dans un processus fils : aucun accès à la base"""
+    try:
+        return image_name, generate_renditions(image_name), None
+    except RENDITION_ERRORS as e:
+        return image_name, None, str(e)
+
+
+class Command(BaseCommand):
+    help = 'Génère les déclinaisons manquantes des images produits dans un pool de processus'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Nombre de processus de redimensionnement'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Régénère aussi les déclinaisons déjà à jour'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Nombre de produits par UPDATE en masse'
+        )
+    
+    def handle(self, *args, **options):
+        self.stdout.write('🖼️ Génération des déclinaisons d\'images...')
+        
+        products = [
+            product for product in Product.objects.exclude(image='').exclude(image__isnull=True).only(
+                'id', 'image', 'image_renditions'
+            )
+            if options['force'] or not renditions_are_current(product)
+        ]
+        # Une image partagée par plusieurs produits n'est traitée qu'une fois
+        image_names = sorted({product.image.name for product in products})
+        if not image_names:
+            self.stdout.write('🎉 Toutes les déclinaisons sont à jour.')
+            return
+        
+        renditions_by_image = {}
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup) as executor:
+            futures = [executor.submit(render_image, name) for name in image_names]
+            for done, future in enumerate(as_completed(futures), start=1):
+                image_name, renditions, error = future.result()
+                if error:
+                    self.stdout.write(f'❌ Erreur pour {image_name}: {error}')
+                else:
+                    renditions_by_image[image_name] = renditions
+                if done % 100 == 0:
+                    self.stdout.write(f'⏳ {done}/{len(image_names)} images')
+        
+        now = timezone.now()
+        updated = []
+        for product in products:
+            renditions = renditions_by_image.get(product.image.name)
+            if renditions is not None:
+                product.image_renditions = renditions
+                product.updated_at = now
+                updated.append(product)
+        Product.objects.bulk_update(updated, ['image_renditions', 'updated_at'], batch_size=options['batch_size'])
+        
+        # Les écritures en masse ne déclenchent pas les signaux
+        bump_catalog_version()
+        
+        self.stdout.write(
+            f'🎉 {len(renditions_by_image)}/{len(image_names)} images déclinées, '
+            f'{len(updated)} produits mis à jour.'
+        )
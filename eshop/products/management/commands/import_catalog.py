@@ -0,0 +1,222 @@
+import csv
+import json
+import sys
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+from django.utils.text import slugify
+from products.models import Category, Product
+from products.cache import bump_catalog_version
+from products import search
+
+
+# Colonnes écrites lors d'une mise à jour (``reserved`` et ``created_at`` sont conservés)
+UPDATE_FIELDS = [
+    'name', 'description', 'price', 'category', 'stock',
+    'is_available', 'featured', 'image_url', 'updated_at',
+]
+
+TRUE_VALUES = {'1', 'true', 'yes', 'oui', 'y', 'o'}
+
+
+def parse_bool(value, default):
+    if value is None or value == '':
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+class Command(BaseCommand):
+    help = 'Importe un catalogue CSV ou JSONL (fichier ou stdin) par lots, avec mise à jour sur le SKU'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'source',
+            help='Chemin du fichier à importer, ou "-" pour lire l\'entrée standard'
+        )
+        parser.add_argument(
+            '--format',
+            choices=['csv', 'jsonl'],
+            help='Format du flux (déduit de l\'extension par défaut)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Nombre de lignes écrites par transaction'
+        )
+        parser.add_argument(
+            '--no-create-categories',
+            action='store_true',
+            help='Rejette les lignes dont la catégorie n\'existe pas au lieu de la créer'
+        )
+    
+    def handle(self, *args, **options):
+        source = options['source']
+        input_format = options['format']
+        if input_format is None:
+            if source == '-':
+                raise CommandError('--format est requis pour lire l\'entrée standard')
+            input_format = 'jsonl' if source.endswith(('.jsonl', '.ndjson')) else 'csv'
+        
+        self.batch_size = options['batch_size']
+        self.create_categories = not options['no_create_categories']
+        # Correspondance slug -> id des catégories, chargée une seule fois
+        self.category_ids = dict(Category.objects.values_list('slug', 'id'))
+        # Catégories impossibles à créer (slug -> motif), rejetées sans nouvel essai
+        self.category_errors = {}
+        self.touched_category_ids = set()
+        self.imported_count = 0
+        self.error_count = 0
+        self.started_at = time.monotonic()
+        
+        self.stdout.write(f'📥 Import du catalogue ({input_format}) depuis {source}...')
+        
+        stream = sys.stdin if source == '-' else open(source, newline='', encoding='utf-8')
+        try:
+            rows = self.read_rows(stream, input_format)
+            batch = []
+            for line_number, row in rows:
+                product = self.build_product(line_number, row)
+                if product is None:
+                    continue
+                batch.append(product)
+                if len(batch) >= self.batch_size:
+                    self.write_batch(batch)
+                    batch = []
+            if batch:
+                self.write_batch(batch)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        
+        # Les écritures en masse ne déclenchent pas les signaux
+        if self.touched_category_ids:
+            Category.objects.filter(pk__in=self.touched_category_ids).recount_available_products()
+        
+        # Invalider les réponses du catalogue en cache
+        bump_catalog_version()
+        
+        elapsed = time.monotonic() - self.started_at
+        rate = self.imported_count / elapsed if elapsed else 0
+        self.stdout.write(
+            f'🎉 {self.imported_count} produits importés en {elapsed:.1f}s ({rate:.0f} lignes/s)'
+        )
+        if self.error_count:
+            self.stdout.write(f'⚠️ {self.error_count} lignes rejetées')
+    
+    def read_rows(self, stream, input_format):
+        """Itère sur ``(numéro de ligne, dict)`` sans charger le flux en mémoire"""
+        if input_format == 'csv':
+            reader = csv.DictReader(stream)
+            for row in reader:
+                yield reader.line_num, row
+            return
+        
+        for line_number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                self.reject(line_number, f'JSON invalide ({e})')
+                continue
+            if not isinstance(row, dict):
+                self.reject(line_number, 'la ligne n\'est pas un objet JSON')
+                continue
+            yield line_number, row
+    
+    def reject(self, line_number, reason):
+        self.error_count += 1
+        self.stdout.write(f'❌ Ligne {line_number}: {reason}')
+    
+    def resolve_category(self, row):
+        """
+        ``(id, None)`` de la catégorie depuis le slug (ou le nom), créée si
+        nécessaire, ou ``(None, motif)`` si elle ne peut pas l'être
+        """
+        name = (row.get('category_name') or '').strip()
+        slug = (row.get('category') or '').strip() or slugify(name)
+        if not slug:
+            return None, None
+        if slug in self.category_errors:
+            return None, self.category_errors[slug]
+        if slug not in self.category_ids and self.create_categories:
+            name = name or slug.replace('-', ' ').title()
+            try:
+                category, _ = Category.objects.get_or_create(slug=slug, defaults={'name': name})
+            except IntegrityError:
+                # Nom déjà porté par une catégorie d'un autre slug (``name`` est unique)
+                self.category_errors[slug] = f'catégorie {slug} : le nom « {name} » est déjà utilisé'
+                return None, self.category_errors[slug]
+            self.category_ids[slug] = category.id
+        return self.category_ids.get(slug), None
+    
+    def build_product(self, line_number, row):
+        sku = str(row.get('sku') or '').strip()
+        name = str(row.get('name') or '').strip()
+        if not sku or not name:
+            self.reject(line_number, 'sku et name sont obligatoires')
+            return None
+        
+        try:
+            price = Decimal(str(row.get('price')))
+            stock = int(row.get('stock') or 0)
+            # NaN et Infinity ne sont pas comparables ni enregistrables
+            if not price.is_finite():
+                raise ValueError(price)
+        except (InvalidOperation, OverflowError, TypeError, ValueError):
+            self.reject(line_number, 'prix ou stock invalide')
+            return None
+        if price < 0 or stock < 0:
+            self.reject(line_number, 'prix ou stock négatif')
+            return None
+        
+        category_id, error = self.resolve_category(row)
+        if category_id is None:
+            self.reject(line_number, error or f'catégorie inconnue pour {sku}')
+            return None
+        
+        return Product(
+            sku=sku,
+            name=name[:200],
+            description=row.get('description') or '',
+            price=price,
+            category_id=category_id,
+            stock=stock,
+            is_available=parse_bool(row.get('is_available'), True),
+            featured=parse_bool(row.get('featured'), False),
+            image_url=row.get('image_url') or None,
+        )
+    
+    def write_batch(self, batch):
+        """Insère ou met à jour un lot (upsert sur le SKU) dans sa propre transaction"""
+        # Un SKU en double dans le même lot ferait échouer l'upsert : le dernier l'emporte
+        batch = list({product.sku: product for product in batch}.values())
+        skus = [product.sku for product in batch]
+        with transaction.atomic():
+            # Catégories d'origine des produits mis à jour, à recompter elles aussi
+            self.touched_category_ids.update(
+                Product.objects.filter(sku__in=skus).values_list('category_id', flat=True).distinct()
+            )
+            Product.objects.bulk_create(
+                batch,
+                update_conflicts=True,
+                unique_fields=['sku'],
+                update_fields=UPDATE_FIELDS,
+            )
+            product_ids = [product.pk for product in batch if product.pk is not None]
+            if len(product_ids) != len(batch):
+                # Clés primaires non renvoyées par la base : relecture par SKU
+                product_ids = list(Product.objects.filter(sku__in=skus).values_list('id', flat=True))
+            search.index_products(product_ids)
+        
+        self.touched_category_ids.update(product.category_id for product in batch)
+        self.imported_count += len(batch)
+        elapsed = time.monotonic() - self.started_at
+        rate = self.imported_count / elapsed if elapsed else 0
+        self.stdout.write(f'⏳ {self.imported_count} lignes ({rate:.0f} lignes/s)')
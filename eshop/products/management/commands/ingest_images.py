@@ -0,0 +1,226 @@
+import csv
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.text import slugify
+from products.models import Product
+from products.cache import bump_catalog_version
+
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.gif'}
+STORAGE_PREFIX = 'products'
+HASH_CACHE_NAME = '.ingest_cache.json'
+CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(path):
+    """Empreinte SHA-256 du fichier, lu par blocs"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def storage_name(digest, extension):
+    """Chemin adressé par le contenu : ``products/ab/abcdef....jpg``"""
+    return f'{STORAGE_PREFIX}/{digest[:2]}/{digest}{extension}'
+
+
+class Command(BaseCommand):
+    help = 'Importe les images produits (dossier ou manifeste) dans un stockage adressé par le contenu'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'source',
+            nargs='?',
+            help='Dossier à parcourir : le nom de chaque fichier est le SKU, le slug du nom ou l\'id du produit'
+        )
+        parser.add_argument(
+            '--manifest',
+            help='Fichier CSV (colonnes image,product) associant chaque image à un produit (SKU, nom ou id)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=min(32, (os.cpu_count() or 1) + 4),
+            help='Nombre de fils pour le calcul des empreintes et la copie'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Affiche le résultat sans copier ni modifier les produits'
+        )
+    
+    def handle(self, *args, **options):
+        if not options['source'] and not options['manifest']:
+            raise CommandError('Indiquez un dossier source ou --manifest')
+        
+        self.dry_run = options['dry_run']
+        self.media_root = str(settings.MEDIA_ROOT)
+        self.stdout.write('📷 Import des images produits...')
+        
+        # Index des produits en une requête : SKU, slug du nom, nom exact, id
+        self.products = {}
+        self.product_keys = {}
+        for product in Product.objects.only('id', 'sku', 'name', 'image'):
+            self.products[product.id] = product
+            for key in (str(product.id), slugify(product.name), product.name, product.sku):
+                if key:
+                    self.product_keys.setdefault(key, product.id)
+        
+        if options['manifest']:
+            entries = self.read_manifest(options['manifest'], options['source'])
+        else:
+            entries = self.scan_directory(options['source'])
+        if not entries:
+            self.stdout.write('⚠️ Aucune image à importer')
+            return
+        
+        # Chaque fichier source n'est haché qu'une fois, même s'il sert à plusieurs produits
+        sources = sorted({source for source, _ in entries})
+        self.hash_cache = self.load_hash_cache()
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            hashes = dict(zip(sources, executor.map(self.hash_file, sources)))
+            # Un même contenu présent dans plusieurs fichiers n'est copié qu'une fois
+            names = {
+                source: storage_name(digest, os.path.splitext(source)[1].lower())
+                for source, (digest, _) in hashes.items() if digest
+            }
+            copies = {}
+            for source, name in names.items():
+                copies.setdefault(name, source)
+            copied = dict(zip(copies, executor.map(self.copy_file, copies.values(), copies)))
+        # Fichiers stockés (copiés ou déjà présents) : ``{source: nom}``
+        stored = {source: name for source, name in names.items() if copied[name] is not None}
+        hashed_count = sum(hashed for _, hashed in hashes.values())
+        copied_count = sum(bool(result) for result in copied.values())
+        
+        now = timezone.now()
+        changed = {}
+        for source, product_id in entries:
+            name = stored.get(source)
+            if name is None:
+                continue
+            product = self.products[product_id]
+            if product.image.name != name:
+                product.image.name = name
+                product.updated_at = now
+                changed[product_id] = product
+        
+        if changed and not self.dry_run:
+            Product.objects.bulk_update(list(changed.values()), ['image', 'updated_at'], batch_size=1000)
+            # Les écritures en masse ne déclenchent pas les signaux
+            bump_catalog_version()
+        if not self.dry_run:
+            self.save_hash_cache()
+        
+        unique_images = len(set(stored.values()))
+        self.stdout.write(
+            f'📊 {len(sources)} fichiers, {hashed_count} hachés, '
+            f'{unique_images} images distinctes, {copied_count} copiées'
+        )
+        self.stdout.write(f'🎉 Import terminé! {len(changed)} produits mis à jour.')
+    
+    def scan_directory(self, source_dir):
+        """Associe chaque image du dossier (récursivement) au produit dont elle porte le nom"""
+        if not os.path.isdir(source_dir):
+            raise CommandError(f'Dossier introuvable: {source_dir}')
+        
+        entries = []
+        for root, _, filenames in os.walk(source_dir):
+            for filename in filenames:
+                stem, extension = os.path.splitext(filename)
+                if extension.lower() not in IMAGE_EXTENSIONS:
+                    continue
+                product_id = self.product_keys.get(stem) or self.product_keys.get(slugify(stem))
+                if product_id is None:
+                    self.stdout.write(f'⚠️ Produit non trouvé pour {filename}')
+                    continue
+                entries.append((os.path.abspath(os.path.join(root, filename)), product_id))
+        return entries
+    
+    def read_manifest(self, manifest_path, source_dir):
+        """Lignes ``image,product`` ; les chemins relatifs partent du dossier source ou du manifeste"""
+        base_dir = source_dir or os.path.dirname(os.path.abspath(manifest_path))
+        entries = []
+        with open(manifest_path, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                image = (row.get('image') or '').strip()
+                key = (row.get('product') or '').strip()
+                product_id = self.product_keys.get(key)
+                if not image or product_id is None:
+                    self.stdout.write(f'⚠️ Ligne {reader.line_num}: produit non trouvé ({key})')
+                    continue
+                path = image if os.path.isabs(image) else os.path.join(base_dir, image)
+                if not os.path.isfile(path):
+                    self.stdout.write(f'⚠️ Ligne {reader.line_num}: image non trouvée ({path})')
+                    continue
+                entries.append((os.path.abspath(path), product_id))
+        return entries
+    
+    def hash_file(self, source):
+        """Empreinte du fichier (relue dans le cache s'il est inchangé) : ``(sha256 ou None, haché)``"""
+        try:
+            stat = os.stat(source)
+            signature = [stat.st_size, stat.st_mtime_ns]
+            cached = self.hash_cache.get(source)
+            if cached and cached[:2] == signature:
+                return cached[2], False
+            digest = file_digest(source)
+        except OSError as e:
+            self.stdout.write(f'❌ Erreur pour {source}: {e}')
+            return None, False
+        self.hash_cache[source] = signature + [digest]
+        return digest, True
+    
+    def copy_file(self, source, name):
+        """
+        Copie le fichier sous ``name`` s'il n'est pas déjà stocké.
+        
+        Retourne ``True`` (copié), ``False`` (déjà présent) ou ``None`` (erreur).
+        """
+        destination = os.path.join(self.media_root, name)
+        if self.dry_run or os.path.exists(destination):
+            return False
+        try:
+            # Copie dans un fichier temporaire puis renommage : jamais de fichier partiel
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            fd, temporary = tempfile.mkstemp(dir=os.path.dirname(destination))
+            os.close(fd)
+            try:
+                shutil.copyfile(source, temporary)
+                os.chmod(temporary, 0o644)
+                os.replace(temporary, destination)
+            except BaseException:
+                os.unlink(temporary)
+                raise
+        except OSError as e:
+            self.stdout.write(f'❌ Erreur pour {source}: {e}')
+            return None
+        return True
+    
+    def hash_cache_path(self):
+        return os.path.join(self.media_root, STORAGE_PREFIX, HASH_CACHE_NAME)
+    
+    def load_hash_cache(self):
+        """Empreintes des imports précédents, par chemin source : ``[taille, mtime_ns, sha256]``"""
+        try:
+            with open(self.hash_cache_path(), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def save_hash_cache(self):
+        path = self.hash_cache_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.hash_cache, f)
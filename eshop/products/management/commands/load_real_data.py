@@ -1,10 +1,11 @@
 from django.core.management.base import BaseCommand
 from products.models import Category, Product
+from products.cache import bump_catalog_version
 
 
 class Command(BaseCommand):
     help = 'Ajoute de vrais produits tech avec des données réalistes'
-
+    
     def handle(self, *args, **options):
         self.stdout.write('🛍️ Création de vrais produits...')
         
@@ -231,6 +232,9 @@ class Command(BaseCommand):
             if created:
                 self.stdout.write(f'✅ Produit créé: {product.name}')
         
+        # Invalider les réponses du catalogue en cache
+        bump_catalog_version()
+        
         self.stdout.write('🎉 Vrais produits créés avec succès!')
         self.stdout.write(f'📊 {Category.objects.count()} catégories')
         self.stdout.write(f'📦 {Product.objects.count()} produits')
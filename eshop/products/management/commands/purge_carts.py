@@ -0,0 +1,80 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from products.purge import (
+    DEFAULT_BATCH_SIZE, DEFAULT_PAUSE, abandoned_carts, default_empty_max_age, default_max_age, purge_carts
+)
+
+
+class Command(BaseCommand):
+    help = 'Supprime par petits lots les paniers abandonnés et libère leurs réservations'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-age-days',
+            type=float,
+            help='Âge (jours sans modification) d\'un panier abandonné (défaut : SESSION_COOKIE_AGE)'
+        )
+        parser.add_argument(
+            '--empty-max-age-hours',
+            type=float,
+            help='Âge (heures) d\'un panier vide abandonné (défaut : CART_PURGE_EMPTY_MAX_AGE_HOURS)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Nombre de paniers examinés par transaction'
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=DEFAULT_PAUSE,
+            help='Pause (secondes) entre deux lots, laissée au trafic'
+        )
+        parser.add_argument(
+            '--max-batches',
+            type=int,
+            help='Arrête après ce nombre de lots (le reste sera purgé au prochain passage)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Affiche seulement le nombre de paniers à purger'
+        )
+    
+    def handle(self, *args, **options):
+        max_age = timedelta(days=options['max_age_days']) if options['max_age_days'] is not None else default_max_age()
+        empty_max_age = (
+            timedelta(hours=options['empty_max_age_hours'])
+            if options['empty_max_age_hours'] is not None else default_empty_max_age()
+        )
+        
+        backlog = abandoned_carts(max_age, empty_max_age).count()
+        self.stdout.write(
+            f'🧹 {backlog} paniers abandonnés '
+            f'(inactifs depuis {max_age.days} jours ou vides depuis {empty_max_age.total_seconds() / 3600:.0f} h)'
+        )
+        if options['dry_run'] or not backlog:
+            return
+        
+        def progress(stats):
+            self.stdout.write(
+                f'⏳ {stats.carts} paniers, {stats.items} articles supprimés ({stats.rate:.0f} paniers/s)'
+            )
+        
+        stats = purge_carts(
+            max_age=max_age,
+            empty_max_age=empty_max_age,
+            batch_size=options['batch_size'],
+            pause=options['pause'],
+            max_batches=options['max_batches'],
+            progress=progress,
+        )
+        remaining = abandoned_carts(max_age, empty_max_age).count()
+        
+        self.stdout.write(
+            f'🎉 {stats.carts} paniers et {stats.items} articles supprimés en {stats.elapsed:.1f}s '
+            f'({stats.rate:.0f} paniers/s)'
+        )
+        self.stdout.write(f'📊 Reste à purger: {remaining} paniers')
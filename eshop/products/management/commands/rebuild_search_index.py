@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from products.models import Product
+from products import search
+from products.cache import bump_catalog_version
+
+
+class Command(BaseCommand):
+    help = 'Reconstruit l\'index de recherche plein texte des produits'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=search.INDEX_BATCH_SIZE,
+            help='Nombre de produits indexés par lot'
+        )
+
+    def handle(self, *args, **options):
+        backend = search.get_backend()
+        if not backend.has_index:
+            self.stdout.write('⚠️ Aucun index plein texte disponible pour cette base de données')
+            return
+
+        batch_size = options['batch_size']
+        self.stdout.write('🔎 Reconstruction de l\'index de recherche...')
+
+        with transaction.atomic():
+            backend.install()
+            backend.clear()
+
+            indexed_count = 0
+            product_ids = Product.objects.order_by('id').values_list('id', flat=True)
+            batch = []
+            for product_id in product_ids.iterator(chunk_size=batch_size):
+                batch.append(product_id)
+                if len(batch) >= batch_size:
+                    backend.index_products(batch)
+                    indexed_count += len(batch)
+                    batch = []
+            if batch:
+                backend.index_products(batch)
+                indexed_count += len(batch)
+
+        # Invalider les réponses du catalogue en cache
+        bump_catalog_version()
+
+        self.stdout.write(f'🎉 {indexed_count} produits indexés')
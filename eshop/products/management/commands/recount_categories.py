@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from products.models import Category
+from products.cache import bump_catalog_version
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les compteurs de produits disponibles des catégories'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Affiche les dérives sans corriger les compteurs'
+        )
+    
+    def handle(self, *args, **options):
+        self.stdout.write('🔢 Vérification des compteurs de catégories...')
+        
+        with transaction.atomic():
+            drifted = (
+                Category.objects.with_actual_products_count()
+                .exclude(available_products_count=F('actual_products_count'))
+                .values_list('name', 'available_products_count', 'actual_products_count')
+            )
+            drift_count = 0
+            for name, stored, actual in drifted:
+                self.stdout.write(f'⚠️ {name}: {stored} → {actual}')
+                drift_count += 1
+            
+            if options['dry_run']:
+                self.stdout.write(f'📊 {drift_count} compteurs en dérive (aucune correction)')
+                return
+            
+            updated = Category.objects.recount_available_products()
+        
+        # Invalider les réponses du catalogue en cache
+        bump_catalog_version()
+        
+        self.stdout.write(f'🎉 {updated} catégories recalculées, {drift_count} dérives corrigées')
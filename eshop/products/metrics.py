@@ -0,0 +1,480 @@
+"""
+Métriques Prometheus (``/metrics``, format texte 0.0.4).
+
+Par vue (ViewSet ou fonction) et par action : nombre de requêtes, latence,
+taille des réponses et requêtes SQL ; en plus, les hits/misses du cache du
+catalogue et les requêtes en cours.
+
+Plusieurs processus (workers gunicorn/uvicorn) : avec ``METRICS_DIR``, chaque
+processus écrit ses valeurs dans son propre fichier projeté en mémoire
+(``mmap``) et ``/metrics`` additionne les fichiers de tous les processus. Les
+jauges des processus terminés sont ignorées ; les compteurs sont conservés
+(ils restent croissants). Le répertoire doit être vidé au démarrage du
+serveur. Sans ``METRICS_DIR``, les valeurs restent en mémoire (un seul
+processus, ``runserver``).
+
+La collecte est désactivée par défaut (``METRICS_ENABLED``). ``/metrics``
+n'est servi qu'aux adresses de ``METRICS_ALLOWED_IPS`` (boucle locale par
+défaut) ou sur présentation du jeton ``METRICS_TOKEN``
+(``Authorization: Bearer ...``) ; sinon 403.
+
+Enregistrer une mesure coûte une recherche de clé (mise en cache) et
+l'écriture d'un flottant dans le fichier : quelques microsecondes par requête.
+"""
+import bisect
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from functools import lru_cache
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+INITIAL_FILE_SIZE = 1 << 20
+
+# En-tête : octets utilisés (puis remplissage jusqu'à 8 octets).
+# Entrée : longueur de la clé, clé UTF-8 complétée pour aligner la valeur sur 8 octets, valeur.
+_USED = struct.Struct('<I')
+_KEY_LENGTH = struct.Struct('<I')
+_VALUE = struct.Struct('<d')
+_HEADER_SIZE = 8
+
+
+def _read_entries(data):
+    """``(clé, valeur, position de la valeur)`` d'un fichier de métriques"""
+    used = _USED.unpack_from(data, 0)[0] if len(data) >= _HEADER_SIZE else 0
+    offset = _HEADER_SIZE
+    while offset < used:
+        length = _KEY_LENGTH.unpack_from(data, offset)[0]
+        key = bytes(data[offset + 4:offset + 4 + length]).decode('utf-8')
+        value_offset = offset + 4 + length + (-(4 + length) % 8)
+        yield key, _VALUE.unpack_from(data, value_offset)[0], value_offset
+        offset = value_offset + _VALUE.size
+
+
+class MemoryStore:
+    """Valeurs du processus courant, en mémoire"""
+    
+    def __init__(self):
+        self.values = {}
+        self.lock = threading.Lock()
+    
+    def inc(self, key, amount=1.0):
+        with self.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+    
+    def items(self):
+        with self.lock:
+            return list(self.values.items())
+
+
+class MmapStore:
+    """Valeurs du processus courant dans un fichier projeté en mémoire (un seul écrivain)"""
+    
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = open(path, 'a+b')
+        if os.fstat(self.file.fileno()).st_size < INITIAL_FILE_SIZE:
+            self.file.truncate(INITIAL_FILE_SIZE)
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        self.positions = {key: position for key, _, position in _read_entries(self.map)}
+        self.used = max(_USED.unpack_from(self.map, 0)[0], _HEADER_SIZE)
+    
+    def _position(self, key):
+        encoded = key.encode('utf-8')
+        value_offset = self.used + 4 + len(encoded) + (-(4 + len(encoded)) % 8)
+        end = value_offset + _VALUE.size
+        size = len(self.map)
+        if end > size:
+            self.map.close()
+            self.file.truncate(max(size * 2, end))
+            self.map = mmap.mmap(self.file.fileno(), 0)
+        _KEY_LENGTH.pack_into(self.map, self.used, len(encoded))
+        self.map[self.used + 4:self.used + 4 + len(encoded)] = encoded
+        _VALUE.pack_into(self.map, value_offset, 0.0)
+        # La taille utilisée est écrite en dernier : un lecteur ne voit que des entrées complètes
+        self.used = end
+        _USED.pack_into(self.map, 0, self.used)
+        self.positions[key] = value_offset
+        return value_offset
+    
+    def inc(self, key, amount=1.0):
+        with self.lock:
+            position = self.positions.get(key)
+            if position is None:
+                position = self._position(key)
+            _VALUE.pack_into(self.map, position, _VALUE.unpack_from(self.map, position)[0] + amount)
+    
+    def items(self):
+        with self.lock:
+            return [(key, value) for key, value, _ in _read_entries(self.map)]
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def _reset_stores():
+    # Un processus fils (fork) écrit dans ses propres fichiers
+    _stores.clear()
+
+
+os.register_at_fork(after_in_child=_reset_stores)
+
+
+def metrics_dir():
+    return getattr(settings, 'METRICS_DIR', '')
+
+
+def get_store(kind):
+    """Magasin du processus courant pour ``kind`` (``counter`` ou ``gauge``)"""
+    store = _stores.get(kind)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(kind)
+            if store is None:
+                directory = metrics_dir()
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                    store = MmapStore(os.path.join(directory, f'{kind}_{os.getpid()}.db'))
+                else:
+                    store = MemoryStore()
+                _stores[kind] = store
+    return store
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def collect():
+    """Valeurs additionnées sur tous les processus : ``{clé: valeur}``"""
+    totals = defaultdict(float)
+    directory = metrics_dir()
+    if not directory:
+        for store in list(_stores.values()):
+            for key, value in store.items():
+                totals[key] += value
+        return totals
+    
+    for path in glob.glob(os.path.join(directory, '*.db')):
+        kind, _, pid = os.path.basename(path)[:-3].partition('_')
+        if kind == 'gauge' and pid.isdigit() and not _process_alive(int(pid)):
+            continue
+        with open(path, 'rb') as metrics_file:
+            data = metrics_file.read()
+        for key, value, _ in _read_entries(data):
+            totals[key] += value
+    return totals
+
+
+def _sample_key(name, labels):
+    return json.dumps([name, labels], separators=(',', ':'))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value):
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class Metric:
+    kind = 'counter'
+    type_name = None
+    
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        REGISTRY.append(self)
+    
+    @lru_cache(maxsize=4096)
+    def key(self, labelvalues):
+        return _sample_key(self.name, list(zip(self.labelnames, labelvalues)))
+    
+    def samples(self, values):
+        """Lignes d'exposition à partir des valeurs agrégées ``{(nom, labels): valeur}``"""
+        return [
+            f'{name}{_format_labels(labels)} {_format_value(value)}'
+            for (name, labels), value in sorted(values.items())
+            if name == self.name
+        ]
+
+
+class Counter(Metric):
+    type_name = 'counter'
+    
+    def inc(self, labelvalues=(), amount=1.0):
+        get_store(self.kind).inc(self.key(labelvalues), amount)
+
+
+class Gauge(Metric):
+    """Jauge additionnée sur les processus vivants"""
+    kind = 'gauge'
+    type_name = 'gauge'
+    
+    def inc(self, labelvalues=(), amount=1.0):
+        get_store(self.kind).inc(self.key(labelvalues), amount)
+    
+    def dec(self, labelvalues=(), amount=1.0):
+        get_store(self.kind).inc(self.key(labelvalues), -amount)
+
+
+class Histogram(Metric):
+    """Histogramme : compte par intervalle (cumulé à l'exposition) et somme"""
+    type_name = 'histogram'
+    
+    def __init__(self, name, documentation, labelnames=(), buckets=()):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+    
+    @lru_cache(maxsize=4096)
+    def keys(self, labelvalues):
+        labels = list(zip(self.labelnames, labelvalues))
+        bounds = [*(_format_value(float(bound)) for bound in self.buckets), '+Inf']
+        return (
+            [_sample_key(f'{self.name}_bucket', labels + [('le', bound)]) for bound in bounds],
+            _sample_key(f'{self.name}_sum', labels),
+        )
+    
+    def observe(self, labelvalues, value):
+        bucket_keys, sum_key = self.keys(labelvalues)
+        store = get_store(self.kind)
+        store.inc(bucket_keys[bisect.bisect_left(self.buckets, value)])
+        store.inc(sum_key, value)
+    
+    def samples(self, values):
+        series = defaultdict(dict)
+        sums = {}
+        for (name, labels), value in values.items():
+            if name == f'{self.name}_bucket':
+                series[labels[:-1]][labels[-1][1]] = value
+            elif name == f'{self.name}_sum':
+                sums[labels] = value
+        lines = []
+        for labels in sorted(series):
+            cumulative = 0.0
+            for bound in [*(_format_value(float(bound)) for bound in self.buckets), '+Inf']:
+                cumulative += series[labels].get(bound, 0.0)
+                lines.append(
+                    f'{self.name}_bucket{_format_labels(labels + (("le", bound),))} {_format_value(cumulative)}'
+                )
+            lines.append(f'{self.name}_sum{_format_labels(labels)} {_format_value(sums.get(labels, 0.0))}')
+            lines.append(f'{self.name}_count{_format_labels(labels)} {_format_value(cumulative)}')
+        return lines
+
+
+REGISTRY = []
+
+VIEW_LABELS = ('view', 'action')
+
+REQUESTS = Counter(
+    'eshop_http_requests_total', 'Requêtes HTTP traitées', VIEW_LABELS + ('method', 'status')
+)
+LATENCY = Histogram(
+    'eshop_http_request_duration_seconds', 'Durée de traitement des requêtes', VIEW_LABELS,
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+RESPONSE_SIZE = Histogram(
+    'eshop_http_response_size_bytes', 'Taille du corps des réponses', VIEW_LABELS,
+    buckets=(100, 1000, 10000, 100000, 1000000, 10000000),
+)
+DB_QUERIES = Histogram(
+    'eshop_db_queries_per_request', 'Requêtes SQL par requête HTTP', VIEW_LABELS,
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100),
+)
+CACHE_LOOKUPS = Counter(
+    'eshop_cache_lookups_total', 'Consultations du cache des réponses', ('cache', 'result')
+)
+IN_FLIGHT = Gauge('eshop_http_requests_in_flight', 'Requêtes HTTP en cours')
+
+
+def render():
+    """Exposition au format texte Prometheus de toutes les métriques"""
+    values = {}
+    for key, value in collect().items():
+        name, labels = json.loads(key)
+        values[name, tuple(tuple(pair) for pair in labels)] = value
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.type_name}')
+        lines.extend(metric.samples(values))
+    return '\n'.join(lines) + '\n'
+
+
+def scrape_allowed(request):
+    """Jeton ``Authorization: Bearer`` (``METRICS_TOKEN``) ou adresse de ``METRICS_ALLOWED_IPS``"""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        scheme, _, credentials = request.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() == 'bearer' and constant_time_compare(credentials.strip(), token):
+            return True
+    return request.META.get('REMOTE_ADDR') in getattr(settings, 'METRICS_ALLOWED_IPS', ())
+
+
+def metrics_view(request):
+    if not enabled():
+        raise Http404
+    if not scrape_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(render(), content_type=CONTENT_TYPE)
+
+
+def enabled():
+    return getattr(settings, 'METRICS_ENABLED', False)
+
+
+def record_cache_lookup(cache, hit):
+    if enabled():
+        CACHE_LOOKUPS.inc((cache, 'hit' if hit else 'miss'))
+
+
+# Requêtes SQL de la requête HTTP en cours (partagé avec les fils de ``sync_to_async``)
+_request_queries = ContextVar('request_queries', default=None)
+
+
+def count_queries(execute, sql, params, many, context):
+    counter = _request_queries.get()
+    if counter is not None:
+        counter[0] += 1
+    return execute(sql, params, many, context)
+
+
+def install_query_counter(sender, connection, **kwargs):
+    """Signal ``connection_created`` : compte les requêtes de chaque connexion"""
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+# Méthode choisie par le client : toute autre valeur est regroupée sous ``other``
+KNOWN_METHODS = frozenset({'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'})
+
+
+def method_label(method):
+    return method if method in KNOWN_METHODS else 'other'
+
+
+@lru_cache(maxsize=1024)
+def _view_labels(func, method):
+    view_class = getattr(func, 'cls', None)
+    if view_class is None:
+        return f'{func.__module__.rpartition(".")[2]}.{func.__name__}', method.lower()
+    # ViewSet DRF : action associée à la méthode (``list``, ``featured``...)
+    return view_class.__name__, getattr(func, 'actions', {}).get(method.lower(), method.lower())
+
+
+def view_labels(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved', ''
+    return _view_labels(match.func, method_label(request.method))
+
+
+class MetricsMiddleware:
+    """Mesure chaque requête (à placer en tête de ``MIDDLEWARE``)"""
+    sync_capable = True
+    async_capable = True
+    
+    def __init__(self, get_response):
+        if not enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+    
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started, queries, token = self.start()
+        try:
+            response = self.get_response(request)
+        except Exception:
+            IN_FLIGHT.dec()
+            raise
+        finally:
+            _request_queries.reset(token)
+        self.measure(request, response, started, queries)
+        return response
+    
+    async def __acall__(self, request):
+        started, queries, token = self.start()
+        try:
+            response = await self.get_response(request)
+        except Exception:
+            IN_FLIGHT.dec()
+            raise
+        finally:
+            _request_queries.reset(token)
+        self.measure(request, response, started, queries)
+        return response
+    
+    def start(self):
+        IN_FLIGHT.inc()
+        queries = [0]
+        return time.perf_counter(), queries, _request_queries.set(queries)
+    
+    def measure(self, request, response, started, queries):
+        """Réponses diffusées (synchrones ou non, sous WSGI comme ASGI) : mesurées à la fin de la diffusion"""
+        if not response.streaming:
+            self.finish(request, response, started, queries, len(response.content))
+        elif response.is_async:
+            response.streaming_content = self.astream(response.streaming_content, request, response, started, queries)
+        else:
+            response.streaming_content = self.stream(response.streaming_content, request, response, started, queries)
+    
+    def stream(self, content, request, response, started, queries):
+        size = 0
+        token = _request_queries.set(queries)
+        try:
+            for chunk in content:
+                size += len(chunk)
+                yield chunk
+        finally:
+            _request_queries.reset(token)
+            self.finish(request, response, started, queries, size)
+    
+    async def astream(self, content, request, response, started, queries):
+        size = 0
+        token = _request_queries.set(queries)
+        try:
+            async for chunk in content:
+                size += len(chunk)
+                yield chunk
+        finally:
+            _request_queries.reset(token)
+            self.finish(request, response, started, queries, size)
+    
+    def finish(self, request, response, started, queries, size):
+        IN_FLIGHT.dec()
+        labels = view_labels(request)
+        REQUESTS.inc(labels + (method_label(request.method), str(response.status_code)))
+        LATENCY.observe(labels, time.perf_counter() - started)
+        RESPONSE_SIZE.observe(labels, size)
+        DB_QUERIES.observe(labels, queries[0])
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:11
+
+import django.db.models.deletion
+import products.search
+from django.db import migrations, models
+
+
+def create_search_index(apps, schema_editor):
+    """Crée l'index plein texte et y indexe le catalogue existant"""
+    backend = products.search.get_backend(schema_editor.connection)
+    backend.install()
+    Product = apps.get_model('products', 'Product')
+    product_ids = list(Product.objects.values_list('id', flat=True))
+    for start in range(0, len(product_ids), products.search.INDEX_BATCH_SIZE):
+        backend.index_products(product_ids[start:start + products.search.INDEX_BATCH_SIZE])
+
+
+def drop_search_index(apps, schema_editor):
+    products.search.get_backend(schema_editor.connection).uninstall()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_cart_cartitem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchDocument',
+            fields=[
+                ('product', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_document', serialize=False, to='products.product')),
+                ('document', products.search.SearchDocumentField(db_column='products_product_fts')),
+                ('rank', models.FloatField(db_column='rank')),
+            ],
+            options={
+                'db_table': 'products_product_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
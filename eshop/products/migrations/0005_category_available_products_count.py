@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:12
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_available_products_count(apps, schema_editor):
+    Category = apps.get_model('products', 'Category')
+    Product = apps.get_model('products', 'Product')
+    Category.objects.update(
+        available_products_count=Coalesce(
+            Subquery(
+                Product.objects.filter(category=OuterRef('pk'), is_available=True)
+                .order_by()
+                .values('category')
+                .annotate(count=Count('id'))
+                .values('count')
+            ),
+            0
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_product_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='available_products_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Compteur maintenu par les signaux (voir recount_categories)', verbose_name='Produits disponibles'),
+        ),
+        migrations.RunPython(populate_available_products_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:14
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def populate_reserved(apps, schema_editor):
+    """Les articles déjà présents dans les paniers réservent leur quantité"""
+    Product = apps.get_model('products', 'Product')
+    CartItem = apps.get_model('products', 'CartItem')
+    Product.objects.update(
+        reserved=Coalesce(
+            Subquery(
+                CartItem.objects.filter(product=OuterRef('pk'))
+                .order_by()
+                .values('product')
+                .annotate(total=Sum('quantity'))
+                .values('total')
+            ),
+            0
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_category_available_products_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='reserved',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Quantité réservée par les paniers (voir products.stock)', verbose_name='Réservé'),
+        ),
+        migrations.RunPython(populate_reserved, migrations.RunPython.noop),
+    ]
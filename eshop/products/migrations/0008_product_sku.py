@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_product_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='sku',
+            field=models.CharField(blank=True, help_text="Identifiant du produit dans les flux d'import", max_length=64, null=True, unique=True, verbose_name='Référence (SKU)'),
+        ),
+    ]
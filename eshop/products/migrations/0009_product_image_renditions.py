@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_product_sku'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='image_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Chemins des miniatures générées (voir products.images)', verbose_name="Déclinaisons de l'image"),
+        ),
+    ]
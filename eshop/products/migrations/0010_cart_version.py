@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_product_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='version',
+            field=models.PositiveIntegerField(default=0, help_text='Incrémentée à chaque modification des articles', verbose_name='Version'),
+        ),
+    ]
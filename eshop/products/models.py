@@ -1,28 +1,99 @@
-from django.db import models
+from django.db import models, transaction
+from decimal import Decimal
+from django.db.models import Count, DecimalField, F, OuterRef, Prefetch, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.sessions.models import Session
+from django.utils import timezone
+from .search import FTS_TABLE, SearchDocumentField
 
 # Create your models here.
 
+def full_save_update_fields(instance):
+    """Champs écrits par une sauvegarde complète, hors ``SEPARATELY_WRITTEN_FIELDS`` et champs différés"""
+    deferred_fields = instance.get_deferred_fields()
+    return [
+        field.name for field in instance._meta.concrete_fields
+        if not field.primary_key
+        and field.name not in instance.SEPARATELY_WRITTEN_FIELDS
+        and field.attname not in deferred_fields
+    ]
+
+
+class CategoryQuerySet(models.QuerySet):
+    """Requêtes sur les catégories"""
+    
+    def _available_products_subquery(self):
+        """Nombre réel de produits disponibles de la catégorie courante"""
+        return Coalesce(
+            Subquery(
+                Product.objects.filter(category=OuterRef('pk'), is_available=True)
+                .order_by()
+                .values('category')
+                .annotate(count=Count('id'))
+                .values('count')
+            ),
+            0
+        )
+    
+    def with_actual_products_count(self):
+        """Annote ``actual_products_count`` (recalculé, pour détecter les dérives)"""
+        return self.annotate(actual_products_count=self._available_products_subquery())
+    
+    def recount_available_products(self):
+        """Recalcule les compteurs en une seule requête UPDATE"""
+        return self.update(
+            available_products_count=self._available_products_subquery(),
+            # Le compteur fait partie de la représentation (ETag / Last-Modified)
+            updated_at=timezone.now()
+        )
+
+
 class Category(models.Model):
     """Modèle pour les catégories de produits"""
     name = models.CharField(max_length=100, unique=True, verbose_name="Nom")
     description = models.TextField(blank=True, verbose_name="Description")
     slug = models.SlugField(unique=True, verbose_name="Slug")
+    available_products_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Produits disponibles",
+        help_text="Compteur maintenu par les signaux (voir recount_categories)"
+    )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créé le")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Modifié le")
     
+    objects = CategoryQuerySet.as_manager()
+    
     class Meta:
         verbose_name = "Catégorie"
         verbose_name_plural = "Catégories"
         ordering = ['name']
     
+    SEPARATELY_WRITTEN_FIELDS = ('available_products_count',)
+    
     def __str__(self):
         return self.name
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # Le compteur n'est écrit que par les signaux des produits (UPDATE F()) et
+            # par recount_available_products : une instance chargée plus tôt (admin)
+            # ne doit pas y réécrire une valeur périmée
+            kwargs['update_fields'] = full_save_update_fields(self)
+        super().save(*args, **kwargs)
 
 
 class Product(models.Model):
     """Modèle pour les produits de l'e-shop"""
+    sku = models.CharField(
+        max_length=64,
+        unique=True,
+        null=True,
+        blank=True,
+        verbose_name="Référence (SKU)",
+        help_text="Identifiant du produit dans les flux d'import"
+    )
     name = models.CharField(max_length=200, verbose_name="Nom")
     description = models.TextField(verbose_name="Description")
     price = models.DecimalField(
@@ -43,6 +114,13 @@ class Product(models.Model):
         null=True,
         verbose_name="Image"
     )
+    image_renditions = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name="Déclinaisons de l'image",
+        help_text="Chemins des miniatures générées (voir products.images)"
+    )
     image_url = models.URLField(
         blank=True, 
         null=True,
@@ -50,6 +128,12 @@ class Product(models.Model):
         help_text="URL de l'image du produit"
     )
     stock = models.PositiveIntegerField(default=0, verbose_name="Stock")
+    reserved = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Réservé",
+        help_text="Quantité réservée par les paniers (voir products.stock)"
+    )
     is_available = models.BooleanField(default=True, verbose_name="Disponible")
     featured = models.BooleanField(default=False, verbose_name="Mis en avant")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créé le")
@@ -59,44 +143,186 @@ class Product(models.Model):
         verbose_name = "Produit"
         verbose_name_plural = "Produits"
         ordering = ['-created_at']
+        indexes = [
+            # Tris des listes (et pagination par clé), départagés par id
+            models.Index(fields=['created_at', 'id'], name='product_created_idx'),
+            models.Index(fields=['price', 'id'], name='product_price_idx'),
+            models.Index(fields=['name', 'id'], name='product_name_idx'),
+            models.Index(fields=['stock', 'id'], name='product_stock_idx'),
+            # ?category= trié par nouveauté
+            models.Index(fields=['category', 'created_at', 'id'], name='product_category_recent_idx'),
+            # /products/featured/
+            models.Index(
+                fields=['created_at', 'id'],
+                condition=models.Q(featured=True, is_available=True),
+                name='product_featured_recent_idx'
+            ),
+            # /categories/<slug>/products/
+            models.Index(
+                fields=['category', 'created_at', 'id'],
+                condition=models.Q(is_available=True),
+                name='product_cat_avail_recent_idx'
+            ),
+            # ?in_stock_only=true avec fourchette de prix
+            models.Index(
+                fields=['price', 'id'],
+                condition=models.Q(stock__gt=0, is_available=True),
+                name='product_instock_price_idx'
+            ),
+        ]
+    
+    SEPARATELY_WRITTEN_FIELDS = ('reserved', 'image_renditions')
     
     def __str__(self):
         return self.name
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Mémorise l'état chargé pour maintenir les compteurs de catégorie"""
+        instance = super().from_db(db, field_names, values)
+        instance._counter_state = (
+            instance.__dict__.get('category_id'),
+            instance.__dict__.get('is_available'),
+        )
+        return instance
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # ``reserved`` n'est écrit que par products.stock (UPDATE conditionnels) et
+            # ``image_renditions`` par products.images : une sauvegarde complète ne doit
+            # pas écraser les réservations concurrentes ni des déclinaisons juste générées
+            kwargs['update_fields'] = full_save_update_fields(self)
+        # Écriture et mise à jour des compteurs dans la même transaction
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+    
     @property
     def is_in_stock(self):
         """Vérifie si le produit est en stock"""
         return self.stock > 0 and self.is_available
+    
+    @property
+    def available_stock(self):
+        """Stock encore réservable (stock physique moins les réservations des paniers)"""
+        return max(self.stock - self.reserved, 0)
+
+
+class ProductSearchDocument(models.Model):
+    """Entrée de l'index plein texte (table gérée par ``products.search``)"""
+    product = models.OneToOneField(
+        Product,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        related_name='search_document'
+    )
+    # Colonne cachée portant le nom de la table (requêtes MATCH de FTS5)
+    document = SearchDocumentField(db_column=FTS_TABLE)
+    # Colonne cachée ``rank`` de FTS5 (bm25, plus petit = plus pertinent)
+    rank = models.FloatField(db_column='rank')
+    
+    class Meta:
+        managed = False
+        db_table = FTS_TABLE
+    
+    def __str__(self):
+        return f"Index de {self.product_id}"
+
+
+class CartQuerySet(models.QuerySet):
+    """Requêtes sur les paniers"""
+    
+    def with_totals(self):
+        """Annote les totaux du panier calculés par un seul agrégat SQL"""
+        return self.annotate(
+            aggregated_total_items=Coalesce(Sum('items__quantity'), 0),
+            aggregated_total_price=Coalesce(
+                Sum(
+                    F('items__quantity') * F('items__product__price'),
+                    output_field=DecimalField(max_digits=12, decimal_places=2)
+                ),
+                Value(Decimal('0.00')),
+                output_field=DecimalField(max_digits=12, decimal_places=2)
+            ),
+        )
+    
+    def with_details(self, item_fields=None):
+        """
+        Totaux agrégés + articles préchargés avec leurs produits (2 requêtes).
+        
+        ``item_fields`` limite les colonnes lues des articles et des produits
+        (``.only()``, chemins ``'product__name'``).
+        """
+        items = CartItem.objects.select_related('product')
+        if item_fields is not None:
+            items = items.only('cart', 'product', 'product__id', *item_fields)
+        return self.with_totals().prefetch_related(Prefetch('items', queryset=items))
+    
+    def summaries(self):
+        """Version et totaux seulement, sans charger les articles (une requête)"""
+        return self.with_totals().values('id', 'version', 'aggregated_total_items', 'aggregated_total_price')
 
 
 class Cart(models.Model):
     """Modèle pour le panier d'achat basé sur les sessions"""
     session_key = models.CharField(max_length=40, unique=True, verbose_name="Clé de session")
+    version = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Version",
+        help_text="Incrémentée à chaque modification des articles"
+    )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créé le")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Modifié le")
     
+    objects = CartQuerySet.as_manager()
+    
     class Meta:
         verbose_name = "Panier"
         verbose_name_plural = "Paniers"
         ordering = ['-updated_at']
+        indexes = [
+            # Parcours par clé de la purge des paniers abandonnés
+            models.Index(fields=['updated_at', 'id'], name='cart_updated_idx'),
+        ]
     
     def __str__(self):
         return f"Panier {self.session_key[:8]}... ({self.items.count()} articles)"
     
+    def touch(self):
+        """Incrémente la version du panier (dans la transaction qui modifie ses articles)"""
+        Cart.objects.filter(pk=self.pk).update(version=F('version') + 1, updated_at=timezone.now())
+    
+    def _totals(self):
+        """Totaux (articles, prix) : annotations, articles préchargés ou agrégat SQL"""
+        if hasattr(self, 'aggregated_total_items'):
+            # SQLite ne ramène pas les expressions décimales à l'échelle du champ
+            return self.aggregated_total_items, self.aggregated_total_price.quantize(Decimal('0.01'))
+        prefetched = getattr(self, '_prefetched_objects_cache', {})
+        if 'items' in prefetched:
+            items = prefetched['items']
+            return (
+                sum(item.quantity for item in items),
+                sum((item.total_price for item in items), Decimal('0.00'))
+            )
+        totals = Cart.objects.filter(pk=self.pk).with_totals().values(
+            'aggregated_total_items', 'aggregated_total_price'
+        ).get()
+        return totals['aggregated_total_items'], totals['aggregated_total_price'].quantize(Decimal('0.01'))
+    
     @property
     def total_items(self):
         """Retourne le nombre total d'articles dans le panier"""
-        return sum(item.quantity for item in self.items.all())
+        return self._totals()[0]
     
     @property
     def total_price(self):
         """Retourne le prix total du panier"""
-        return sum(item.total_price for item in self.items.all())
+        return self._totals()[1]
     
     @property
     def is_empty(self):
         """Vérifie si le panier est vide"""
-        return not self.items.exists()
+        return self.total_items == 0
 
 
 class CartItem(models.Model):
@@ -0,0 +1,204 @@
+"""
+Pagination des listes du catalogue.
+
+Par défaut : pagination par numéro de page (``?page=``), inchangée pour les
+clients existants. Sur demande (``?pagination=cursor`` ou dès qu'un
+``?cursor=`` est présent) : pagination par clé (keyset) sur
+``(champ de tri, id)``, sans ``COUNT(*)`` ni ``OFFSET`` — la page N coûte
+autant que la première. Les résultats d'une recherche plein texte restent
+classés par pertinence : la clé est alors ``(search_rank, id)``.
+"""
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, PageNumberPagination
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+def _reverse_ordering(ordering):
+    return tuple(term[1:] if term.startswith('-') else f'-{term}' for term in ordering)
+
+
+def _serialize_value(value):
+    """Valeur de tri encodable en JSON sans perte (microsecondes, décimales)"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Pagination par clé sur ``(champ de tri, id)``.
+    
+    Le champ de tri est le premier terme de ``?ordering=`` autorisé par
+    ``view.ordering_fields`` (sinon ``view.ordering``) ; ``id`` départage
+    les égalités dans le même sens, ce qui rend l'ordre total et stable.
+    Un queryset classé par ``products.search`` (``search_rank`` en tête du
+    tri) garde ce classement.
+    """
+    ordering = '-created_at'
+    tie_breaker = 'id'
+    rank_field = 'search_rank'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    
+    def get_ordering(self, request, queryset, view):
+        # Tri par pertinence posé par la recherche (``(search_rank, -id)``)
+        current = tuple(queryset.query.order_by)
+        if current and current[0] == self.rank_field and self.rank_field in queryset.query.annotations:
+            return current
+        
+        allowed_fields = getattr(view, 'ordering_fields', None) or []
+        primary = None
+        for term in request.query_params.get(api_settings.ORDERING_PARAM, '').split(','):
+            term = term.strip()
+            if term and term.lstrip('-') in allowed_fields:
+                primary = term
+                break
+        if primary is None:
+            default = getattr(view, 'ordering', None) or self.ordering
+            primary = default if isinstance(default, str) else default[0]
+        
+        if primary.lstrip('-') in (self.tie_breaker, 'pk'):
+            return (primary,)
+        direction = '-' if primary.startswith('-') else ''
+        return (primary, f'{direction}{self.tie_breaker}')
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        
+        reverse = self.cursor.reverse if self.cursor else False
+        ordering = _reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if self.cursor is not None:
+            queryset = queryset.filter(self._after_position(queryset, ordering, self.cursor.position))
+        
+        # Une ligne de plus pour savoir s'il existe une page suivante
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+        
+        if not self.page:
+            self.has_next = self.has_previous = False
+        return self.page
+    
+    def _key_field(self, queryset, name):
+        """Champ du modèle, ou de l'annotation (``search_rank``), servant de clé"""
+        annotation = queryset.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field
+        return queryset.model._meta.get_field(name)
+    
+    def _after_position(self, queryset, ordering, position):
+        """Condition lexicographique ``(f1, f2) > (v1, v2)`` selon le sens de chaque champ"""
+        if len(position) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+        
+        values = []
+        for term, raw_value in zip(ordering, position):
+            field = self._key_field(queryset, term.lstrip('-'))
+            try:
+                values.append(field.to_python(raw_value))
+            except ValidationError:
+                raise NotFound(self.invalid_cursor_message)
+        
+        condition = Q()
+        equal_prefix = {}
+        for term, value in zip(ordering, values):
+            name = term.lstrip('-')
+            lookup = 'lt' if term.startswith('-') else 'gt'
+            condition |= Q(**equal_prefix, **{f'{name}__{lookup}': value})
+            equal_prefix[name] = value
+        return condition
+    
+    def _get_position_from_instance(self, instance, ordering):
+        position = []
+        for term in ordering:
+            name = term.lstrip('-')
+            value = instance[name] if isinstance(instance, dict) else getattr(instance, name)
+            position.append(_serialize_value(value))
+        return position
+    
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        position = self._get_position_from_instance(self.page[-1], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+    
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        position = self._get_position_from_instance(self.page[0], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+    
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            return Cursor(offset=0, reverse=bool(payload.get('r')), position=list(payload['p']))
+        except (TypeError, ValueError, KeyError, AttributeError):
+            raise NotFound(self.invalid_cursor_message)
+    
+    def encode_cursor(self, cursor):
+        payload = {'p': cursor.position}
+        if cursor.reverse:
+            payload['r'] = 1
+        encoded = urlsafe_b64encode(
+            json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+        ).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+
+class CatalogPagination(PageNumberPagination):
+    """Pagination par numéro de page, ou par clé sur demande du client"""
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_pagination_class = KeysetPagination
+    
+    def use_cursor(self, request):
+        params = request.query_params
+        return 'cursor' in params or params.get('pagination') == 'cursor'
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        self.delegate = self.cursor_pagination_class() if self.use_cursor(request) else None
+        if self.delegate is not None:
+            return self.delegate.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+    
+    def get_paginated_response(self, data):
+        if self.delegate is not None:
+            return self.delegate.get_paginated_response(data)
+        return super().get_paginated_response(data)
+    
+    def get_html_context(self):
+        if self.delegate is not None:
+            return self.delegate.get_html_context()
+        return super().get_html_context()
+    
+    def to_html(self):
+        if self.delegate is not None:
+            return self.delegate.to_html()
+        return super().to_html()
@@ -0,0 +1,168 @@
+"""
+Purge des paniers abandonnés.
+
+Un panier est abandonné s'il n'a pas été modifié depuis ``max_age`` (par
+défaut la durée de vie du cookie de session, au-delà de laquelle plus aucun
+visiteur ne peut le retrouver), ou s'il est vide depuis ``empty_max_age``.
+
+Les paniers sont parcourus par clé ``(updated_at, id)`` et supprimés par
+petits lots, chacun dans une transaction courte qui revérifie les
+conditions et libère les réservations de stock des articles supprimés : le
+trafic normal n'attend jamais plus qu'un lot.
+"""
+import logging
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from . import stock
+from .models import Cart, CartItem
+
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_PAUSE = 0.05
+
+logger = logging.getLogger(__name__)
+
+
+def default_max_age():
+    return timedelta(seconds=settings.SESSION_COOKIE_AGE)
+
+
+def default_empty_max_age():
+    return timedelta(hours=getattr(settings, 'CART_PURGE_EMPTY_MAX_AGE_HOURS', 24))
+
+
+def resolve_max_ages(max_age, empty_max_age):
+    """Âges par défaut pour les valeurs absentes (``None`` ; une durée nulle est valide)"""
+    if max_age is None:
+        max_age = default_max_age()
+    if empty_max_age is None:
+        empty_max_age = default_empty_max_age()
+    return max_age, empty_max_age
+
+
+@dataclass
+class PurgeStats:
+    carts: int = 0
+    items: int = 0
+    batches: int = 0
+    elapsed: float = 0.0
+    
+    @property
+    def rate(self):
+        """Paniers supprimés par seconde"""
+        return self.carts / self.elapsed if self.elapsed else 0.0
+
+
+def abandoned_carts(max_age=None, empty_max_age=None, now=None):
+    """Paniers purgeables : inactifs depuis ``max_age`` ou vides depuis ``empty_max_age``"""
+    now = now or timezone.now()
+    max_age, empty_max_age = resolve_max_ages(max_age, empty_max_age)
+    cutoff = now - max_age
+    empty_cutoff = now - empty_max_age
+    recent_items = CartItem.objects.filter(cart=OuterRef('pk'), updated_at__gte=cutoff)
+    any_items = CartItem.objects.filter(cart=OuterRef('pk'))
+    return Cart.objects.filter(
+        # Les articles sont aussi datés : un ajout récent garde le panier
+        Q(updated_at__lt=cutoff) & ~Exists(recent_items)
+        | Q(updated_at__lt=empty_cutoff) & ~Exists(any_items)
+    )
+
+
+def _delete_batch(cart_ids, purgeable):
+    """Supprime les paniers encore purgeables et libère leurs réservations (transaction courte)"""
+    with transaction.atomic():
+        cart_ids = list(purgeable.select_for_update().filter(pk__in=cart_ids).values_list('id', flat=True))
+        if not cart_ids:
+            return 0, 0
+        items = list(CartItem.objects.filter(cart_id__in=cart_ids).values_list('product_id', 'quantity'))
+        released = Counter()
+        for product_id, quantity in items:
+            released[product_id] -= quantity
+        # Suppression rapide : articles puis paniers, sans charger les instances
+        Cart.objects.filter(pk__in=cart_ids).delete()
+        stock.apply_deltas(released)
+    return len(cart_ids), len(items)
+
+
+def purge_carts(max_age=None, empty_max_age=None, batch_size=DEFAULT_BATCH_SIZE,
+                pause=DEFAULT_PAUSE, max_batches=None, progress=None):
+    """
+    Supprime les paniers abandonnés par lots ordonnés sur ``(updated_at, id)``.
+    
+    ``pause`` (secondes) est laissée aux autres écrivains entre deux lots ;
+    ``progress(stats)`` est appelé après chaque lot.
+    """
+    now = timezone.now()
+    max_age, empty_max_age = resolve_max_ages(max_age, empty_max_age)
+    purgeable = abandoned_carts(max_age, empty_max_age, now=now)
+    # Les deux conditions exigent au moins ``updated_at`` antérieur au seuil le plus récent
+    scan_cutoff = now - min(max_age, empty_max_age)
+    stats = PurgeStats()
+    started_at = time.monotonic()
+    position = None
+    
+    while max_batches is None or stats.batches < max_batches:
+        candidates = Cart.objects.filter(updated_at__lt=scan_cutoff)
+        if position is not None:
+            updated_at, cart_id = position
+            candidates = candidates.filter(
+                Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=cart_id)
+            )
+        candidates = list(candidates.order_by('updated_at', 'id').values_list('updated_at', 'id')[:batch_size])
+        if not candidates:
+            break
+        position = candidates[-1]
+        
+        carts, items = _delete_batch([cart_id for _, cart_id in candidates], purgeable)
+        stats.carts += carts
+        stats.items += items
+        stats.batches += 1
+        stats.elapsed = time.monotonic() - started_at
+        if progress:
+            progress(stats)
+        if len(candidates) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+    
+    stats.elapsed = time.monotonic() - started_at
+    return stats
+
+
+_periodic_thread = None
+
+
+def start_periodic_purge(interval):
+    """
+    Lance la purge toutes les ``interval`` secondes dans un fil du processus
+    (une seule fois par processus).
+    """
+    global _periodic_thread
+    if _periodic_thread is not None:
+        return _periodic_thread
+    
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                stats = purge_carts()
+                logger.info('%s paniers purgés en %.1fs', stats.carts, stats.elapsed)
+            except Exception:
+                # Une erreur ponctuelle (base verrouillée...) ne doit pas arrêter la tâche
+                logger.exception('Échec de la purge des paniers')
+            finally:
+                # Ne pas garder de connexion ouverte pendant l'attente
+                connections.close_all()
+    
+    _periodic_thread = threading.Thread(target=run, name='purge-carts', daemon=True)
+    _periodic_thread.start()
+    return _periodic_thread
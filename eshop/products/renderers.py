@@ -0,0 +1,90 @@
+"""
+Rendu JSON accéléré.
+
+``orjson`` (extension C, dépendance optionnelle) s'il est installé, sinon le
+module ``json`` de la bibliothèque standard. La sortie est identique octet
+pour octet à celle de ``rest_framework.renderers.JSONRenderer`` en mode
+compact : mêmes séparateurs, UTF-8 non échappé, dates au format DRF,
+``\\u2028`` / ``\\u2029`` échappés.
+"""
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    orjson = None
+
+
+_encoder = JSONEncoder()
+# Dates, décimales, chaînes paresseuses... : délégués à l'encodeur de DRF
+_ORJSON_OPTIONS = (
+    orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS
+    if orjson else 0
+)
+
+
+def stdlib_dumps(data):
+    return json.dumps(
+        data, cls=JSONEncoder, ensure_ascii=not api_settings.UNICODE_JSON,
+        allow_nan=not api_settings.STRICT_JSON, separators=(',', ':'),
+    ).encode()
+
+
+def dumps(data):
+    """Encode ``data`` en JSON compact (octets)"""
+    if orjson is None or not api_settings.UNICODE_JSON:
+        content = stdlib_dumps(data)
+    else:
+        try:
+            content = orjson.dumps(data, default=_encoder.default, option=_ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            # Entier hors 64 bits, NaN... : le module standard donne le comportement de DRF
+            content = stdlib_dumps(data)
+    return content.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+class FastJSONRenderer(JSONRenderer):
+    """``JSONRenderer`` encodé par ``dumps`` (sortie indentée : rendu standard)"""
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if not self.compact or self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+def ndjson_lines(rows, batch_size=100):
+    """Une ligne JSON par objet, regroupées par ``batch_size`` lignes (une écriture réseau par lot)"""
+    batch = []
+    for row in rows:
+        batch.append(dumps(row))
+        if len(batch) == batch_size:
+            yield b'\n'.join(batch) + b'\n'
+            batch = []
+    if batch:
+        yield b'\n'.join(batch) + b'\n'
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    JSON délimité par des sauts de ligne (``?format=ndjson`` ou
+    ``Accept: application/x-ndjson``).
+    
+    ``streaming`` : la vue qui le négocie diffuse elle-même ses lignes
+    (``ndjson_lines``) ; ``render`` ne sert qu'aux réponses ordinaires
+    (erreurs), un objet par ligne.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+    streaming = True
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return b''.join(ndjson_lines(data if isinstance(data, list) else [data]))
@@ -0,0 +1,253 @@
+"""
+Index de recherche plein texte des produits.
+
+Le contenu indexé (nom, description, nom de la catégorie) est stocké dans
+une table dédiée ``products_product_fts`` :
+
+- SQLite : table virtuelle FTS5, classement par ``bm25`` (colonne ``rank``) ;
+- PostgreSQL : colonne ``tsvector`` indexée en GIN, classement par ``ts_rank``.
+
+Pour les autres moteurs (ou un SQLite compilé sans FTS5), la recherche
+retombe sur les filtres ``icontains`` historiques.
+
+L'index est tenu à jour par les signaux de ``products.signals`` et peut être
+reconstruit avec ``python manage.py rebuild_search_index``.
+"""
+import re
+
+from django.db import connection as default_connection
+from django.db.models import F, FloatField, Func, Lookup, Q, TextField, Value
+
+
+FTS_TABLE = 'products_product_fts'
+
+# Taille des lots utilisés lors de la (ré)indexation
+INDEX_BATCH_SIZE = 1000
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class SearchDocumentField(TextField):
+    """Colonne de document plein texte (requêtée avec le lookup ``match``)"""
+
+
+@SearchDocumentField.register_lookup
+class Match(Lookup):
+    """``document MATCH requête`` (FTS5) ou ``document @@ to_tsquery(...)``"""
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+    def as_postgresql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} @@ to_tsquery('simple', {rhs})", lhs_params + rhs_params
+
+
+def tokenize(query):
+    """Découpe la saisie utilisateur en mots (la syntaxe du moteur est ignorée)"""
+    return _TOKEN_RE.findall(query or '')
+
+
+class SearchBackend:
+    """Recherche de repli sans index (filtres ``icontains``)"""
+    has_index = False
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def install(self):
+        """Crée les structures de l'index"""
+
+    def uninstall(self):
+        """Supprime les structures de l'index"""
+
+    def index_products(self, product_ids):
+        """(Ré)indexe les produits donnés"""
+
+    def remove_products(self, product_ids):
+        """Retire les produits donnés de l'index"""
+
+    def clear(self):
+        """Vide complètement l'index"""
+
+    def search(self, queryset, query):
+        """Filtre le queryset sur ``query`` (les backends indexés annotent ``search_rank``)"""
+        for term in tokenize(query):
+            queryset = queryset.filter(
+                Q(name__icontains=term) |
+                Q(description__icontains=term) |
+                Q(category__name__icontains=term)
+            )
+        return queryset
+
+    def _documents(self, product_ids):
+        """Retourne les lignes (id, nom, description, catégorie) à indexer"""
+        from .models import Product
+
+        return Product.objects.filter(id__in=product_ids).values_list(
+            'id', 'name', 'description', 'category__name'
+        )
+
+
+class SQLiteFTS5Backend(SearchBackend):
+    """Table virtuelle FTS5 dont le ``rowid`` est l'id du produit"""
+    has_index = True
+
+    def install(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5('
+                'name, description, category_name, '
+                "tokenize = 'unicode61 remove_diacritics 2')"
+            )
+
+    def uninstall(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+    def index_products(self, product_ids):
+        product_ids = list(product_ids)
+        self.remove_products(product_ids)
+        rows = list(self._documents(product_ids))
+        if rows:
+            with self.connection.cursor() as cursor:
+                cursor.executemany(
+                    f'INSERT INTO {FTS_TABLE} (rowid, name, description, category_name) '
+                    'VALUES (%s, %s, %s, %s)',
+                    rows
+                )
+
+    def remove_products(self, product_ids):
+        product_ids = list(product_ids)
+        if product_ids:
+            with self.connection.cursor() as cursor:
+                cursor.executemany(
+                    f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                    [(product_id,) for product_id in product_ids]
+                )
+
+    def clear(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    def build_query(self, query):
+        """Requête FTS5 : chaque mot est cité et cherché en préfixe (ET implicite)"""
+        return ' '.join(f'"{term}"*' for term in tokenize(query))
+
+    def search(self, queryset, query):
+        fts_query = self.build_query(query)
+        if not fts_query:
+            return queryset
+        return queryset.filter(
+            search_document__document__match=fts_query
+        ).annotate(
+            search_rank=F('search_document__rank')
+        ).order_by('search_rank', '-id')
+
+
+class PostgreSQLBackend(SearchBackend):
+    """Colonne ``tsvector`` (configuration ``simple``) avec index GIN"""
+    has_index = True
+
+    def install(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS {FTS_TABLE} ('
+                'rowid bigint PRIMARY KEY REFERENCES products_product (id) '
+                'ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, '
+                f'{FTS_TABLE} tsvector NOT NULL)'
+            )
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {FTS_TABLE}_gin '
+                f'ON {FTS_TABLE} USING gin ({FTS_TABLE})'
+            )
+
+    def uninstall(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+    def index_products(self, product_ids):
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, {FTS_TABLE}) '
+                "SELECT p.id, setweight(to_tsvector('simple', p.name), 'A') "
+                "|| setweight(to_tsvector('simple', c.name), 'B') "
+                "|| setweight(to_tsvector('simple', p.description), 'C') "
+                'FROM products_product p '
+                'JOIN products_category c ON c.id = p.category_id '
+                'WHERE p.id = ANY(%s) '
+                f'ON CONFLICT (rowid) DO UPDATE SET {FTS_TABLE} = EXCLUDED.{FTS_TABLE}',
+                [product_ids]
+            )
+
+    def remove_products(self, product_ids):
+        product_ids = list(product_ids)
+        if product_ids:
+            with self.connection.cursor() as cursor:
+                cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = ANY(%s)', [product_ids])
+
+    def clear(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'TRUNCATE {FTS_TABLE}')
+
+    def build_query(self, query):
+        """Requête ``to_tsquery`` : chaque mot est cherché en préfixe (ET)"""
+        return ' & '.join(f'{term}:*' for term in tokenize(query))
+
+    def search(self, queryset, query):
+        ts_query = self.build_query(query)
+        if not ts_query:
+            return queryset
+        return queryset.filter(
+            search_document__document__match=ts_query
+        ).annotate(
+            search_rank=Func(
+                F('search_document__document'), Value(ts_query),
+                template="-ts_rank(%(expressions)s))",
+                arg_joiner=", to_tsquery('simple', ",
+                output_field=FloatField(),
+            )
+        ).order_by('search_rank', '-id')
+
+
+_fts5_support = {}
+
+
+def _sqlite_has_fts5(connection):
+    """Vérifie (une fois par alias) que SQLite a été compilé avec FTS5"""
+    if connection.alias not in _fts5_support:
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA compile_options')
+            options = {row[0] for row in cursor.fetchall()}
+        _fts5_support[connection.alias] = 'ENABLE_FTS5' in options
+    return _fts5_support[connection.alias]
+
+
+def get_backend(connection=None):
+    """Retourne le backend de recherche adapté à la base de données"""
+    connection = connection or default_connection
+    if connection.vendor == 'postgresql':
+        return PostgreSQLBackend(connection)
+    if connection.vendor == 'sqlite' and _sqlite_has_fts5(connection):
+        return SQLiteFTS5Backend(connection)
+    return SearchBackend(connection)
+
+
+def search_products(queryset, query):
+    """Recherche plein texte classée par pertinence sur un queryset de produits"""
+    return get_backend().search(queryset, query)
+
+
+def index_products(product_ids):
+    get_backend().index_products(product_ids)
+
+
+def remove_products(product_ids):
+    get_backend().remove_products(product_ids)
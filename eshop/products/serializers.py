@@ -1,31 +1,49 @@
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db.models import BooleanField, ExpressionWrapper, F, Q
+from django.utils.encoding import filepath_to_uri
 from rest_framework import serializers
+from .cart_batch import ADD, MAX_BATCH_OPERATIONS, OPERATIONS, SET
+from .images import product_srcset, renditions_srcset
 from .models import Category, Product, Cart, CartItem
 
 
+# Colonnes lues par les champs calculés (``?fields=`` -> ``.only()``, voir products.fieldsets)
+PRODUCT_SOURCE_FIELDS = {
+    'image': ('image',),
+    'image_srcset': ('image', 'image_renditions'),
+    'is_in_stock': ('stock', 'is_available'),
+}
+
+
+def build_media_url(name, context):
+    """URL complète d'un fichier du stockage"""
+    url = default_storage.url(name)
+    request = context.get('request')
+    return request.build_absolute_uri(url) if request else url
+
+
 class CategorySerializer(serializers.ModelSerializer):
     """Serializer pour le modèle Category"""
-    products_count = serializers.SerializerMethodField()
+    products_count = serializers.IntegerField(source='available_products_count', read_only=True)
     
     class Meta:
         model = Category
         fields = ['id', 'name', 'description', 'slug', 'products_count', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
-    
-    def get_products_count(self, obj):
-        """Retourne le nombre de produits dans cette catégorie"""
-        return obj.products.filter(is_available=True).count()
 
 
 class ProductListSerializer(serializers.ModelSerializer):
     """Serializer pour la liste des produits (vue compacte)"""
     category_name = serializers.CharField(source='category.name', read_only=True)
     image = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
+    source_fields = PRODUCT_SOURCE_FIELDS
     
     class Meta:
         model = Product
         fields = [
             'id', 'name', 'price', 'category', 'category_name', 
-            'image', 'stock', 'is_available', 'featured', 'is_in_stock'
+            'image', 'image_srcset', 'stock', 'is_available', 'featured', 'is_in_stock'
         ]
     
     def get_image(self, obj):
@@ -36,6 +54,85 @@ class ProductListSerializer(serializers.ModelSerializer):
                 return request.build_absolute_uri(obj.image.url)
             return obj.image.url
         return None
+    
+    def get_image_srcset(self, obj):
+        """Miniatures par format et largeur (vide : utiliser ``image``)"""
+        return product_srcset(obj, lambda name: build_media_url(name, self.context))
+
+
+class ProductListRowSerializer:
+    """
+    Équivalent rapide de ``ProductListSerializer(many=True)`` pour des lignes
+    ``.values()`` (voir ``project``) : pas d'instance de modèle ni d'arbre de
+    champs DRF par ligne, ``category_name`` et ``is_in_stock`` calculés en SQL,
+    URLs des images préfixées d'une base média calculée une fois.
+    
+    La représentation est identique à celle de ``ProductListSerializer``.
+    """
+    values = (
+        'id', 'name', 'price', 'category_id', 'category_name', 'image', 'image_renditions',
+        'stock', 'is_available', 'featured', 'is_in_stock',
+        # Non sérialisés : pagination par clé et validateurs des requêtes conditionnelles
+        'created_at', 'updated_at', 'category__updated_at',
+    )
+    output_fields = (
+        'id', 'name', 'price', 'category', 'category_name', 'image', 'image_srcset',
+        'stock', 'is_available', 'featured', 'is_in_stock',
+    )
+    
+    def __init__(self, instance=None, many=True, context=None, **kwargs):
+        self.instance = instance
+        self.context = context or {}
+        price_field = Product._meta.get_field('price')
+        self.price_field = serializers.DecimalField(
+            max_digits=price_field.max_digits, decimal_places=price_field.decimal_places
+        )
+        self.media_base = self.get_media_base()
+    
+    @classmethod
+    def project(cls, queryset):
+        """Lignes ``.values()`` attendues par ``to_representation``"""
+        return queryset.annotate(
+            category_name=F('category__name'),
+            is_in_stock=ExpressionWrapper(Q(stock__gt=0, is_available=True), output_field=BooleanField()),
+        ).values(*cls.values)
+    
+    def get_media_base(self):
+        """Préfixe absolu des fichiers (stockage local uniquement, sinon ``None``)"""
+        if not isinstance(default_storage, FileSystemStorage) or not default_storage.base_url.endswith('/'):
+            return None
+        base_url = default_storage.base_url
+        request = self.context.get('request')
+        return request.build_absolute_uri(base_url) if request else base_url
+    
+    def media_url(self, name):
+        if self.media_base is None:
+            return build_media_url(name, self.context)
+        return self.media_base + filepath_to_uri(name).lstrip('/')
+    
+    def to_representation(self, row):
+        image = row['image']
+        data = {
+            'id': row['id'],
+            'name': row['name'],
+            'price': self.price_field.to_representation(row['price']),
+            'category': row['category_id'],
+            'category_name': row['category_name'],
+            'image': self.media_url(image) if image else None,
+            'image_srcset': renditions_srcset(image, row['image_renditions'], self.media_url),
+            'stock': row['stock'],
+            'is_available': row['is_available'],
+            'featured': row['featured'],
+            'is_in_stock': row['is_in_stock'],
+        }
+        if len(self.output_fields) < len(data):
+            # ``?fields=`` / ``?omit=``
+            data = {name: data[name] for name in self.output_fields}
+        return data
+    
+    @property
+    def data(self):
+        return [self.to_representation(row) for row in self.instance]
 
 
 class ProductDetailSerializer(serializers.ModelSerializer):
@@ -43,12 +140,14 @@ class ProductDetailSerializer(serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     category_id = serializers.IntegerField(write_only=True)
     image = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
+    source_fields = PRODUCT_SOURCE_FIELDS
     
     class Meta:
         model = Product
         fields = [
             'id', 'name', 'description', 'price', 'category', 'category_id',
-            'image', 'stock', 'is_available', 'featured', 'is_in_stock',
+            'image', 'image_srcset', 'stock', 'is_available', 'featured', 'is_in_stock',
             'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at', 'is_in_stock']
@@ -61,6 +160,10 @@ class ProductDetailSerializer(serializers.ModelSerializer):
                 return request.build_absolute_uri(obj.image.url)
             return obj.image.url
         return None
+    
+    def get_image_srcset(self, obj):
+        """Miniatures par format et largeur (vide : utiliser ``image``)"""
+        return product_srcset(obj, lambda name: build_media_url(name, self.context))
 
 
 class ProductCreateUpdateSerializer(serializers.ModelSerializer):
@@ -91,14 +194,20 @@ class CartItemSerializer(serializers.ModelSerializer):
     product_name = serializers.CharField(source='product.name', read_only=True)
     product_price = serializers.DecimalField(source='product.price', max_digits=10, decimal_places=2, read_only=True)
     product_image = serializers.SerializerMethodField()
+    product_image_srcset = serializers.SerializerMethodField()
     total_price = serializers.ReadOnlyField()
     product_stock = serializers.IntegerField(source='product.stock', read_only=True)
+    source_fields = {
+        'product_image': ('product__image',),
+        'product_image_srcset': ('product__image', 'product__image_renditions'),
+        'total_price': ('quantity', 'product__price'),
+    }
     
     class Meta:
         model = CartItem
         fields = [
             'id', 'product', 'product_name', 'product_price', 'product_image',
-            'product_stock', 'quantity', 'total_price', 'added_at', 'updated_at'
+            'product_image_srcset', 'product_stock', 'quantity', 'total_price', 'added_at', 'updated_at'
         ]
         read_only_fields = ['id', 'added_at', 'updated_at']
     
@@ -111,6 +220,10 @@ class CartItemSerializer(serializers.ModelSerializer):
             return obj.product.image.url
         return None
     
+    def get_product_image_srcset(self, obj):
+        """Miniatures de l'image du produit (vide : utiliser ``product_image``)"""
+        return product_srcset(obj.product, lambda name: build_media_url(name, self.context))
+    
     def validate(self, data):
         """Validation globale"""
         product = data.get('product')
@@ -139,10 +252,10 @@ class CartSerializer(serializers.ModelSerializer):
     class Meta:
         model = Cart
         fields = [
-            'id', 'session_key', 'items', 'total_items', 
+            'id', 'session_key', 'version', 'items', 'total_items', 
             'total_price', 'is_empty', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'session_key', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'session_key', 'version', 'created_at', 'updated_at']
 
 
 class AddToCartSerializer(serializers.Serializer):
@@ -172,4 +285,26 @@ class UpdateCartItemSerializer(serializers.Serializer):
             raise serializers.ValidationError(
                 f'Stock insuffisant. Stock disponible: {cart_item.product.stock}'
             )
-        return value
\ No newline at end of file
+        return value
+
+
+class CartOperationSerializer(serializers.Serializer):
+    """Opération d'un lot : ``add`` (ajoute), ``set`` (fixe, 0 supprime) ou ``remove``"""
+    op = serializers.ChoiceField(choices=OPERATIONS)
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=0, required=False)
+    
+    def validate(self, data):
+        """Validation de la quantité selon le type d'opération"""
+        if data['op'] == ADD:
+            data.setdefault('quantity', 1)
+            if data['quantity'] < 1:
+                raise serializers.ValidationError({'quantity': 'La quantité doit être au moins 1.'})
+        elif data['op'] == SET and 'quantity' not in data:
+            raise serializers.ValidationError({'quantity': 'Ce champ est obligatoire.'})
+        return data
+
+
+class CartBatchSerializer(serializers.Serializer):
+    """Liste ordonnée d'opérations appliquées au panier en une transaction"""
+    operations = CartOperationSerializer(many=True, allow_empty=False, max_length=MAX_BATCH_OPERATIONS)
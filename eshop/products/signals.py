@@ -0,0 +1,98 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import images, search
+from .cache import bump_catalog_version_on_commit
+from .models import Category, Product
+
+
+@receiver(post_save, sender=Product)
+def index_saved_product(sender, instance, raw=False, **kwargs):
+    """Met à jour l'entrée d'index plein texte du produit"""
+    if raw:
+        return
+    search.index_products([instance.pk])
+
+
+@receiver(post_save, sender=Product)
+def generate_image_renditions(sender, instance, raw=False, **kwargs):
+    """Déclinaisons d'une image nouvellement attachée (après validation)"""
+    if raw:
+        return
+    images.schedule_renditions(instance)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_deleted_product(sender, instance, **kwargs):
+    """Retire le produit supprimé de l'index plein texte"""
+    search.remove_products([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def reindex_category_products(sender, instance, created=False, raw=False, **kwargs):
+    """Le nom de la catégorie est indexé avec chacun de ses produits"""
+    if raw or created:
+        return
+    product_ids = list(instance.products.values_list('id', flat=True))
+    for start in range(0, len(product_ids), search.INDEX_BATCH_SIZE):
+        search.index_products(product_ids[start:start + search.INDEX_BATCH_SIZE])
+
+
+def _adjust_available_count(category_id, delta):
+    """Incrémente atomiquement le compteur de produits disponibles"""
+    if category_id and delta:
+        Category.objects.filter(pk=category_id).update(
+            available_products_count=F('available_products_count') + delta,
+            # Le compteur fait partie de la représentation (ETag / Last-Modified)
+            updated_at=timezone.now()
+        )
+
+
+@receiver(pre_save, sender=Product)
+def load_counter_state(sender, instance, raw=False, **kwargs):
+    """Relit l'état en base d'un produit qui n'a pas été chargé par l'ORM"""
+    if raw or instance.pk is None:
+        return
+    state = getattr(instance, '_counter_state', (None, None))
+    if None in state:
+        instance._counter_state = Product.objects.filter(pk=instance.pk).values_list(
+            'category_id', 'is_available'
+        ).first() or (None, None)
+
+
+@receiver(post_save, sender=Product)
+def update_category_counters(sender, instance, created=False, raw=False, **kwargs):
+    """Maintient ``Category.available_products_count`` (création, recatégorisation, disponibilité)"""
+    if raw:
+        return
+    old_category_id, old_available = (None, False) if created else getattr(
+        instance, '_counter_state', (None, False)
+    )
+    new_state = (instance.category_id, instance.is_available)
+    if (old_category_id, old_available) != new_state:
+        if old_available:
+            _adjust_available_count(old_category_id, -1)
+        if instance.is_available:
+            _adjust_available_count(instance.category_id, 1)
+    instance._counter_state = new_state
+
+
+@receiver(post_delete, sender=Product)
+def decrement_category_counter(sender, instance, **kwargs):
+    """Un produit disponible supprimé ne compte plus dans sa catégorie"""
+    category_id, is_available = getattr(
+        instance, '_counter_state', (instance.category_id, instance.is_available)
+    )
+    if is_available:
+        _adjust_available_count(category_id, -1)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_catalog_cache(sender, **kwargs):
+    """Toute écriture sur le catalogue invalide les réponses en cache"""
+    bump_catalog_version_on_commit()
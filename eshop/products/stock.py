@@ -0,0 +1,88 @@
+"""
+Réservation du stock par les paniers.
+
+Invariant : ``Product.reserved`` est égal à la somme des quantités des
+``CartItem`` du produit. Les réservations sont prises par un UPDATE
+conditionnel (``WHERE stock - reserved >= n``) : la vérification et
+l'écriture sont atomiques côté base, sans verrou applicatif global.
+Ces fonctions doivent être appelées dans la même transaction que
+l'écriture des articles du panier.
+"""
+from collections import Counter
+
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Greatest
+
+from .models import Product
+
+
+class InsufficientStock(Exception):
+    """La quantité demandée dépasse le stock encore réservable"""
+
+    def __init__(self, product_id, requested, available):
+        self.product_id = product_id
+        self.requested = requested
+        self.available = available
+        super().__init__(f'Stock insuffisant. Stock disponible: {available}')
+
+
+def reserve(product_id, quantity):
+    """Réserve ``quantity`` unités ou lève ``InsufficientStock``"""
+    if quantity <= 0:
+        return
+    updated = Product.objects.filter(
+        pk=product_id,
+        is_available=True,
+        stock__gte=F('reserved') + quantity
+    ).update(reserved=F('reserved') + quantity)
+    if not updated:
+        product = Product.objects.filter(pk=product_id).values('stock', 'reserved').first()
+        available = max(product['stock'] - product['reserved'], 0) if product else 0
+        raise InsufficientStock(product_id, quantity, available)
+
+
+def release(product_id, quantity):
+    """Libère ``quantity`` unités réservées"""
+    if quantity <= 0:
+        return
+    Product.objects.filter(pk=product_id).update(
+        reserved=Case(
+            When(reserved__gte=quantity, then=F('reserved') - quantity),
+            default=Value(0)
+        )
+    )
+
+
+def release_items(items):
+    """Libère les réservations d'articles ``(product_id, quantity)`` (un seul UPDATE)"""
+    released = Counter()
+    for product_id, quantity in items:
+        released[product_id] -= quantity
+    apply_deltas(released)
+
+
+def adjust(product_id, old_quantity, new_quantity):
+    """Réserve ou libère la différence entre deux quantités"""
+    if new_quantity > old_quantity:
+        reserve(product_id, new_quantity - old_quantity)
+    else:
+        release(product_id, old_quantity - new_quantity)
+
+
+def apply_deltas(deltas):
+    """
+    Applique des variations de réservation ``{product_id: delta}`` en un seul UPDATE.
+
+    Sans garde sur le stock : les quantités doivent avoir été validées dans la
+    même transaction, produits verrouillés (``select_for_update``, ou transaction
+    ``IMMEDIATE`` sous SQLite).
+    """
+    deltas = {product_id: delta for product_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    delta = Case(
+        *(When(pk=product_id, then=Value(value)) for product_id, value in deltas.items()),
+        default=Value(0),
+        output_field=IntegerField()
+    )
+    Product.objects.filter(pk__in=deltas).update(reserved=Greatest(F('reserved') + delta, Value(0)))
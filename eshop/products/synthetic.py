@@ -0,0 +1,304 @@
+"""
+Catalogue synthétique déterministe (benchmarks, tests de charge, volumétrie).
+
+Les lignes sont produites par blocs de ``BLOCK_SIZE``, chacun avec son propre
+générateur aléatoire initialisé par ``(seed, bloc)`` : le même ``seed`` donne
+toujours le même catalogue, quelle que soit la taille des lots d'écriture ou
+le nombre de processus. Chaque bloc est généré colonne par colonne (prix,
+stocks, catégories...) puis assemblé en instances pour ``bulk_create``.
+
+Les identifiants naturels (``slug`` des catégories, ``sku`` des produits,
+``session_key`` des paniers) portent le ``seed`` : relancer la génération
+n'insère pas de doublons.
+"""
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from decimal import Decimal
+
+import django
+from django.db import connections, transaction
+from django.db.models import F
+
+from . import search, stock
+from .cache import bump_catalog_version
+from .models import Cart, CartItem, Category, Product
+
+
+BLOCK_SIZE = 1000
+DEFAULT_BATCH_SIZE = 5000
+# Produits candidats des paniers synthétiques (au moins, par panier)
+CART_POOL_MIN = 1000
+CART_POOL_PER_CART = 2
+
+BRANDS = (
+    'Astra', 'Boréal', 'Cobalt', 'Dynamo', 'Éclipse', 'Fusion', 'Gravité', 'Horizon',
+    'Iris', 'Jade', 'Kinetic', 'Lumen', 'Meridian', 'Nova', 'Orion', 'Pulsar',
+)
+PRODUCT_TYPES = (
+    'Smartphone', 'Ordinateur portable', 'Casque', 'Écouteurs', 'Montre connectée', 'Tablette',
+    'Clavier', 'Souris', 'Écran', 'Enceinte', 'Caméra', 'Console', 'Routeur', 'Disque SSD',
+)
+QUALIFIERS = (
+    'Pro', 'Max', 'Ultra', 'Lite', 'Air', 'Plus', 'Mini', 'Sport', 'Studio', 'Gaming', 'Edge', 'Neo',
+)
+FEATURES = (
+    'autonomie prolongée', 'charge rapide', 'réduction de bruit active', 'écran OLED',
+    'connectivité Wi-Fi 6', 'Bluetooth 5.3', 'boîtier en aluminium', 'résistance à l\'eau',
+    'processeur huit cœurs', 'stockage extensible', 'rétroéclairage RGB', 'garantie deux ans',
+)
+CATEGORY_THEMES = (
+    'Audio', 'Informatique', 'Téléphonie', 'Gaming', 'Photo', 'Maison connectée',
+    'Réseau', 'Stockage', 'Objets connectés', 'Accessoires',
+)
+
+
+@dataclass
+class SeedStats:
+    categories: int = 0
+    products: int = 0
+    carts: int = 0
+    cart_items: int = 0
+    elapsed: float = 0.0
+    
+    @property
+    def rate(self):
+        """Produits insérés par seconde"""
+        return self.products / self.elapsed if self.elapsed else 0.0
+
+
+def category_slug(seed, index):
+    return f'syn{seed}-{index:05d}'
+
+
+def product_sku(seed, index):
+    return f'SYN{seed}-{index:07d}'
+
+
+def cart_session_key(seed, index):
+    return f'syn{seed}-cart-{index:07d}'
+
+
+def synthetic_categories(count, seed=0):
+    """Catégories ``0..count-1`` (instances non enregistrées)"""
+    rng = random.Random(f'{seed}:categories')
+    categories = []
+    for index in range(count):
+        theme = CATEGORY_THEMES[index % len(CATEGORY_THEMES)]
+        categories.append(Category(
+            name=f'{theme} {index:05d} ({seed})',
+            slug=category_slug(seed, index),
+            description=f'{theme} : {", ".join(rng.sample(FEATURES, 2))}',
+        ))
+    return categories
+
+
+def _skewed_index(rng, size, share):
+    """
+    Position dans ``0..size-1`` : avec la probabilité ``share``, tirée d'une loi
+    de Pareto (les premières positions concentrent les tirages), sinon uniforme
+    """
+    if rng.random() < share:
+        return min(int(rng.paretovariate(1.0)) - 1, size - 1)
+    return rng.randrange(size)
+
+
+def _product_block(block, seed, category_ids):
+    """Produits du bloc ``block`` (``BLOCK_SIZE`` lignes), générés colonne par colonne"""
+    rng = random.Random(f'{seed}:products:{block}')
+    indexes = range(block * BLOCK_SIZE, (block + 1) * BLOCK_SIZE)
+    size = len(indexes)
+    
+    types = [rng.choice(PRODUCT_TYPES) for _ in indexes]
+    names = [
+        f'{rng.choice(BRANDS)} {product_type} {rng.choice(QUALIFIERS)} {index}'
+        for product_type, index in zip(types, indexes)
+    ]
+    descriptions = [f'{product_type} avec {", ".join(rng.sample(FEATURES, 3))}.' for product_type in types]
+    # Prix log-normal (médiane ~ 80 €), arrondi en ,99
+    prices = [Decimal(f'{int(min(rng.lognormvariate(4.4, 1.0), 99999))}.99') for _ in indexes]
+    # Stock souvent faible, parfois nul, rarement très élevé
+    stocks = [0 if rng.random() < 0.08 else min(int(rng.paretovariate(1.2) * 5), 10000) for _ in indexes]
+    # Quelques catégories très fournies, une longue traîne de petites
+    categories = [category_ids[_skewed_index(rng, len(category_ids), 0.3)] for _ in indexes]
+    available = [rng.random() < 0.95 for _ in indexes]
+    featured = [rng.random() < 0.02 for _ in indexes]
+    
+    return [
+        Product(
+            sku=product_sku(seed, indexes[row]),
+            name=names[row],
+            description=descriptions[row],
+            price=prices[row],
+            category_id=categories[row],
+            stock=stocks[row],
+            is_available=available[row],
+            featured=featured[row],
+        )
+        for row in range(size)
+    ]
+
+
+def synthetic_products(count, category_ids, seed=0, start=0):
+    """Produits ``start..count-1`` (instances non enregistrées), bloc par bloc"""
+    for block in range(start // BLOCK_SIZE, (count + BLOCK_SIZE - 1) // BLOCK_SIZE):
+        products = _product_block(block, seed, category_ids)
+        first = block * BLOCK_SIZE
+        yield from products[max(start - first, 0):count - first]
+
+
+def _write_products(start, stop, seed, category_ids):
+    """
+    Insère les produits ``start..stop-1`` absents de la base et les indexe
+    (une transaction) ; retourne le nombre de produits insérés.
+    
+    Exécuté dans le processus courant ou dans un processus fils.
+    """
+    existing = set(
+        Product.objects.filter(
+            sku__gte=product_sku(seed, start), sku__lte=product_sku(seed, stop - 1)
+        ).values_list('sku', flat=True)
+    )
+    products = [
+        product for product in synthetic_products(stop, category_ids, seed, start=start)
+        if product.sku not in existing
+    ]
+    with transaction.atomic():
+        # Sans ``ignore_conflicts`` : les clés primaires sont renvoyées (RETURNING)
+        Product.objects.bulk_create(products)
+        search.index_products([product.pk for product in products])
+    return len(products)
+
+
+def seed_catalog(products, categories, seed=0, batch_size=DEFAULT_BATCH_SIZE, workers=1, progress=None):
+    """
+    Insère le catalogue synthétique (``bulk_create`` par lots, une transaction
+    par lot), indexe la recherche, recompte les catégories et invalide le cache.
+    
+    Avec ``workers > 1``, les lots sont écrits par un pool de processus (sous
+    SQLite, le verrou d'écriture sérialise les transactions : seule la
+    génération des lignes est parallèle). ``progress(stats)`` est appelé
+    après chaque lot.
+    """
+    stats = SeedStats()
+    started_at = time.monotonic()
+    
+    Category.objects.bulk_create(synthetic_categories(categories, seed), ignore_conflicts=True)
+    slugs = [category_slug(seed, index) for index in range(categories)]
+    ids_by_slug = dict(Category.objects.filter(slug__in=slugs).values_list('slug', 'id'))
+    category_ids = [ids_by_slug[slug] for slug in slugs]
+    stats.categories = len(category_ids)
+    
+    # Lots alignés sur les blocs : chaque bloc n'est généré qu'une fois
+    step = max(batch_size // BLOCK_SIZE, 1) * BLOCK_SIZE
+    ranges = [(start, min(start + step, products)) for start in range(0, products, step)]
+    
+    def record(inserted):
+        stats.products += inserted
+        stats.elapsed = time.monotonic() - started_at
+        if progress:
+            progress(stats)
+    
+    if workers > 1 and len(ranges) > 1:
+        # Les processus fils ouvrent leurs propres connexions
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as executor:
+            futures = [executor.submit(_write_products, start, stop, seed, category_ids) for start, stop in ranges]
+            for future in as_completed(futures):
+                record(future.result())
+    else:
+        for start, stop in ranges:
+            record(_write_products(start, stop, seed, category_ids))
+    
+    # Les écritures en masse ne déclenchent pas les signaux
+    Category.objects.filter(pk__in=category_ids).recount_available_products()
+    bump_catalog_version()
+    stats.elapsed = time.monotonic() - started_at
+    return stats
+
+
+def _cart_pool(count, products, seed):
+    """
+    Produits candidats des paniers : ``[(id, stock réservable)]``, dans un
+    ordre aléatoire (les premiers seront les plus demandés)
+    """
+    rng = random.Random(f'{seed}:cart-pool')
+    size = min(products, max(CART_POOL_MIN, count * CART_POOL_PER_CART))
+    skus = [product_sku(seed, index) for index in rng.sample(range(products), size)]
+    rows = {}
+    for offset in range(0, size, BLOCK_SIZE):
+        rows.update(
+            (sku, (product_id, stock_count - reserved))
+            for sku, product_id, stock_count, reserved in Product.objects.filter(
+                sku__in=skus[offset:offset + BLOCK_SIZE], is_available=True, stock__gt=F('reserved')
+            ).values_list('sku', 'id', 'stock', 'reserved')
+        )
+    return [rows[sku] for sku in skus if sku in rows]
+
+
+def seed_carts(count, products, seed=0, progress=None):
+    """
+    Paniers de ``count`` sessions synthétiques, garnis parmi les ``products``
+    premiers produits synthétiques du même ``seed`` (voir ``seed_catalog``).
+    
+    Les quantités sont réservées (``Product.reserved``) dans la transaction
+    qui écrit les articles, sans dépasser le stock : à lancer sur une base
+    sans trafic (les disponibilités sont lues une fois, au début).
+    """
+    stats = SeedStats()
+    started_at = time.monotonic()
+    pool = _cart_pool(count, products, seed)
+    if not pool:
+        return stats
+    pool_ids = [product_id for product_id, _ in pool]
+    remaining = dict(pool)
+    
+    for block in range((count + BLOCK_SIZE - 1) // BLOCK_SIZE):
+        rng = random.Random(f'{seed}:carts:{block}')
+        keys = [
+            cart_session_key(seed, index)
+            for index in range(block * BLOCK_SIZE, min((block + 1) * BLOCK_SIZE, count))
+        ]
+        existing = set(Cart.objects.filter(session_key__in=keys).values_list('session_key', flat=True))
+        
+        carts, lines, deltas = [], [], {}
+        for key in keys:
+            # 1 à 8 articles (le plus souvent 1 ou 2), quantité 1 le plus souvent
+            item_count = min(1 + int(rng.expovariate(0.8)), 8)
+            chosen = {}
+            for _ in range(item_count):
+                quantity = 1 if rng.random() < 0.8 else rng.randint(2, 3)
+                product_id = pool_ids[_skewed_index(rng, len(pool_ids), 0.3)]
+                if remaining[product_id] < quantity:
+                    # Produit populaire épuisé : un autre au hasard
+                    product_id = pool_ids[rng.randrange(len(pool_ids))]
+                if product_id in chosen or key in existing or remaining[product_id] < quantity:
+                    continue
+                chosen[product_id] = quantity
+                remaining[product_id] -= quantity
+            if key in existing or not chosen:
+                # Un panier vide n'est pas enregistré (panier virtuel)
+                continue
+            carts.append(Cart(session_key=key))
+            lines.append(chosen)
+            for product_id, quantity in chosen.items():
+                deltas[product_id] = deltas.get(product_id, 0) + quantity
+        
+        with transaction.atomic():
+            Cart.objects.bulk_create(carts)
+            items = [
+                CartItem(cart=cart, product_id=product_id, quantity=quantity)
+                for cart, chosen in zip(carts, lines)
+                for product_id, quantity in chosen.items()
+            ]
+            CartItem.objects.bulk_create(items)
+            stock.apply_deltas(deltas)
+        
+        stats.carts += len(carts)
+        stats.cart_items += len(items)
+        stats.elapsed = time.monotonic() - started_at
+        if progress:
+            progress(stats)
+    
+    return stats
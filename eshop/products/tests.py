@@ -1,3 +1,1426 @@
-from django.test import TestCase
+import csv
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import Counter
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from .models import Cart, CartItem, Category, Product, ProductSearchDocument
+from . import benchmarks, images, metrics, urls
+from .instrumentation import RequestProfile, fingerprint
+from .purge import purge_carts
+from .search import search_products
+from .synthetic import seed_carts, seed_catalog
+
+
+class StockReservationConcurrencyTests(TransactionTestCase):
+    """Réservations de stock sous accès concurrents"""
+    workers = 24
+
+    def setUp(self):
+        self.category = Category.objects.create(name='Audio', slug='audio')
+        self.product = Product.objects.create(
+            name='Casque', description='Casque sans fil', price='99.00',
+            category=self.category, stock=10
+        )
+
+    def run_concurrently(self, target, count):
+        """Lance ``count`` appels simultanés de ``target(index)``"""
+        barrier = threading.Barrier(count)
+        results = [None] * count
+
+        def worker(index):
+            try:
+                barrier.wait()
+                results[index] = target(index)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_many_sessions_never_oversell_hot_product(self):
+        def add_one(index):
+            client = APIClient()
+            response = client.post(
+                '/api/cart/add_item/', {'product_id': self.product.id, 'quantity': 1}, format='json'
+            )
+            return response.status_code
+
+        statuses = self.run_concurrently(add_one, self.workers)
+
+        self.assertEqual(statuses.count(201), 10)
+        self.assertEqual(statuses.count(400), self.workers - 10)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.reserved, 10)
+        self.assertEqual(sum(CartItem.objects.values_list('quantity', flat=True)), 10)
+        # Les ajouts refusés ne laissent pas de panier vide
+        self.assertEqual(Cart.objects.count(), 10)
+
+    def test_refused_add_creates_neither_cart_nor_session(self):
+        client = APIClient()
+        response = client.post('/api/cart/add_item/', {'product_id': self.product.id, 'quantity': 11}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Cart.objects.exists())
+        self.assertNotIn('sessionid', response.cookies)
+        self.assertNotIn('cart_token', client.session)
+
+    def test_same_session_does_not_lose_increments(self):
+        self.product.stock = 100
+        self.product.save()
+        client = APIClient()
+        # Le panier (et son jeton de session) n'existe qu'après un premier ajout
+        client.post('/api/cart/add_item/', {'product_id': self.product.id, 'quantity': 1}, format='json')
+        cookies = client.cookies
+
+        def add_one(index):
+            session_client = APIClient()
+            session_client.cookies = cookies
+            response = session_client.post(
+                '/api/cart/add_item/', {'product_id': self.product.id, 'quantity': 1}, format='json'
+            )
+            return response.status_code
+
+        statuses = self.run_concurrently(add_one, self.workers)
+
+        self.assertEqual(statuses, [201] * self.workers)
+        self.assertEqual(Cart.objects.count(), 1)
+        self.assertEqual(CartItem.objects.get().quantity, self.workers + 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.reserved, self.workers + 1)
+
+    def test_update_remove_and_clear_release_reservations(self):
+        client = APIClient()
+        response = client.post(
+            '/api/cart/add_item/', {'product_id': self.product.id, 'quantity': 4}, format='json'
+        )
+        item_id = response.data['cart']['items'][0]['id']
+
+        response = client.put('/api/cart/update_item/', {'item_id': item_id, 'quantity': 11}, format='json')
+        self.assertEqual(response.status_code, 400)
+        client.put('/api/cart/update_item/', {'item_id': item_id, 'quantity': 2}, format='json')
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.reserved, 2)
+
+        client.delete('/api/cart/remove_item/', {'item_id': item_id}, format='json')
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.reserved, 0)
+
+        client.post('/api/cart/add_item/', {'product_id': self.product.id, 'quantity': 10}, format='json')
+        client.delete('/api/cart/clear/')
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.reserved, 0)
+        self.assertEqual(self.product.stock, 10)
+
+    def test_concurrent_batches_never_oversell(self):
+        other = Product.objects.create(
+            name='Enceinte', description='Enceinte portable', price='49.00',
+            category=self.category, stock=100
+        )
+
+        def run_batch(index):
+            client = APIClient()
+            response = client.post('/api/cart/batch/', {'operations': [
+                {'op': 'add', 'product_id': other.id, 'quantity': 2},
+                {'op': 'remove', 'product_id': self.product.id},
+                {'op': 'set', 'product_id': self.product.id, 'quantity': 1},
+            ]}, format='json')
+            return [result['status'] for result in response.data['results']]
+
+        results = self.run_concurrently(run_batch, 12)
+
+        # Les opérations refusées n'empêchent pas les autres d'être appliquées
+        self.assertTrue(all(statuses[:2] == ['ok', 'error'] for statuses in results))
+        self.assertEqual(sum(statuses[2] == 'ok' for statuses in results), 10)
+        self.product.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.product.reserved, 10)
+        self.assertEqual(other.reserved, 24)
+        self.assertEqual(sum(CartItem.objects.filter(product=self.product).values_list('quantity', flat=True)), 10)
+
+
+class CartPurgeTests(TestCase):
+    """Purge des paniers abandonnés"""
+
+    def test_purge_deletes_abandoned_carts_and_releases_reservations(self):
+        category = Category.objects.create(name='Audio', slug='audio')
+        product = Product.objects.create(
+            name='Casque', description='Casque sans fil', price='99.00', category=category, stock=10
+        )
+        old = timezone.now() - timedelta(days=30)
+        abandoned = Cart.objects.create(session_key='abandoned')
+        revived = Cart.objects.create(session_key='revived')
+        empty = Cart.objects.create(session_key='empty')
+        active = Cart.objects.create(session_key='active')
+        CartItem.objects.create(cart=abandoned, product=product, quantity=3)
+        CartItem.objects.create(cart=revived, product=product, quantity=2)
+        Product.objects.filter(pk=product.pk).update(reserved=5)
+        Cart.objects.exclude(pk=active.pk).update(updated_at=old)
+        CartItem.objects.filter(cart=abandoned).update(updated_at=old)
+
+        stats = purge_carts(batch_size=1, pause=0)
+
+        self.assertEqual((stats.carts, stats.items), (2, 1))
+        self.assertQuerySetEqual(
+            Cart.objects.order_by('session_key').values_list('session_key', flat=True), ['active', 'revived']
+        )
+        product.refresh_from_db()
+        self.assertEqual(product.reserved, 2)
+
+    def test_zero_ages_are_not_defaults(self):
+        category = Category.objects.create(name='Audio', slug='audio')
+        product = Product.objects.create(name='Casque', description='-', price='99.00', category=category, stock=10)
+        empty = Cart.objects.create(session_key='empty')
+        filled = Cart.objects.create(session_key='filled')
+        CartItem.objects.create(cart=filled, product=product, quantity=3)
+        Product.objects.filter(pk=product.pk).update(reserved=3)
+        a_second_ago = timezone.now() - timedelta(seconds=1)
+        Cart.objects.update(updated_at=a_second_ago)
+        CartItem.objects.update(updated_at=a_second_ago)
+
+        self.assertEqual(purge_carts(empty_max_age=timedelta(0), pause=0).carts, 1)
+        self.assertFalse(Cart.objects.filter(pk=empty.pk).exists())
+        call_command('purge_carts', max_age_days=0, pause=0, stdout=StringIO())
+        self.assertFalse(Cart.objects.exists())
+        product.refresh_from_db()
+        self.assertEqual(product.reserved, 0)
+
+
+class FastProductListTests(TestCase):
+    """Mode ``?render=fast`` de la liste des produits"""
+
+    def test_fast_list_is_byte_identical(self):
+        category = Category.objects.create(name='Audio & Casques', slug='audio')
+        for index in range(5):
+            Product.objects.create(
+                name=f'Casque « {index} »', description='Casque', price=f'{index}9.90', category=category,
+                stock=index % 2, featured=index == 1
+            )
+        image = 'products/ab/casque éco.jpg'
+        Product.objects.filter(name__contains='2').update(image=image, image_renditions={
+            'source': image, 'webp': {'160': 'renditions/casque-160w.webp'},
+        })
+        Product.objects.filter(name__contains='3').update(image=image, image_renditions={'source': 'ancienne.jpg'})
+        client = APIClient()
+
+        for query in ('', 'ordering=price', 'pagination=cursor&page_size=2', 'in_stock_only=true'):
+            standard = client.get(f'/api/products/?{query}')
+            fast = client.get(f'/api/products/?{query}&render=fast')
+            self.assertEqual(fast.status_code, 200)
+            self.assertEqual(fast.content.replace(b'&render=fast', b''), standard.content)
+
+
+class SparseFieldsetTests(TestCase):
+    """Paramètres ``?fields=`` / ``?omit=``"""
+
+    def setUp(self):
+        self.category = Category.objects.create(name='Audio', slug='audio', description='Casques et enceintes')
+        self.product = Product.objects.create(
+            name='Casque', description='Très longue description', price='99.00', category=self.category, stock=3
+        )
+        self.client = APIClient()
+
+    def test_fields_prune_response_and_select(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/products/?fields=id,name,price')
+        self.assertEqual(response.json()['results'], [{'id': self.product.pk, 'name': 'Casque', 'price': '99.00'}])
+        self.assertFalse(any('"description"' in query['sql'] for query in queries.captured_queries))
+
+        response = self.client.get(f'/api/products/{self.product.pk}/?fields=name,category.name')
+        self.assertEqual(response.json(), {'name': 'Casque', 'category': {'name': 'Audio'}})
+
+        response = self.client.get(f'/api/products/{self.product.pk}/?omit=description,category,image_srcset')
+        self.assertNotIn('description', response.json())
+        self.assertEqual(response.json()['is_in_stock'], True)
+
+    def test_cart_fields(self):
+        self.client.post('/api/cart/add_item/', {'product_id': self.product.pk, 'quantity': 2}, format='json')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/cart/?fields=total_items,items.product_name,items.total_price')
+        self.assertEqual(response.json(), {
+            'items': [{'product_name': 'Casque', 'total_price': 198.0}], 'total_items': 2,
+        })
+        self.assertFalse(any('"description"' in query['sql'] for query in queries.captured_queries))
+
+
+
+class SyntheticCatalogTests(TestCase):
+
+    def test_seed_is_deterministic_and_idempotent(self):
+        stats = seed_catalog(1200, 5, seed=7, batch_size=500)
+        self.assertEqual((stats.categories, stats.products), (5, 1200))
+        snapshot = list(Product.objects.order_by('sku').values_list('sku', 'name', 'price', 'stock', 'category__slug'))
+
+        seed_catalog(1200, 5, seed=7, batch_size=1000)
+        self.assertEqual(Product.objects.count(), 1200)
+        self.assertEqual(
+            list(Product.objects.order_by('sku').values_list('sku', 'name', 'price', 'stock', 'category__slug')),
+            snapshot
+        )
+        self.assertEqual(
+            sum(Category.objects.values_list('available_products_count', flat=True)),
+            Product.objects.filter(is_available=True).count()
+        )
+
+    def test_seed_carts_reserve_stock(self):
+        seed_catalog(2000, 5, seed=3)
+        stats = seed_carts(300, 2000, seed=3)
+        self.assertEqual(Cart.objects.count(), stats.carts)
+        self.assertFalse(Cart.objects.filter(items__isnull=True).exists())
+
+        reserved = dict(Product.objects.filter(reserved__gt=0).values_list('id', 'reserved'))
+        quantities = {}
+        for product_id, quantity in CartItem.objects.values_list('product_id', 'quantity'):
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+        self.assertEqual(reserved, quantities)
+        self.assertFalse(Product.objects.filter(reserved__gt=F('stock')).exists())
+
+    def test_every_route_has_a_scenario(self):
+        self.assertEqual(benchmarks.registered_routes(urls.urlpatterns) - benchmarks.covered_routes(), set())
+
+
+
+class SQLInstrumentationTests(TestCase):
+
+    def setUp(self):
+        for name in ('Audio', 'Photo', 'Gaming'):
+            category = Category.objects.create(name=name, slug=name.lower())
+            Product.objects.create(name=f'{name} 1', description='-', price='10.00', category=category, stock=1)
+
+    @override_settings(SQL_INSTRUMENTATION=True)
+    def test_server_timing_and_log(self):
+        with self.assertLogs('products.instrumentation', 'INFO') as logs:
+            response = APIClient().get('/api/products/')
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", serialize;dur=[\d.]+, total;dur=')
+        payload = json.loads(logs.records[-1].getMessage())
+        self.assertEqual((payload['view'], payload['status'], payload['duplicates']), ('product-list', 200, []))
+
+    def test_disabled_by_default(self):
+        self.assertNotIn('Server-Timing', APIClient().get('/api/products/'))
+
+    def test_duplicates_name_call_site(self):
+        with RequestProfile().capture() as profile:
+            for category in Category.objects.order_by('pk'):
+                category.products.count()
+        self.assertEqual(profile.queries, 4)
+        [duplicate] = profile.duplicates
+        self.assertEqual(duplicate['count'], 3)
+        self.assertTrue(duplicate['call_site'].startswith('products/tests.py:'))
+
+
+
+class FacetTests(TestCase):
+    """Facettes ``?facets=true`` de la liste et de la recherche avancée"""
+
+    def setUp(self):
+        cache.clear()
+        audio = Category.objects.create(name='Audio', slug='audio')
+        photo = Category.objects.create(name='Photo', slug='photo')
+        for index, (category, price, stock, featured) in enumerate([
+            (audio, '9.99', 3, True), (audio, '10.00', 0, False), (audio, '24.99', 5, False),
+            (photo, '120.00', 2, True), (photo, '1500.00', 1, False),
+        ]):
+            Product.objects.create(
+                name=f'Produit {index}', description='-', price=price, category=category,
+                stock=stock, featured=featured
+            )
+        Product.objects.filter(price='1500.00').update(is_available=False)
+
+    def get(self, path):
+        with CaptureQueriesContext(connection) as queries:
+            response = APIClient().get(path)
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(queries)
+
+    def test_facets_of_filtered_list(self):
+        data, queries = self.get('/api/products/?facets=true&page_size=2')
+        _, plain_queries = self.get('/api/products/?page_size=2&ordering=name')
+        # Agrégat groupé + noms des catégories
+        self.assertEqual(queries, plain_queries + 2)
+        facets = data['facets']
+        self.assertEqual(
+            (facets['total'], facets['available'], facets['in_stock'], facets['featured']), (5, 4, 3, 2)
+        )
+        self.assertEqual([(c['slug'], c['count']) for c in facets['categories']], [('audio', 3), ('photo', 2)])
+        self.assertEqual((facets['price']['min'], facets['price']['max']), ('9.99', '1500.00'))
+        histogram = [(bucket['min'], bucket['max'], bucket['count']) for bucket in facets['price']['histogram']]
+        self.assertEqual(histogram[:3], [(None, '10.00', 1), ('10.00', '25.00', 2), ('25.00', '50.00', 0)])
+        self.assertEqual(histogram[-1], ('1000.00', None, 1))
+        self.assertEqual(sum(count for _, _, count in histogram), 5)
+
+        # Autre page, autre tri : facettes lues dans le cache
+        data, queries = self.get('/api/products/?facets=true&page_size=2&page=2&ordering=name')
+        self.assertEqual(queries, plain_queries)
+        self.assertEqual(data['facets'], facets)
+
+    def test_search_advanced_facets_follow_filters(self):
+        data, _ = self.get('/api/products/search_advanced/?facets=true&category=audio&max_price=20')
+        facets = data['facets']
+        self.assertEqual((facets['total'], facets['in_stock']), (2, 1))
+        self.assertEqual([c['slug'] for c in facets['categories']], ['audio'])
+        self.assertNotIn('facets', self.get('/api/products/search_advanced/?category=audio')[0])
+
+
+
+class CategoryProductsTests(TestCase):
+    """``/api/categories/{slug}/products/`` : pagination, filtres et variante NDJSON"""
+
+    def setUp(self):
+        seed_catalog(60, 2, seed=5)
+        self.category = Category.objects.order_by('pk').first()
+        self.path = f'/api/categories/{self.category.slug}/products/'
+        self.available = self.category.products.filter(is_available=True)
+
+    def test_paginated_filtered_and_ordered_like_product_list(self):
+        data = APIClient().get(self.path, {'page_size': 5, 'ordering': 'price', 'min_price': 50}).json()
+        expected = self.available.filter(price__gte=50)
+        self.assertEqual(data['count'], expected.count())
+        self.assertEqual(
+            [product['price'] for product in data['results']],
+            [str(price) for price in expected.order_by('price').values_list('price', flat=True)[:5]]
+        )
+
+        ids, url = [], f'{self.path}?pagination=cursor&page_size=7&ordering=-price'
+        while url:
+            page = APIClient().get(url).json()
+            ids.extend(product['id'] for product in page['results'])
+            url = page['next']
+        self.assertEqual(sorted(ids), sorted(self.available.values_list('id', flat=True)))
+
+    def test_ndjson_streams_every_product(self):
+        response = APIClient().get(self.path, {'page_size': 5, 'fields': 'id,name'}, HTTP_ACCEPT='application/x-ndjson')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(
+            [row['id'] for row in rows], list(self.available.order_by('-created_at').values_list('id', flat=True))
+        )
+        self.assertEqual(set(rows[0]), {'id', 'name'})
+
+        response = APIClient().get('/api/categories/inconnue/products/?format=ndjson')
+        self.assertEqual((response.status_code, json.loads(response.content)['detail']), (404, 'No Category matches the given query.'))
+
+    def test_search_applies_to_products_not_category(self):
+        audio = Category.objects.create(name='Audio', slug='audio')
+        for name in ('Casque', 'Casque pro', 'Enceinte'):
+            Product.objects.create(name=name, description='-', price='10.00', category=audio)
+        path = '/api/categories/audio/products/?search=casque'
+        expected = ['Casque', 'Casque pro']
+
+        response = APIClient().get(f'{path}&ordering=name')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([product['name'] for product in response.json()['results']], expected)
+        response = APIClient().get(f'{path}&pagination=cursor&ordering=name')
+        self.assertEqual([product['name'] for product in response.json()['results']], expected)
+        response = APIClient().get(f'{path}&ordering=name&format=ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([row['name'] for row in rows], expected)
+
+
+
+@override_settings(METRICS_ENABLED=True)
+class MetricsTests(TestCase):
+
+    def setUp(self):
+        metrics._reset_stores()
+        cache.clear()
+        # Collecte désactivée au démarrage des tests : compteur de requêtes SQL posé ici
+        metrics.install_query_counter(None, connection)
+        self.addCleanup(connection.execute_wrappers.remove, metrics.count_queries)
+        category = Category.objects.create(name='Audio', slug='audio')
+        Product.objects.create(name='Casque', description='-', price='10.00', category=category, stock=1)
+
+    def tearDown(self):
+        metrics._reset_stores()
+
+    def scrape(self):
+        response = APIClient().get('/metrics')
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        return dict(line.rsplit(' ', 1) for line in response.content.decode().splitlines() if not line.startswith('#'))
+
+    def test_requests_latency_queries_and_cache(self):
+        client = APIClient()
+        client.get('/api/categories/')
+        client.get('/api/categories/')
+        samples = self.scrape()
+        labels = 'view="CategoryViewSet",action="list"'
+        self.assertEqual(samples[f'eshop_http_requests_total{{{labels},method="GET",status="200"}}'], '2')
+        self.assertEqual(samples[f'eshop_http_request_duration_seconds_count{{{labels}}}'], '2')
+        self.assertEqual(samples[f'eshop_http_request_duration_seconds_bucket{{{labels},le="+Inf"}}'], '2')
+        # Buckets cumulés : la réponse en cache ne fait aucune requête SQL
+        self.assertEqual(samples[f'eshop_db_queries_per_request_bucket{{{labels},le="0"}}'], '1')
+        self.assertEqual(samples[f'eshop_db_queries_per_request_bucket{{{labels},le="100"}}'], '2')
+        self.assertEqual(samples['eshop_cache_lookups_total{cache="catalog",result="hit"}'], '1')
+        self.assertEqual(samples['eshop_cache_lookups_total{cache="catalog",result="miss"}'], '1')
+        # Seul le scrape est en cours
+        self.assertEqual(samples['eshop_http_requests_in_flight'], '1')
+
+    def test_async_stream_under_wsgi(self):
+        async def consume(response):
+            return b''.join([chunk async for chunk in response.streaming_content])
+
+        response = APIClient().get('/api/async/categories/')
+        self.assertEqual(response.status_code, 200)
+        body = async_to_sync(consume)(response)
+        samples = self.scrape()
+        labels = 'view="async_views.category_list",action="get"'
+        self.assertEqual(samples[f'eshop_http_requests_total{{{labels},method="GET",status="200"}}'], '1')
+        self.assertEqual(samples[f'eshop_http_response_size_bytes_sum{{{labels}}}'], str(len(body)))
+
+    def test_unknown_methods_share_one_label(self):
+        client = APIClient()
+        for method in ('PURGE', 'X-FOO-1', 'X-FOO-2'):
+            client.generic(method, '/api/categories/')
+        samples = self.scrape()
+        labels = 'view="CategoryViewSet",action="other"'
+        self.assertEqual(samples[f'eshop_http_requests_total{{{labels},method="other",status="405"}}'], '3')
+        self.assertFalse([sample for sample in samples if 'FOO' in sample.upper() or 'PURGE' in sample])
+
+    def test_scrape_is_restricted(self):
+        with override_settings(METRICS_ENABLED=False):
+            self.assertEqual(APIClient().get('/metrics').status_code, 404)
+
+        remote = {'REMOTE_ADDR': '203.0.113.7'}
+        self.assertEqual(APIClient().get('/metrics', **remote).status_code, 403)
+        with override_settings(METRICS_TOKEN='s3cret'):
+            self.assertEqual(APIClient().get('/metrics', HTTP_AUTHORIZATION='Bearer nope', **remote).status_code, 403)
+            self.assertEqual(APIClient().get('/metrics', HTTP_AUTHORIZATION='Bearer s3cret', **remote).status_code, 200)
+        with override_settings(METRICS_ALLOWED_IPS=['203.0.113.7']):
+            self.assertEqual(APIClient().get('/metrics', **remote).status_code, 200)
+
+    def test_processes_are_aggregated(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            key = metrics.REQUESTS.key(('ProductViewSet', 'list', 'GET', '200'))
+            gauge = metrics.IN_FLIGHT.key(())
+            # Autre worker (vivant) et worker terminé (pid au-delà de pid_max)
+            metrics.MmapStore(os.path.join(directory, 'counter_1.db')).inc(key, 3)
+            metrics.MmapStore(os.path.join(directory, 'gauge_1.db')).inc(gauge, 2)
+            metrics.MmapStore(os.path.join(directory, f'counter_{2 ** 22 + 1}.db')).inc(key, 4)
+            metrics.MmapStore(os.path.join(directory, f'gauge_{2 ** 22 + 1}.db')).inc(gauge, 5)
+            metrics.REQUESTS.inc(('ProductViewSet', 'list', 'GET', '200'))
+
+            totals = metrics.collect()
+            self.assertEqual(totals[key], 8)
+            self.assertEqual(totals[gauge], 2)
+            # Un fichier rouvert (redémarrage du même pid) conserve ses valeurs
+            self.assertEqual(metrics.MmapStore(os.path.join(directory, 'counter_1.db')).items(), [(key, 3)])
+
+
+
+class CategoryCounterTests(TestCase):
+    """Compteur ``Category.available_products_count`` (signaux et recount_categories)"""
+
+    def setUp(self):
+        self.audio = Category.objects.create(name='Audio', slug='audio')
+        self.photo = Category.objects.create(name='Photo', slug='photo')
+
+    def create_product(self, category, **kwargs):
+        return Product.objects.create(name='Casque', description='-', price='10.00', category=category, **kwargs)
+
+    def counts(self):
+        return dict(Category.objects.values_list('slug', 'available_products_count'))
+
+    def test_signals_follow_create_delete_move_and_toggle(self):
+        product = self.create_product(self.audio)
+        self.create_product(self.audio, is_available=False)
+        self.assertEqual(self.counts(), {'audio': 1, 'photo': 0})
+
+        product.category = self.photo
+        product.save()
+        self.assertEqual(self.counts(), {'audio': 0, 'photo': 1})
+
+        product.is_available = False
+        product.save()
+        self.assertEqual(self.counts(), {'audio': 0, 'photo': 0})
+
+        # Instance non chargée par l'ORM : l'état en base est relu avant la sauvegarde
+        product = Product.objects.get(pk=product.pk)
+        del product._counter_state
+        product.category, product.is_available = self.audio, True
+        product.save()
+        self.assertEqual(self.counts(), {'audio': 1, 'photo': 0})
+
+        Product.objects.get(pk=product.pk).delete()
+        self.assertEqual(self.counts(), {'audio': 0, 'photo': 0})
+
+    def test_full_save_of_stale_category_keeps_counter(self):
+        stale = Category.objects.get(pk=self.audio.pk)
+        self.create_product(self.audio)
+        self.create_product(self.audio)
+
+        stale.description = 'Casques et enceintes'
+        stale.save()
+        self.assertEqual(self.counts()['audio'], 2)
+        self.assertEqual(Category.objects.get(pk=self.audio.pk).description, 'Casques et enceintes')
+
+    def test_recount_categories_repairs_drift(self):
+        self.create_product(self.audio)
+        self.create_product(self.photo)
+        Category.objects.update(available_products_count=7)
+
+        call_command('recount_categories', dry_run=True, stdout=StringIO())
+        self.assertEqual(self.counts(), {'audio': 7, 'photo': 7})
+
+        output = StringIO()
+        call_command('recount_categories', stdout=output)
+        self.assertEqual(self.counts(), {'audio': 1, 'photo': 1})
+        self.assertIn('2 dérives corrigées', output.getvalue())
+
+
+
+class ConditionalGetTests(TestCase):
+    """Validateurs ETag / Last-Modified et réponses ``304`` du catalogue"""
+
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Audio', slug='audio')
+        self.product = Product.objects.create(
+            name='Casque', description='-', price='10.00', category=self.category, stock=1, sku='AUD-1'
+        )
+        self.client = APIClient()
+
+    def revalidate(self, path):
+        """Statut d'une requête conditionnelle présentant l'ETag de la réponse précédente"""
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        return lambda: self.client.get(path, HTTP_IF_NONE_MATCH=response['ETag']).status_code
+
+    def test_list_and_detail_answer_304_until_modified(self):
+        for path in ('/api/categories/', f'/api/categories/{self.category.slug}/', '/api/products/',
+                     f'/api/products/{self.product.pk}/'):
+            with self.subTest(path):
+                status = self.revalidate(path)
+                self.assertEqual(status(), 304)
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.product.save()
+                    self.category.save()
+                self.assertEqual(status(), 200)
+
+    def test_last_modified(self):
+        response = self.client.get('/api/products/')
+        self.assertEqual(
+            self.client.get('/api/products/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304
+        )
+
+    def test_counter_changes_invalidate_category_validators(self):
+        status = self.revalidate('/api/categories/')
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(name='Enceinte', description='-', price='20.00', category=self.category)
+        self.assertEqual(status(), 200)
+
+        # Écritures en masse : le recomptage met aussi à jour les validateurs
+        status = self.revalidate('/api/categories/')
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl') as source:
+            for index in range(2, 5):
+                source.write(json.dumps({'sku': f'AUD-{index}', 'name': 'Micro', 'price': '5', 'category': 'audio'}) + '\n')
+            source.flush()
+            call_command('import_catalog', source.name, stdout=StringIO())
+        self.assertEqual(status(), 200)
+        self.assertEqual(self.client.get('/api/categories/').json()['results'][0]['products_count'], 5)
+
+        status = self.revalidate('/api/categories/')
+        Category.objects.update(available_products_count=0)
+        call_command('recount_categories', stdout=StringIO())
+        self.assertEqual(status(), 200)
+
+
+
+class CartBatchTests(TransactionTestCase):
+    """``/api/cart/batch/`` hors transaction de test (mode autocommit, comme en production)"""
+
+    def setUp(self):
+        category = Category.objects.create(name='Audio', slug='audio')
+        self.product = Product.objects.create(
+            name='Casque', description='-', price='10.00', category=category, stock=5
+        )
+
+    def test_remove_only_batch_on_virtual_cart_takes_no_lock(self):
+        # SQLite ignore ``select_for_update`` : on simule une base qui le prend en charge
+        # (PostgreSQL refuse alors le verrou hors transaction)
+        with mock.patch.object(connection.features, 'has_select_for_update', True):
+            response = APIClient().post('/api/cart/batch/', {'operations': [
+                {'op': 'remove', 'product_id': self.product.pk},
+                {'op': 'set', 'product_id': self.product.pk, 'quantity': 0},
+            ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['status'] for result in response.data['results']], ['error', 'ok'])
+        self.assertFalse(Cart.objects.exists())
+
+
+
+class AsyncViewTests(TestCase):
+    """Endpoints ``/api/async/`` : même représentation que la pile DRF"""
+
+    def setUp(self):
+        cache.clear()
+        seed_catalog(45, 3, seed=11)
+        self.slug = Category.objects.order_by('pk').values_list('slug', flat=True).first()
+
+    async def fetch(self, path):
+        response = await AsyncClient().get(path)
+        if response.streaming:
+            body = b''.join([chunk async for chunk in response.streaming_content])
+        else:
+            body = response.content
+        if response['Content-Type'] != 'application/json':
+            return response.status_code, None
+        return response.status_code, json.loads(body)
+
+    def fetch_both(self, path):
+        """Réponses des piles asynchrone et DRF pour le même chemin"""
+        status, data = async_to_sync(self.fetch)(f'/api/async{path}')
+        self.assertEqual(status, 200, path)
+        return data, APIClient().get(f'/api{path}').json()
+
+    def test_list_pages_match_drf(self):
+        for path in ('/products/?ordering=price,%20-name&page_size=7&page=2',
+                     '/products/?ordering=-stock&min_price=20&in_stock_only=true',
+                     '/products/?page_size=0', '/products/?page_size=abc&featured=true',
+                     f'/categories/{self.slug}/products/?ordering=%20price&page_size=5'):
+            with self.subTest(path):
+                async_data, drf_data = self.fetch_both(path)
+                self.assertEqual(async_data['count'], drf_data['count'])
+                self.assertEqual(
+                    [product['id'] for product in async_data['results']],
+                    [product['id'] for product in drf_data['results']]
+                )
+                self.assertEqual((async_data['next'] is None), (drf_data['next'] is None))
+        self.assertEqual(len(self.fetch_both('/products/?page_size=0')[0]['results']), 20)
+
+    def test_detail_and_categories_match_drf(self):
+        product_id = Product.objects.order_by('pk').values_list('pk', flat=True).first()
+        async_data, drf_data = self.fetch_both(f'/products/{product_id}/')
+        self.assertEqual(async_data, drf_data)
+        async_data, drf_data = self.fetch_both('/categories/')
+        self.assertEqual(async_data, drf_data['results'])
+
+    def test_errors(self):
+        for path in ('/api/async/products/999999/', '/api/async/categories/inconnue/products/',
+                     '/api/async/products/?page=99', '/api/async/products/?page=0'):
+            with self.subTest(path):
+                status, _ = async_to_sync(self.fetch)(path)
+                self.assertEqual(status, 404)
+
+
+
+class CursorPaginationTests(TestCase):
+    """Pagination par clé (``?pagination=cursor``) de la liste et de la recherche"""
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Audio', slug='audio')
+        for index in range(14):
+            # Pertinence variable : « casque » répété dans le nom et la description
+            Product.objects.create(
+                name=' '.join(['Casque'] * (index % 3 + 1)) + f' {index}',
+                description='casque ' * (index % 5) + 'sans fil',
+                price=f'{index % 4 + 10}.00', category=category, stock=index % 2
+            )
+        self.client = APIClient()
+
+    def walk(self, path):
+        """Ids de toutes les pages en suivant ``next``, puis ``previous`` depuis la dernière page"""
+        forward, url, page = [], path, None
+        while url:
+            page = self.client.get(url).json()
+            forward.append([product['id'] for product in page['results']])
+            url = page['next']
+        backward, url = [], page['previous']
+        while url:
+            page = self.client.get(url).json()
+            backward.insert(0, [product['id'] for product in page['results']])
+            url = page['previous']
+        self.assertEqual(backward, forward[:-1])
+        return [product_id for ids in forward for product_id in ids]
+
+    def page_ids(self, path):
+        return [product['id'] for product in self.client.get(path).json()['results']]
+
+    def test_list_matches_page_number_ordering(self):
+        for query in ('', 'ordering=price', 'ordering=-stock', 'ordering=name&in_stock_only=true'):
+            with self.subTest(query):
+                self.assertEqual(
+                    self.walk(f'/api/products/?pagination=cursor&page_size=4&{query}'),
+                    self.page_ids(f'/api/products/?page_size=100&{query}')
+                )
+
+    def test_search_keeps_relevance_order(self):
+        for path in ('/api/products/?search=casque', '/api/products/?search=casque&render=fast',
+                     '/api/products/search_advanced/?q=casque'):
+            with self.subTest(path):
+                ranked = self.page_ids(f'{path}&page_size=100')
+                self.assertEqual(len(ranked), 14)
+                self.assertNotEqual(ranked, sorted(ranked, reverse=True))
+                self.assertEqual(self.walk(f'{path}&pagination=cursor&page_size=3'), ranked)
+        # Un tri explicite l'emporte sur la pertinence, comme en pagination par page
+        self.assertEqual(
+            self.walk('/api/products/?search=casque&ordering=price&pagination=cursor&page_size=5'),
+            self.page_ids('/api/products/?search=casque&ordering=price&page_size=100')
+        )
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/products/?search=casque&cursor=bm9wZQ')
+        self.assertEqual(response.status_code, 404)
+
+
+
+class ImageRenditionTests(TestCase):
+    """Déclinaisons des images produits (``products.images``)"""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+        self.media_root = media_root.name
+        self.category = Category.objects.create(name='Audio', slug='audio')
+
+    def product_with_image(self, name, content):
+        default_storage.save(name, ContentFile(content))
+        return Product.objects.create(
+            name='Casque', description='-', price='10.00', category=self.category, image=name
+        )
+
+    def png(self, width, height):
+        buffer = BytesIO()
+        Image.new('RGBA', (width, height), (200, 30, 30, 128)).save(buffer, format='PNG')
+        return buffer.getvalue()
+
+    def test_generation(self):
+        product = self.product_with_image('products/casque.png', self.png(400, 200))
+        images.update_product_renditions(product.pk, product.image.name)
+
+        product.refresh_from_db()
+        self.assertTrue(images.renditions_are_current(product))
+        # Pas d'agrandissement au-delà de la largeur de l'original
+        self.assertEqual(set(product.image_renditions['webp']), {'160', '320'})
+        with default_storage.open(product.image_renditions['jpeg']['320']) as f:
+            rendition = Image.open(f)
+            self.assertEqual((rendition.format, rendition.size), ('JPEG', (320, 160)))
+        self.assertEqual(
+            APIClient().get(f'/api/products/{product.pk}/').json()['image_srcset']['webp']['160'],
+            'http://testserver/media/renditions/products/casque-160w.webp'
+        )
+
+    def test_unreadable_images_keep_original(self):
+        corrupt = self.product_with_image('products/corrompue.jpg', b'\xff\xd8\xff pas une image')
+        bomb = self.product_with_image('products/bombe.png', self.png(400, 400))
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 1000), self.assertLogs('products.images', 'ERROR') as logs:
+            images.update_product_renditions(corrupt.pk, corrupt.image.name)
+            images.update_product_renditions(bomb.pk, bomb.image.name)
+        self.assertEqual(len(logs.records), 2)
+        self.assertEqual(list(Product.objects.values_list('image_renditions', flat=True)), [{}, {}])
+
+    def test_saving_an_image_defers_work_to_background(self):
+        product = Product.objects.create(name='Casque', description='-', price='10.00', category=self.category)
+        product.image = 'products/casque.png'
+        with mock.patch.object(images, 'enqueue_renditions') as enqueue:
+            with self.captureOnCommitCallbacks(execute=True):
+                product.save()
+            enqueue.assert_called_once_with(product.pk, 'products/casque.png')
+            with override_settings(IMAGE_RENDITIONS_ON_SAVE=False), self.captureOnCommitCallbacks(execute=True):
+                product.image = 'products/autre.png'
+                product.save()
+            self.assertEqual(enqueue.call_count, 1)
+
+    def test_worker_survives_failures(self):
+        failures = [RuntimeError('base verrouillée'), None]
+        with mock.patch.object(images, 'update_product_renditions', side_effect=failures) as update:
+            with self.assertLogs('products.images', 'ERROR'):
+                images.enqueue_renditions(1, 'products/a.png')
+                images.enqueue_renditions(2, 'products/b.png')
+                images._queue.join()
+        self.assertEqual(update.call_args_list, [mock.call(1, 'products/a.png'), mock.call(2, 'products/b.png')])
+
+
+
+class SearchIndexTests(TestCase):
+    """Index plein texte des produits (``products.search``)"""
+
+    def setUp(self):
+        self.audio = Category.objects.create(name='Audio', slug='audio')
+        self.photo = Category.objects.create(name='Photo', slug='photo')
+        self.headset = self.create('Casque sans fil', 'Casque audio à réduction de bruit', self.audio)
+        self.speaker = self.create('Enceinte portable', 'Son puissant, idéale avec un casque', self.audio)
+        self.camera = self.create('Appareil hybride', 'Capteur plein format écologique', self.photo)
+
+    def create(self, name, description, category):
+        return Product.objects.create(name=name, description=description, price='10.00', category=category)
+
+    def search(self, query):
+        return list(search_products(Product.objects.all(), query).values_list('id', flat=True))
+
+    def test_index_follows_save_rename_and_delete(self):
+        self.assertEqual(self.search('hybride'), [self.camera.pk])
+        self.camera.name = 'Reflex numérique'
+        self.camera.save()
+        self.assertEqual(self.search('hybride'), [])
+        self.assertEqual(self.search('reflex'), [self.camera.pk])
+
+        # Le nom de la catégorie est indexé avec ses produits
+        self.photo.name = 'Optique'
+        self.photo.save()
+        self.assertEqual(self.search('optique'), [self.camera.pk])
+        self.assertEqual(self.search('photo'), [])
+
+        self.camera.delete()
+        self.assertEqual(self.search('reflex'), [])
+        self.assertFalse(ProductSearchDocument.objects.filter(pk=self.camera.pk).exists())
+
+    def test_rank_prefix_and_diacritics(self):
+        # Le nom et la description de la fiche du casque le mentionnent deux fois
+        self.assertEqual(self.search('casque'), [self.headset.pk, self.speaker.pk])
+        self.assertEqual(self.search('cas'), [self.headset.pk, self.speaker.pk])
+        self.assertEqual(self.search('ecolo'), [self.camera.pk])
+        # Mots combinés (ET) et syntaxe du moteur ignorée
+        self.assertEqual(self.search('casque portable'), [self.speaker.pk])
+        self.assertEqual(self.search('"casque* OR (photo'), [])
+        self.assertEqual(
+            [product['id'] for product in APIClient().get('/api/products/?search=casque').json()['results']],
+            [self.headset.pk, self.speaker.pk]
+        )
+
+    def test_rebuild_search_index(self):
+        ProductSearchDocument.objects.all().delete()
+        Product.objects.filter(pk=self.headset.pk).update(name='Micro studio')
+        self.assertEqual(self.search('micro'), [])
+
+        output = StringIO()
+        call_command('rebuild_search_index', batch_size=2, stdout=output)
+        self.assertIn('3 produits indexés', output.getvalue())
+        self.assertEqual(ProductSearchDocument.objects.count(), 3)
+        self.assertEqual(self.search('micro'), [self.headset.pk])
+
+
+
+class CatalogCacheTests(TestCase):
+    """Invalidation du cache des réponses du catalogue (``products.cache``)"""
+
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Audio', slug='audio')
+        self.product = Product.objects.create(
+            name='Casque', description='-', price='10.00', category=self.category, sku='AUD-1'
+        )
+        self.client = APIClient()
+
+    def get(self, path):
+        """Données de la réponse et nombre de requêtes SQL (0 : servie par le cache)"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(queries)
+
+    def names(self, path='/api/products/'):
+        data, queries = self.get(path)
+        return [product['name'] for product in data['results']], queries
+
+    def test_reads_are_cached(self):
+        self.assertEqual(self.names(), (['Casque'], 3))
+        self.assertEqual(self.names(), (['Casque'], 0))
+        # Paramètres normalisés : même entrée
+        self.assertEqual(self.get('/api/products/?page=&ordering=-created_at')[1], 3)
+        self.assertEqual(self.get('/api/products/?ordering=-created_at&page=')[1], 0)
+
+    def test_saves_and_deletes_invalidate(self):
+        self.names()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = 'Casque pro'
+            self.product.save()
+        self.assertEqual(self.names()[0], ['Casque pro'])
+
+        self.get('/api/categories/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = 'Son'
+            self.category.save()
+        self.assertEqual([category['name'] for category in self.get('/api/categories/')[0]['results']], ['Son'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.delete()
+        self.assertEqual(self.names()[0], [])
+
+    def test_bulk_commands_invalidate(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl') as source:
+            source.write(json.dumps({'sku': 'AUD-1', 'name': 'Casque importé', 'price': '12', 'category': 'audio'}) + '\n')
+            source.flush()
+            self.names()
+            call_command('import_catalog', source.name, stdout=StringIO())
+        self.assertEqual(self.names()[0], ['Casque importé'])
+
+        # Écritures sans signaux, rendues visibles par la commande
+        self.get('/api/categories/')
+        Category.objects.update(available_products_count=0)
+        call_command('recount_categories', stdout=StringIO())
+        self.assertEqual(self.get('/api/categories/')[0]['results'][0]['products_count'], 1)
+
+        self.assertEqual(self.names('/api/products/?search=micro')[0], [])
+        Product.objects.update(name='Micro')
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.names('/api/products/?search=micro')[0], ['Micro'])
+
+    @override_settings(ALLOWED_HOSTS=['shop.example', 'mirror.example'])
+    def test_entries_are_per_origin(self):
+        Product.objects.create(name='Enceinte', description='-', price='20.00', category=self.category)
+
+        def next_link(**extra):
+            response = self.client.get('/api/products/?page_size=1', **extra)
+            self.assertEqual(response.status_code, 200)
+            return response.json()['next']
+
+        self.assertTrue(next_link(HTTP_HOST='shop.example').startswith('http://shop.example/'))
+        self.assertTrue(next_link(HTTP_HOST='mirror.example').startswith('http://mirror.example/'))
+        self.assertTrue(next_link(HTTP_HOST='shop.example', secure=True).startswith('https://shop.example/'))
+
+
+
+class ImportCatalogTests(TestCase):
+    """Commande ``import_catalog`` (CSV / JSONL, upsert sur le SKU)"""
+
+    def setUp(self):
+        cache.clear()
+        self.audio = Category.objects.create(name='Audio', slug='audio')
+
+    def run_import(self, rows, input_format='jsonl', *args):
+        with tempfile.NamedTemporaryFile('w', suffix=f'.{input_format}', encoding='utf-8') as source:
+            if input_format == 'csv':
+                writer = csv.DictWriter(source, fieldnames=['sku', 'name', 'price', 'stock', 'category', 'category_name'])
+                writer.writeheader()
+                writer.writerows(rows)
+            else:
+                source.writelines(row if isinstance(row, str) else json.dumps(row) + '\n' for row in rows)
+            source.flush()
+            output = StringIO()
+            call_command('import_catalog', source.name, *args, batch_size=2, stdout=output)
+        return output.getvalue()
+
+    def counts(self):
+        return dict(Category.objects.values_list('slug', 'available_products_count'))
+
+    def test_upsert_on_sku(self):
+        self.run_import([
+            {'sku': 'A1', 'name': 'Casque', 'price': '10', 'stock': '3', 'category': 'audio'},
+            {'sku': 'A2', 'name': 'Enceinte', 'price': '20', 'stock': '1', 'category': 'audio'},
+            {'sku': 'A3', 'name': 'Micro', 'price': '30', 'stock': '', 'category': 'audio'},
+        ], 'csv')
+        casque = Product.objects.get(sku='A1')
+        Product.objects.filter(pk=casque.pk).update(reserved=2)
+
+        self.run_import([
+            {'sku': 'A1', 'name': 'Casque v2', 'price': '12.50', 'stock': 5, 'category': 'audio'},
+            {'sku': 'A4', 'name': 'Platine', 'price': '99', 'category': 'audio', 'is_available': 'non'},
+        ])
+        self.assertEqual(Product.objects.count(), 4)
+        updated = Product.objects.get(sku='A1')
+        self.assertEqual((updated.pk, updated.name, str(updated.price), updated.stock), (casque.pk, 'Casque v2', '12.50', 5))
+        # Réservations et date de création conservées
+        self.assertEqual((updated.reserved, updated.created_at), (2, casque.created_at))
+        self.assertEqual(search_products(Product.objects.all(), 'platine').get().sku, 'A4')
+        self.assertEqual(self.counts(), {'audio': 3})
+
+    def test_recount_after_category_change(self):
+        self.run_import([{'sku': f'A{index}', 'name': 'Casque', 'price': '10', 'category': 'audio'} for index in range(3)])
+        output = self.run_import([
+            {'sku': 'A0', 'name': 'Casque', 'price': '10', 'category_name': 'Photo & Vidéo'},
+            {'sku': 'A1', 'name': 'Casque', 'price': '10', 'category': 'audio', 'is_available': False},
+        ])
+        self.assertIn('2 produits importés', output)
+        self.assertEqual(self.counts(), {'audio': 1, 'photo-video': 1})
+        self.assertEqual(Category.objects.get(slug='photo-video').name, 'Photo & Vidéo')
+
+    def test_bad_rows_are_reported(self):
+        Category.objects.create(name='Photo', slug='photo')
+        output = self.run_import([
+            {'sku': 'OK1', 'name': 'Casque', 'price': '10', 'category': 'audio'},
+            {'name': 'Sans SKU', 'price': '10', 'category': 'audio'},
+            {'sku': 'B2', 'name': 'Prix', 'price': 'gratuit', 'category': 'audio'},
+            {'sku': 'B3', 'name': 'Négatif', 'price': '-1', 'category': 'audio'},
+            '{pas du json\n',
+            {'sku': 'B5', 'name': 'Sans catégorie', 'price': '10'},
+            # Slug nouveau, mais nom déjà porté par la catégorie « photo »
+            {'sku': 'B6', 'name': 'Objectif', 'price': '10', 'category': 'photos', 'category_name': 'Photo'},
+            {'sku': 'B7', 'name': 'Trépied', 'price': '10', 'category': 'photos', 'category_name': 'Photo'},
+            {'sku': 'B8', 'name': 'NaN', 'price': 'NaN', 'category': 'audio'},
+            {'sku': 'B9', 'name': 'Infini', 'price': '-Infinity', 'category': 'audio'},
+            '{"sku": "B10", "name": "Stock infini", "price": "10", "stock": Infinity, "category": "audio"}\n',
+            '["B11", "Tableau", "10"]\n',
+            '"B12"\n',
+            {'sku': 'OK2', 'name': 'Enceinte', 'price': '10', 'category': 'audio'},
+        ])
+        self.assertEqual(sorted(Product.objects.values_list('sku', flat=True)), ['OK1', 'OK2'])
+        self.assertIn('⚠️ 12 lignes rejetées', output)
+        self.assertIn('❌ Ligne 10: prix ou stock invalide', output)
+        self.assertIn('❌ Ligne 12: la ligne n\'est pas un objet JSON', output)
+        self.assertIn('❌ Ligne 7: catégorie photos : le nom « Photo » est déjà utilisé', output)
+        self.assertIn('❌ Ligne 5: JSON invalide', output)
+        self.assertFalse(Category.objects.filter(slug='photos').exists())
+
+        output = self.run_import(
+            [{'sku': 'C1', 'name': 'Casque', 'price': '10', 'category': 'inconnue'}], 'jsonl', '--no-create-categories'
+        )
+        self.assertIn('catégorie inconnue pour C1', output)
+        self.assertFalse(Product.objects.filter(sku='C1').exists())
+
+
+
+class IngestImagesTests(TestCase):
+    """Commande ``ingest_images`` (stockage adressé par le contenu)"""
+
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.TemporaryDirectory()
+        source_dir = tempfile.TemporaryDirectory()
+        for directory in (media_root, source_dir):
+            self.addCleanup(directory.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+        self.media_root, self.source_dir = media_root.name, source_dir.name
+        category = Category.objects.create(name='Audio', slug='audio')
+        for sku, name in (('AUD-1', 'Casque sans fil'), ('AUD-2', 'Enceinte'), ('AUD-3', 'Micro')):
+            Product.objects.create(sku=sku, name=name, description='-', price='10.00', category=category)
+
+    def write(self, name, content):
+        path = os.path.join(self.source_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def ingest(self, *args):
+        output = StringIO()
+        call_command('ingest_images', *args, workers=2, stdout=output)
+        return output.getvalue()
+
+    def images(self):
+        return dict(Product.objects.values_list('sku', 'image'))
+
+    def stored_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(root, name), self.media_root)
+            for root, _, names in os.walk(self.media_root) for name in names if not name.startswith('.')
+        )
+
+    def test_identical_files_are_stored_once(self):
+        # Fichiers nommés par SKU et par slug du nom, même contenu
+        self.write('AUD-1.jpg', b'photo-casque')
+        self.write('sous-dossier/casque-sans-fil.JPG', b'photo-casque')
+        self.write('AUD-2.png', b'photo-enceinte')
+        self.write('inconnu.jpg', b'?')
+        self.write('notes.txt', b'pas une image')
+
+        output = self.ingest(self.source_dir)
+        self.assertIn('⚠️ Produit non trouvé pour inconnu.jpg', output)
+        self.assertIn('📊 3 fichiers, 3 hachés, 2 images distinctes, 2 copiées', output)
+        digest = hashlib.sha256(b'photo-casque').hexdigest()
+        self.assertEqual(self.images()['AUD-1'], f'products/{digest[:2]}/{digest}.jpg')
+        self.assertEqual(len(self.stored_files()), 2)
+
+    def test_rerun_skips_ingested_images(self):
+        self.write('AUD-1.jpg', b'photo-casque')
+        self.write('AUD-2.jpg', b'photo-enceinte')
+        self.ingest(self.source_dir)
+        images = self.images()
+
+        output = self.ingest(self.source_dir)
+        self.assertIn('📊 2 fichiers, 0 hachés, 2 images distinctes, 0 copiées', output)
+        self.assertIn('0 produits mis à jour', output)
+        self.assertEqual(self.images(), images)
+
+        # Fichier modifié : seul celui-ci est haché et copié à nouveau
+        path = self.write('AUD-2.jpg', b'nouvelle photo')
+        os.utime(path, ns=(0, 1))
+        output = self.ingest(self.source_dir)
+        self.assertIn('📊 2 fichiers, 1 hachés, 2 images distinctes, 1 copiées', output)
+        self.assertIn('1 produits mis à jour', output)
+
+    def test_manifest_and_dry_run(self):
+        self.write('partagee.webp', b'photo-commune')
+        manifest = self.write('manifest.csv', '\n'.join([
+            'image,product', 'partagee.webp,AUD-1', 'partagee.webp,Enceinte',
+            'absente.webp,AUD-3', 'partagee.webp,inconnu',
+        ]).encode())
+
+        output = self.ingest('--manifest', manifest, '--dry-run')
+        self.assertIn('image non trouvée', output)
+        self.assertIn('produit non trouvé (inconnu)', output)
+        self.assertEqual((set(self.images().values()), self.stored_files()), ({''}, []))
+
+        output = self.ingest('--manifest', manifest)
+        self.assertIn('📊 1 fichiers, 1 hachés, 1 images distinctes, 1 copiées', output)
+        images = self.images()
+        self.assertEqual(images['AUD-1'], images['AUD-2'])
+        self.assertEqual(images['AUD-3'], '')
+
+
+
+class CartDeltaTests(TestCase):
+    """Réponses delta des modifications du panier et résumé ``/api/cart/summary/``"""
+
+    def setUp(self):
+        category = Category.objects.create(name='Audio', slug='audio')
+        self.headset = Product.objects.create(name='Casque', description='-', price='10.00', category=category, stock=10)
+        self.speaker = Product.objects.create(name='Enceinte', description='-', price='25.50', category=category, stock=10)
+        self.client = APIClient()
+
+    def test_delta_payloads(self):
+        self.client.post('/api/cart/add_item/', {'product_id': self.headset.pk, 'quantity': 1}, format='json')
+        response = self.client.post(
+            '/api/cart/add_item/?response=delta', {'product_id': self.speaker.pk, 'quantity': 2}, format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        self.assertNotIn('cart', data)
+        self.assertEqual(
+            (data['version'], data['total_items'], data['total_price'], data['removed_item_ids']), (2, 3, 61.0, [])
+        )
+        # Seul l'article modifié est renvoyé
+        [item] = data['items']
+        self.assertEqual((item['product'], item['quantity']), (self.speaker.pk, 2))
+
+        response = self.client.put(
+            '/api/cart/update_item/', {'item_id': item['id'], 'quantity': 1}, format='json', HTTP_X_CART_RESPONSE='delta'
+        )
+        data = response.json()
+        self.assertEqual(([item['quantity'] for item in data['items']], data['version'], data['total_items']), ([1], 3, 2))
+
+        data = self.client.delete('/api/cart/remove_item/?response=delta', {'item_id': item['id']}, format='json').json()
+        self.assertEqual((data['items'], data['removed_item_ids'], data['total_items']), ([], [item['id']], 1))
+
+        data = self.client.post('/api/cart/batch/?response=delta', {'operations': [
+            {'op': 'set', 'product_id': self.headset.pk, 'quantity': 4},
+            {'op': 'add', 'product_id': 999999, 'quantity': 1},
+        ]}, format='json').json()
+        self.assertEqual([result['status'] for result in data['results']], ['ok', 'error'])
+        self.assertEqual(([item['quantity'] for item in data['items']], data['total_items']), ([4], 4))
+
+        data = self.client.delete('/api/cart/clear/?response=delta').json()
+        self.assertEqual((len(data['removed_item_ids']), data['total_items']), (1, 0))
+        # Réponse complète par défaut
+        self.assertIn('cart', self.client.delete('/api/cart/clear/').json())
+
+    def test_summary_etag(self):
+        response = self.client.get('/api/cart/summary/')
+        self.assertEqual(response.json(), {'version': 0, 'total_items': 0, 'total_price': 0.0})
+        self.assertEqual(self.client.get('/api/cart/summary/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        self.client.post('/api/cart/add_item/', {'product_id': self.speaker.pk, 'quantity': 2}, format='json')
+        response = self.client.get('/api/cart/summary/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'version': 1, 'total_items': 2, 'total_price': 51.0})
+        etag = response['ETag']
+        self.assertEqual(self.client.get('/api/cart/summary/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # Toute modification change la version, donc l'ETag
+        self.client.delete('/api/cart/clear/')
+        response = self.client.get('/api/cart/summary/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, response.json()['version']), (200, 2))
+        # Le résumé d'un autre visiteur ne dépend pas de ce panier
+        self.assertEqual(APIClient().get('/api/cart/summary/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+
+class CartDestroyTests(TestCase):
+    """Routes génériques du panier : suppression et création/modification directes"""
+
+    def setUp(self):
+        category = Category.objects.create(name='Audio', slug='audio')
+        self.product = Product.objects.create(name='Casque', description='-', price='10.00', category=category, stock=10)
+        self.client = APIClient()
+        self.client.post('/api/cart/add_item/', {'product_id': self.product.pk, 'quantity': 3}, format='json')
+        self.cart = Cart.objects.get()
+
+    def test_destroy_releases_reserved_stock(self):
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.reserved, 3)
+        response = self.client.delete(f'/api/cart/{self.cart.pk}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Cart.objects.exists())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.reserved, 0)
+
+    def test_other_session_cannot_destroy(self):
+        response = APIClient().delete(f'/api/cart/{self.cart.pk}/')
+        self.assertEqual(response.status_code, 404)
+        self.assertTrue(Cart.objects.exists())
+
+    def test_generic_writes_are_not_allowed(self):
+        self.assertEqual(self.client.post('/api/cart/', {'session_key': 'x'}, format='json').status_code, 405)
+        for method in (self.client.put, self.client.patch):
+            response = method(f'/api/cart/{self.cart.pk}/', {'session_key': 'x'}, format='json')
+            self.assertEqual(response.status_code, 405)
+        self.assertEqual(Cart.objects.get().session_key, self.cart.session_key)
+
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Nombre de requêtes SQL de chaque route de ``products/urls.py``, mesuré sur
+    un petit puis un grand catalogue : le budget ne dépend ni de la taille des
+    pages, ni du nombre de catégories, ni du nombre d'articles du panier.
+    """
+    # (catégories, produits, articles du panier, taille de page)
+    SIZES = [(2, 10, 1, 5), (12, 150, 15, 100)]
+    # Clé : nom de la route, suivi éventuellement de la variante mesurée
+    BUDGETS = {
+        'api-root': 0,
+        'category-list': 3,
+        'category-detail': 1,
+        'category-products': 4,
+        'category-products ?pagination=cursor': 2,
+        'category-products ?format=ndjson': 2,
+        'product-list': 3,
+        'product-list ?render=fast': 3,
+        'product-list ?pagination=cursor': 1,
+        'product-list ?search=': 3,
+        'product-list ?fields=': 3,
+        'product-list ?facets=': 5,
+        'product-detail': 1,
+        'product-featured': 2,
+        'product-search-advanced': 2,
+        'cart-list (vide)': 0,
+        'cart-batch': 13,
+        'cart-add-item': 13,
+        'cart-list': 2,
+        'cart-detail': 2,
+        'cart-summary': 1,
+        'cart-update-item': 9,
+        'cart-remove-item': 9,
+        'cart-clear': 9,
+        'async-product-list': 2,
+        'async-product-detail': 1,
+        'async-product-featured': 1,
+        'async-category-list': 1,
+        'async-category-products': 3,
+        'async-cart-summary': 0,
+    }
+
+    def test_every_route_has_a_budget(self):
+        budgeted = {label.split()[0] for label in self.BUDGETS}
+        self.assertEqual(benchmarks.registered_routes(urls.urlpatterns) - budgeted, set())
+
+    def test_budgets_do_not_grow(self):
+        measured = {}
+        for categories, products, lines, page_size in self.SIZES:
+            seed_catalog(products, categories, seed=1)
+            for label, queries in self.measure(lines, page_size):
+                measured.setdefault(label, []).append(len(queries))
+                with self.subTest(label, products=products, lines=lines, page_size=page_size):
+                    self.assertLessEqual(len(queries), self.BUDGETS[label], self.report(label, queries))
+
+        self.assertEqual(set(measured), set(self.BUDGETS))
+        grown = {label: counts for label, counts in measured.items() if len(set(counts)) > 1}
+        self.assertEqual(grown, {}, 'Nombre de requêtes variable selon la taille du catalogue')
+
+    def report(self, label, queries):
+        """Requêtes exécutées (numérotées) et empreintes répétées"""
+        repeated = Counter(fingerprint(query['sql']) for query in queries)
+        lines = [f'{label} : {len(queries)} requêtes (budget {self.BUDGETS[label]})']
+        lines += [f'{index}. {query["sql"]}' for index, query in enumerate(queries, start=1)]
+        lines += [f'répétée {count} fois : {sql}' for sql, count in repeated.items() if count > 1]
+        return '\n'.join(lines)
+
+    def capture(self, method, path, data=None):
+        # Le cache du catalogue masquerait les requêtes
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(path, data, format='json')
+            if response.streaming:
+                # Requêtes exécutées pendant la diffusion
+                b''.join(response.streaming_content)
+        self.assertLess(response.status_code, 300, f'{path}: {response.getvalue()[:300]}')
+        return response, queries.captured_queries
+
+    def capture_async(self, path):
+        async def fetch():
+            response = await AsyncClient().get(path)
+            if response.streaming:
+                [chunk async for chunk in response.streaming_content]
+            return response
+
+        cache.clear()
+        # L'ORM asynchrone s'exécute dans ce fil (``sync_to_async``) : même connexion
+        with CaptureQueriesContext(connection) as queries:
+            response = async_to_sync(fetch)()
+        self.assertEqual(response.status_code, 200, path)
+        return queries.captured_queries
+
+    def measure(self, lines, page_size):
+        """``(libellé, requêtes)`` pour chaque route, dans l'ordre du cycle du panier"""
+        self.client = APIClient()
+        slug = Category.objects.filter(available_products_count__gt=0).order_by('pk').values_list(
+            'slug', flat=True
+        ).first()
+        product_id = Product.objects.order_by('pk').values_list('pk', flat=True).first()
+        cart_product_ids = list(
+            Product.objects.filter(is_available=True, stock__gte=10).order_by('pk')
+            .values_list('pk', flat=True)[:lines + 1]
+        )
+        self.assertEqual(len(cart_product_ids), lines + 1)
+
+        reads = [
+            ('api-root', '/api/'),
+            ('category-list', '/api/categories/'),
+            ('category-detail', f'/api/categories/{slug}/'),
+            ('category-products', f'/api/categories/{slug}/products/?page_size={page_size}'),
+            ('category-products ?pagination=cursor',
+             f'/api/categories/{slug}/products/?page_size={page_size}&pagination=cursor&ordering=price'),
+            ('category-products ?format=ndjson', f'/api/categories/{slug}/products/?format=ndjson'),
+            ('product-list', f'/api/products/?page_size={page_size}&ordering=-price'),
+            ('product-list ?render=fast', f'/api/products/?page_size={page_size}&render=fast'),
+            ('product-list ?pagination=cursor', f'/api/products/?page_size={page_size}&pagination=cursor'),
+            ('product-list ?search=', f'/api/products/?page_size={page_size}&search=pro'),
+            ('product-list ?fields=', f'/api/products/?page_size={page_size}&fields=id,name,category.name'),
+            ('product-list ?facets=', f'/api/products/?page_size={page_size}&facets=true&min_price=1'),
+            ('product-detail', f'/api/products/{product_id}/'),
+            ('product-featured', '/api/products/featured/'),
+            ('product-search-advanced', '/api/products/search_advanced/?q=pro&min_price=1'),
+            ('cart-list (vide)', '/api/cart/'),
+        ]
+        for label, path in reads:
+            yield label, self.capture('get', path)[1]
+
+        yield 'cart-batch', self.capture('post', '/api/cart/batch/', {'operations': [
+            {'op': 'add', 'product_id': product_id, 'quantity': 1} for product_id in cart_product_ids[:lines]
+        ]})[1]
+        response, queries = self.capture(
+            'post', '/api/cart/add_item/', {'product_id': cart_product_ids[lines], 'quantity': 1}
+        )
+        yield 'cart-add-item', queries
+        cart = response.json()['cart']
+        self.assertEqual(len(cart['items']), lines + 1)
+        item_id = cart['items'][0]['id']
+        yield 'cart-list', self.capture('get', '/api/cart/')[1]
+        yield 'cart-detail', self.capture('get', f'/api/cart/{cart["id"]}/')[1]
+        yield 'cart-summary', self.capture('get', '/api/cart/summary/')[1]
+        yield 'cart-update-item', self.capture('put', '/api/cart/update_item/', {'item_id': item_id, 'quantity': 2})[1]
+        yield 'cart-remove-item', self.capture('delete', '/api/cart/remove_item/', {'item_id': item_id})[1]
+        yield 'cart-clear', self.capture('delete', '/api/cart/clear/')[1]
+
+        yield 'async-product-list', self.capture_async(f'/api/async/products/?page_size={page_size}')
+        yield 'async-product-detail', self.capture_async(f'/api/async/products/{product_id}/')
+        yield 'async-product-featured', self.capture_async('/api/async/products/featured/')
+        yield 'async-category-list', self.capture_async('/api/async/categories/')
+        yield 'async-category-products', self.capture_async(
+            f'/api/async/categories/{slug}/products/?page_size={page_size}'
+        )
+        yield 'async-cart-summary', self.capture_async('/api/async/cart/summary/')
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views
+from . import async_views, views
 
 # Création du router DRF
 router = DefaultRouter()
@@ -8,7 +8,18 @@ router.register(r'categories', views.CategoryViewSet)
 router.register(r'products', views.ProductViewSet)
 router.register(r'cart', views.CartViewSet, basename='cart')
 
+# Endpoints de lecture asynchrones (déploiement ASGI, voir products.async_views)
+async_urlpatterns = [
+    path('products/', async_views.product_list, name='async-product-list'),
+    path('products/featured/', async_views.product_featured, name='async-product-featured'),
+    path('products/<int:pk>/', async_views.product_detail, name='async-product-detail'),
+    path('categories/', async_views.category_list, name='async-category-list'),
+    path('categories/<slug:slug>/products/', async_views.category_products, name='async-category-products'),
+    path('cart/summary/', async_views.cart_summary, name='async-cart-summary'),
+]
+
 # URLs de l'application products
 urlpatterns = [
+    path('api/async/', include(async_urlpatterns)),
     path('api/', include(router.urls)),
-]
\ No newline at end of file
+]
@@ -1,23 +1,46 @@
-from django.shortcuts import render
+from decimal import Decimal
+
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404, render
 from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import MethodNotAllowed
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+from django.utils.http import quote_etag
 from .models import Category, Product, Cart, CartItem
+from .filters import ProductSearchFilter, filter_price_and_stock
+from .search import search_products
+from . import cart_batch, stock
+from .cache import cache_catalog_response
+from .facets import cached_facets, facets_requested
+from .conditional import ConditionalGetMixin, conditional_response, queryset_validators
+from .fieldsets import SparseFieldsetMixin, prune_data, serializer_sources
+from .renderers import FastJSONRenderer, NDJSONRenderer, ndjson_lines
 from .serializers import (
     CategorySerializer, 
     ProductListSerializer, 
+    ProductListRowSerializer,
     ProductDetailSerializer,
     ProductCreateUpdateSerializer,
     CartSerializer,
     CartItemSerializer,
     AddToCartSerializer,
-    UpdateCartItemSerializer
+    UpdateCartItemSerializer,
+    CartBatchSerializer
 )
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+# Produits lus par requête SQL dans les réponses diffusées
+STREAM_CHUNK_SIZE = 500
+
+
+class CategoryViewSet(SparseFieldsetMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """ViewSet pour gérer les catégories"""
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
@@ -27,33 +50,62 @@ class CategoryViewSet(viewsets.ModelViewSet):
     search_fields = ['name', 'description']
     ordering_fields = ['name', 'created_at']
     ordering = ['name']
+    # Validateurs ETag et champs de tri
+    sparse_required_fields = ('updated_at', 'name', 'created_at')
+    
+    def get_queryset(self):
+        return self.get_read_queryset(super().get_queryset())
+    
+    @cache_catalog_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
     
-    @action(detail=True, methods=['get'])
+    @action(detail=True, methods=['get'], renderer_classes=[FastJSONRenderer, BrowsableAPIRenderer, NDJSONRenderer])
+    @cache_catalog_response
     def products(self, request, slug=None):
-        """Retourne les produits d'une catégorie"""
-        category = self.get_object()
-        products = Product.objects.filter(
-            category=category, 
-            is_available=True
-        ).order_by('-created_at')
+        """
+        Produits disponibles d'une catégorie : filtres, tri et pagination
+        (page ou clé) de la liste des produits. En NDJSON, tous les produits
+        sont diffusés par lots de ``STREAM_CHUNK_SIZE``, sans pagination.
+        """
+        # Recherche et tri de la requête portent sur les produits, pas sur les catégories
+        category = get_object_or_404(Category, slug=slug)
+        self.check_object_permissions(request, category)
+        view = ProductViewSet(request=request, args=(), kwargs={}, format_kwarg=self.format_kwarg, action='list')
+        products = view.filter_queryset(view.get_queryset().filter(category=category, is_available=True))
         
-        serializer = ProductListSerializer(products, many=True)
-        return Response(serializer.data)
+        if getattr(request.accepted_renderer, 'streaming', False):
+            serializer = view.get_serializer()
+            rows = (serializer.to_representation(product) for product in products.iterator(chunk_size=STREAM_CHUNK_SIZE))
+            return StreamingHttpResponse(ndjson_lines(rows), content_type=NDJSONRenderer.media_type)
+        return view.conditional_list(request, products)
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(SparseFieldsetMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """ViewSet pour gérer les produits"""
     queryset = Product.objects.select_related('category').all()
+    # Le nom (liste) et le détail de la catégorie font partie de la réponse
+    conditional_timestamp_fields = ('updated_at', 'category__updated_at')
     
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, ProductSearchFilter]
     filterset_fields = ['category', 'is_available', 'featured']
+    # Champs couverts par l'index plein texte (voir products.search)
     search_fields = ['name', 'description', 'category__name']
     ordering_fields = ['name', 'price', 'created_at', 'stock']
     ordering = ['-created_at']
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+    # Validateurs ETag (avec la catégorie jointe) et champs de tri de la pagination par clé
+    sparse_required_fields = ('category', 'updated_at', 'category__updated_at', 'created_at', 'name', 'price', 'stock')
+    
+    def use_fast_list(self):
+        """``?render=fast`` : liste lue par ``.values()`` (même représentation, sans instances)"""
+        return self.action == 'list' and self.request.query_params.get('render') == 'fast'
     
     def get_serializer_class(self):
         """Choisit le serializer selon l'action"""
         if self.action == 'list':
+            return ProductListRowSerializer if self.use_fast_list() else ProductListSerializer
+        elif self.action in ['featured', 'search_advanced']:
             return ProductListSerializer
         elif self.action == 'retrieve':
             return ProductDetailSerializer
@@ -63,41 +115,38 @@ class ProductViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """Filtrage personnalisé des produits"""
-        queryset = super().get_queryset()
-        
-        # Filtre par prix minimum et maximum
-        min_price = self.request.query_params.get('min_price')
-        max_price = self.request.query_params.get('max_price')
-        
-        if min_price:
-            try:
-                queryset = queryset.filter(price__gte=float(min_price))
-            except ValueError:
-                pass
-        
-        if max_price:
-            try:
-                queryset = queryset.filter(price__lte=float(max_price))
-            except ValueError:
-                pass
-        
-        # Filtre pour les produits en stock seulement
-        in_stock_only = self.request.query_params.get('in_stock_only')
-        if in_stock_only and in_stock_only.lower() == 'true':
-            queryset = queryset.filter(stock__gt=0, is_available=True)
-        
-        return queryset
+        queryset = filter_price_and_stock(super().get_queryset(), self.request.query_params)
+        if self.use_fast_list():
+            return ProductListRowSerializer.project(queryset)
+        return self.get_read_queryset(queryset)
+    
+    def with_facets(self, response, queryset):
+        """Ajoute ``facets`` à une page de résultats si le client les demande (``?facets=true``)"""
+        if facets_requested(self.request) and response.status_code == 200 and isinstance(response.data, dict):
+            response.data['facets'] = cached_facets(self.request, queryset)
+        return response
+    
+    @cache_catalog_response
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        return self.with_facets(response, self.filter_queryset(self.get_queryset()))
     
     @action(detail=False, methods=['get'])
+    @cache_catalog_response
     def featured(self, request):
         """Retourne les produits mis en avant"""
         featured_products = self.get_queryset().filter(
             featured=True, 
             is_available=True
-        )[:6]  # Limite à 6 produits
+        )
         
-        serializer = ProductListSerializer(featured_products, many=True)
-        return Response(serializer.data)
+        return conditional_response(
+            request,
+            queryset_validators(request, featured_products, self.conditional_timestamp_fields),
+            lambda: Response(
+                self.sparse(ProductListSerializer(featured_products[:6], many=True)).data  # Limite à 6 produits
+            )
+        )
     
     @action(detail=False, methods=['get'])
     def search_advanced(self, request):
@@ -109,13 +158,9 @@ class ProductViewSet(viewsets.ModelViewSet):
         
         queryset = self.get_queryset()
         
-        # Recherche textuelle
+        # Recherche textuelle (index plein texte, classée par pertinence)
         if query:
-            queryset = queryset.filter(
-                Q(name__icontains=query) | 
-                Q(description__icontains=query) |
-                Q(category__name__icontains=query)
-            )
+            queryset = search_products(queryset, query)
         
         # Filtre par catégorie
         if category_slug:
@@ -137,80 +182,177 @@ class ProductViewSet(viewsets.ModelViewSet):
         # Pagination
         page = self.paginate_queryset(queryset)
         if page is not None:
-            serializer = ProductListSerializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            serializer = self.sparse(ProductListSerializer(page, many=True))
+            return self.with_facets(self.get_paginated_response(serializer.data), queryset)
         
-        serializer = ProductListSerializer(queryset, many=True)
+        serializer = self.sparse(ProductListSerializer(queryset, many=True))
         return Response(serializer.data)
 
 
-class CartViewSet(viewsets.ModelViewSet):
+CART_TOKEN_SESSION_KEY = 'cart_token'
+
+
+def cart_summary_data(summary):
+    """Version et totaux d'un résultat de ``Cart.objects.summaries()`` (``None`` : panier vide)"""
+    if summary is None:
+        return {'version': 0, 'total_items': 0, 'total_price': Decimal('0.00')}
+    return {
+        'version': summary['version'],
+        'total_items': summary['aggregated_total_items'],
+        # SQLite ne ramène pas les expressions décimales à l'échelle du champ
+        'total_price': summary['aggregated_total_price'].quantize(Decimal('0.01')),
+    }
+
+
+class CartViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """ViewSet pour gérer le panier d'achat"""
     serializer_class = CartSerializer
     
     def get_queryset(self):
         """Retourne le panier de la session courante"""
-        session_key = self.request.session.session_key
-        if not session_key:
-            self.request.session.create()
-            session_key = self.request.session.session_key
-        
-        return Cart.objects.filter(session_key=session_key)
-    
-    def get_or_create_cart(self):
-        """Récupère ou crée le panier pour la session courante"""
-        session_key = self.request.session.session_key
-        if not session_key:
-            self.request.session.create()
-            session_key = self.request.session.session_key
+        token = self.get_cart_token()
+        if token is None:
+            return Cart.objects.none()
+        return self.details_queryset().filter(session_key=token)
+    
+    def get_cart_token(self, create=False):
+        """
+        Jeton du panier conservé dans la session (``Cart.session_key``).
         
-        cart, created = Cart.objects.get_or_create(session_key=session_key)
+        Il n'est créé qu'au premier ajout : un visiteur qui ne fait que
+        consulter n'écrit rien, ni session ni panier.
+        """
+        token = self.request.session.get(CART_TOKEN_SESSION_KEY)
+        if token is None and create:
+            token = get_random_string(32)
+            self.request.session[CART_TOKEN_SESSION_KEY] = token
+        return token
+    
+    def get_cart(self, with_details=False):
+        """Panier de la session s'il existe, sinon ``None`` (panier vide virtuel)"""
+        token = self.get_cart_token()
+        if token is None:
+            return None
+        queryset = self.details_queryset() if with_details else Cart.objects
+        return queryset.filter(session_key=token).first()
+    
+    def get_or_create_cart(self, with_details=False):
+        """Récupère ou crée le panier pour la session courante (uniquement pour un ajout)"""
+        queryset = self.details_queryset() if with_details else Cart.objects
+        cart, created = queryset.get_or_create(session_key=self.get_cart_token(create=True))
         return cart
     
+    def details_queryset(self):
+        """Paniers avec totaux et articles, limités aux champs demandés (``?fields=items.quantity``)"""
+        if not self.wants_sparse_fieldsets():
+            return Cart.objects.with_details()
+        items = self.sparse(CartSerializer()).fields.get('items')
+        if items is None:
+            return Cart.objects.with_totals()
+        return Cart.objects.with_details(item_fields=serializer_sources(items))
+    
+    def empty_cart_data(self):
+        """Représentation d'un panier vide qui n'existe pas en base"""
+        return prune_data({
+            'id': None, 'session_key': None, 'version': 0, 'items': [],
+            'total_items': 0, 'total_price': Decimal('0.00'), 'is_empty': True,
+            'created_at': None, 'updated_at': None,
+        }, *self.get_fieldsets())
+    
+    def get_cart_for_response(self, cart):
+        """Recharge le panier avec ses totaux et articles (nombre de requêtes constant)"""
+        return self.details_queryset().get(pk=cart.pk)
+    
+    def wants_delta(self, request):
+        """Réponse réduite demandée par ``?response=delta`` ou l'en-tête ``X-Cart-Response: delta``"""
+        mode = request.query_params.get('response') or request.headers.get('X-Cart-Response')
+        return mode == 'delta'
+    
+    def mutation_response(self, cart, message, changed_product_ids=(), removed_item_ids=(),
+                          extra=None, status_code=status.HTTP_200_OK):
+        """
+        Réponse d'une modification du panier : panier complet, ou en mode delta
+        les seuls articles modifiés, les ids supprimés, les totaux et la version.
+        """
+        data = {'message': message, **(extra or {})}
+        if self.wants_delta(self.request):
+            items = self.sparse_queryset(
+                CartItem.objects.select_related('product'), CartItemSerializer,
+                required=('cart', 'product', 'product__id'), path=('items',)
+            ).filter(cart=cart, product_id__in=changed_product_ids) if cart and changed_product_ids else []
+            serializer = CartItemSerializer(items, many=True, context={'request': self.request})
+            data.update(
+                items=self.sparse(serializer, path=('items',)).data,
+                removed_item_ids=list(removed_item_ids),
+                **cart_summary_data(Cart.objects.filter(pk=cart.pk).summaries().first() if cart else None)
+            )
+        elif cart is None:
+            data['cart'] = self.empty_cart_data()
+        else:
+            data['cart'] = self.sparse(CartSerializer(
+                self.get_cart_for_response(cart), context={'request': self.request}
+            )).data
+        return Response(data, status=status_code)
+    
     def list(self, request):
-        """Retourne le panier de l'utilisateur"""
-        cart = self.get_or_create_cart()
-        serializer = CartSerializer(cart, context={'request': request})
+        """Retourne le panier de l'utilisateur (panier vide virtuel s'il n'existe pas)"""
+        cart = self.get_cart(with_details=True)
+        if cart is None:
+            return Response(self.empty_cart_data())
+        serializer = self.sparse(CartSerializer(cart, context={'request': request}))
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """Nombre d'articles, total et version du panier (une requête, sans créer de panier)"""
+        token = self.get_cart_token()
+        summary = Cart.objects.filter(session_key=token).summaries().first() if token else None
+        data = cart_summary_data(summary)
+        etag = quote_etag(f'cart-{summary["id"] if summary else 0}-{data["version"]}')
+        return conditional_response(request, (etag, None), lambda: Response(data))
+    
     @action(detail=False, methods=['post'])
     def add_item(self, request):
         """Ajoute un produit au panier"""
         serializer = AddToCartSerializer(data=request.data)
         if serializer.is_valid():
-            cart = self.get_or_create_cart()
             product_id = serializer.validated_data['product_id']
             quantity = serializer.validated_data['quantity']
             
             try:
                 product = Product.objects.get(id=product_id)
                 
-                # Vérifier le stock
-                cart_item, created = CartItem.objects.get_or_create(
-                    cart=cart,
-                    product=product,
-                    defaults={'quantity': quantity}
-                )
-                
-                if not created:
-                    # Article déjà dans le panier, augmenter la quantité
-                    new_quantity = cart_item.quantity + quantity
-                    if new_quantity > product.stock:
-                        return Response({
-                            'error': f'Stock insuffisant. Stock disponible: {product.stock}, '
-                                   f'quantité dans le panier: {cart_item.quantity}'
-                        }, status=status.HTTP_400_BAD_REQUEST)
+                with transaction.atomic():
+                    # Réserver le stock (UPDATE conditionnel) puis écrire l'article :
+                    # un ajout refusé ne crée ni panier ni jeton de session
+                    stock.reserve(product.id, quantity)
+                    cart = self.get_or_create_cart()
+                    cart_item, created = CartItem.objects.get_or_create(
+                        cart=cart,
+                        product=product,
+                        defaults={'quantity': quantity}
+                    )
                     
-                    cart_item.quantity = new_quantity
-                    cart_item.save()
+                    if not created:
+                        # Article déjà dans le panier, augmenter la quantité
+                        CartItem.objects.filter(pk=cart_item.pk).update(
+                            quantity=F('quantity') + quantity,
+                            updated_at=timezone.now()
+                        )
+                    cart.touch()
                 
                 # Retourner le panier mis à jour
-                cart_serializer = CartSerializer(cart, context={'request': request})
+                return self.mutation_response(
+                    cart,
+                    f'{product.name} ajouté au panier',
+                    changed_product_ids=[product.id],
+                    status_code=status.HTTP_201_CREATED
+                )
+            
+            except stock.InsufficientStock as e:
                 return Response({
-                    'message': f'{product.name} ajouté au panier',
-                    'cart': cart_serializer.data
-                }, status=status.HTTP_201_CREATED)
-                
+                    'error': str(e)
+                }, status=status.HTTP_400_BAD_REQUEST)
             except Product.DoesNotExist:
                 return Response({
                     'error': 'Produit introuvable'
@@ -221,7 +363,7 @@ class CartViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['put'])
     def update_item(self, request):
         """Met à jour la quantité d'un article dans le panier"""
-        cart = self.get_or_create_cart()
+        cart = self.get_cart()
         item_id = request.data.get('item_id')
         
         if not item_id:
@@ -229,22 +371,38 @@ class CartViewSet(viewsets.ModelViewSet):
                 'error': 'item_id requis'
             }, status=status.HTTP_400_BAD_REQUEST)
         
+        if cart is None:
+            return Response({
+                'error': 'Article introuvable dans le panier'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        
         try:
-            cart_item = CartItem.objects.get(id=item_id, cart=cart)
-            serializer = UpdateCartItemSerializer(cart_item, data=request.data)
-            
-            if serializer.is_valid():
-                cart_item.quantity = serializer.validated_data['quantity']
-                cart_item.save()
+            with transaction.atomic():
+                cart_item = CartItem.objects.select_for_update().select_related('product').get(
+                    id=item_id, cart=cart
+                )
+                serializer = UpdateCartItemSerializer(cart_item, data=request.data)
+                if not serializer.is_valid():
+                    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
                 
-                cart_serializer = CartSerializer(cart, context={'request': request})
-                return Response({
-                    'message': 'Quantité mise à jour',
-                    'cart': cart_serializer.data
-                })
-            
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+                # Réserver ou libérer la différence de quantité
+                new_quantity = serializer.validated_data['quantity']
+                stock.adjust(cart_item.product_id, cart_item.quantity, new_quantity)
+                CartItem.objects.filter(pk=cart_item.pk).update(
+                    quantity=new_quantity,
+                    updated_at=timezone.now()
+                )
+                cart.touch()
             
+            return self.mutation_response(
+                cart, 'Quantité mise à jour', changed_product_ids=[cart_item.product_id]
+            )
+        
+        except stock.InsufficientStock as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
         except CartItem.DoesNotExist:
             return Response({
                 'error': 'Article introuvable dans le panier'
@@ -253,7 +411,7 @@ class CartViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['delete'])
     def remove_item(self, request):
         """Supprime un article du panier"""
-        cart = self.get_or_create_cart()
+        cart = self.get_cart()
         item_id = request.data.get('item_id')
         
         if not item_id:
@@ -261,17 +419,27 @@ class CartViewSet(viewsets.ModelViewSet):
                 'error': 'item_id requis'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        try:
-            cart_item = CartItem.objects.get(id=item_id, cart=cart)
-            product_name = cart_item.product.name
-            cart_item.delete()
-            
-            cart_serializer = CartSerializer(cart, context={'request': request})
+        if cart is None:
             return Response({
-                'message': f'{product_name} supprimé du panier',
-                'cart': cart_serializer.data
-            })
+                'error': 'Article introuvable dans le panier'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        
+        try:
+            with transaction.atomic():
+                cart_item = CartItem.objects.select_for_update().select_related('product').get(
+                    id=item_id, cart=cart
+                )
+                product_name = cart_item.product.name
+                deleted, _ = CartItem.objects.filter(pk=cart_item.pk).delete()
+                if deleted:
+                    stock.release(cart_item.product_id, cart_item.quantity)
+                    cart.touch()
             
+            return self.mutation_response(
+                cart, f'{product_name} supprimé du panier', removed_item_ids=[cart_item.pk]
+            )
+        
         except CartItem.DoesNotExist:
             return Response({
                 'error': 'Article introuvable dans le panier'
@@ -280,11 +448,62 @@ class CartViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['delete'])
     def clear(self, request):
         """Vide complètement le panier"""
-        cart = self.get_or_create_cart()
-        cart.items.all().delete()
+        cart = self.get_cart()
+        if cart is None:
+            return self.mutation_response(None, 'Panier vidé')
+        
+        with transaction.atomic():
+            items = list(cart.items.select_for_update().values_list('id', 'product_id', 'quantity'))
+            CartItem.objects.filter(id__in=[item_id for item_id, _, _ in items]).delete()
+            stock.release_items((product_id, quantity) for _, product_id, quantity in items)
+            if items:
+                cart.touch()
+        
+        return self.mutation_response(
+            cart, 'Panier vidé', removed_item_ids=[item_id for item_id, _, _ in items]
+        )
+    
+    def destroy(self, request, *args, **kwargs):
+        """Supprime le panier et libère le stock réservé par ses articles"""
+        cart = self.get_object()
+        with transaction.atomic():
+            items = list(cart.items.select_for_update().values_list('product_id', 'quantity'))
+            cart.delete()
+            stock.release_items(items)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    
+    def create(self, request, *args, **kwargs):
+        """Le panier est créé par ``add_item`` (réservation du stock)"""
+        raise MethodNotAllowed(request.method)
+    
+    def update(self, request, *args, **kwargs):
+        """Les articles se modifient par ``update_item`` (réservation du stock)"""
+        raise MethodNotAllowed(request.method)
+    
+    def partial_update(self, request, *args, **kwargs):
+        """Voir ``update``"""
+        raise MethodNotAllowed(request.method)
+    
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """Applique une liste ordonnée d'opérations (add/set/remove) en une transaction"""
+        serializer = CartBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        operations = serializer.validated_data['operations']
+        # Le panier n'est créé que si le lot ajoute des articles
+        if any(operation['op'] != cart_batch.REMOVE and operation['quantity'] for operation in operations):
+            cart = self.get_or_create_cart()
+        else:
+            cart = self.get_cart()
+        results, removed_item_ids = cart_batch.apply_operations(cart, operations)
+        applied = [result for result in results if result['status'] == 'ok']
         
-        cart_serializer = CartSerializer(cart, context={'request': request})
-        return Response({
-            'message': 'Panier vidé',
-            'cart': cart_serializer.data
-        })
+        return self.mutation_response(
+            cart,
+            f'{len(applied)}/{len(results)} opérations appliquées',
+            changed_product_ids={result['product_id'] for result in applied if result['quantity']},
+            removed_item_ids=removed_item_ids,
+            extra={'results': results}
+        )